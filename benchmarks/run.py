@@ -0,0 +1,216 @@
+# run.py
+
+"""Time the empire pipeline stages on frozen data snapshots.
+
+    python -m benchmarks.run [--snapshots NAME ...] [--budgets 100 300 500]
+                             [--time-limit 60] [--out results.json] [--compare previous.json]
+
+Each snapshot in `benchmarks/snapshots` (see `benchmarks.snapshot`) holds a copy of the
+workerman data files and one or more prices/modifiers fixtures. For every fixture the
+node values and graph are generated once, then each budget is reduced, given a greedy
+empire by `heuristic`, modeled, solved with the time capped and turned into workerman
+data. The stage records of `profiling` (wall time, cpu time, memory and model size) and
+each solve's status, objective value, cost and greedy value are written as json so both
+performance and solution quality can be compared between runs with `--compare`.
+"""
+
+import argparse
+from importlib.metadata import version
+import json
+from pathlib import Path
+import platform
+import shutil
+import tempfile
+
+from tabulate import tabulate
+
+import bdo_empire.data_store as ds
+from bdo_empire.generate_graph_data import generate_graph_data
+from bdo_empire.generate_reference_data import generate_reference_data
+from bdo_empire.generate_workerman_data import generate_workerman_data
+from bdo_empire.graph_cache import graph_from_arrays, graph_to_arrays
+from bdo_empire.heuristic import heuristic
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.optimize_sweep import solve_stats
+from bdo_empire.pipeline import make_config, purchased_lodging, read_modifiers, read_prices
+from bdo_empire.profiling import profile_report, stage, start_profile
+from bdo_empire.reduce_graph_data import reduce_graph_data
+
+snapshots_path = Path(__file__).parent.joinpath("snapshots")
+manifest_filename = "snapshot.json"
+package_names = ["highspy", "networkx", "numpy", "pulp"]
+
+
+def read_manifest(snapshot_path: Path) -> dict:
+    return json.loads(snapshot_path.joinpath(manifest_filename).read_text())
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "packages": {name: version(name) for name in package_names},
+    }
+
+
+def run_fixture(
+    snapshot_path: Path, fixture: dict, budgets: list[int], solver: dict, backend: str
+) -> dict:
+    """Run the pipeline stages for every budget on a working copy of the snapshot data."""
+    prices = read_prices(snapshot_path.joinpath(fixture["prices"]))
+    modifiers = read_modifiers(
+        snapshot_path.joinpath(fixture["modifiers"]) if fixture.get("modifiers") else None
+    )
+    lodging = purchased_lodging.copy()
+    lodging.update(fixture.get("lodging", {}))
+    config = make_config(budgets[0], solver, backend=backend)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        shutil.copytree(snapshot_path.joinpath("data"), data_dir, dirs_exist_ok=True)
+        ds.set_path(Path(data_dir))
+        try:
+            start_profile(True)
+            with stage("reference_data"):
+                data = generate_reference_data(config, prices, modifiers, lodging)
+            with stage("graph_data"):
+                graph_arrays = graph_to_arrays(generate_graph_data(data))
+
+            solutions = []
+            for budget in budgets:
+                data["config"]["budget"] = budget
+                graph_data = graph_from_arrays(graph_arrays, data)
+                with stage(f"budget_{budget}"):
+                    if config["reduce"]:
+                        graph_data = reduce_graph_data(graph_data, budget)
+                    with stage("heuristic"):
+                        greedy = heuristic(data, graph_data)
+                    if backend == "highspy":
+                        prob = optimize_highs(data, graph_data)
+                    else:
+                        prob = optimize(data, graph_data)
+                    with stage("workerman_data"):
+                        generate_workerman_data(prob, lodging, data, graph_data)
+                stats = solve_stats(prob, budget, 0)
+                stats["heuristic_value"] = greedy.objective_value
+                solutions.append(stats)
+        finally:
+            ds.set_path(None)
+
+    stages = profile_report() or []
+    records = {record["stage"]: record for record in stages}
+    for solution in solutions:
+        solution["seconds"] = records[f"budget_{solution['budget']}/solve"]["wall_seconds"]
+    start_profile(False)
+    return {"stages": stages, "solutions": solutions}
+
+
+def run(snapshot_names: list[str], budgets: list[int], solver: dict, backend: str) -> dict:
+    results = {"environment": environment(), "backend": backend, "solver": solver, "runs": []}
+    for name in snapshot_names:
+        snapshot_path = snapshots_path.joinpath(name)
+        manifest = read_manifest(snapshot_path)
+        for fixture_name, fixture in manifest["fixtures"].items():
+            print(f"Benchmarking snapshot '{name}' fixture '{fixture_name}'...")
+            result = run_fixture(snapshot_path, fixture, budgets, solver.copy(), backend)
+            results["runs"].append(
+                {"snapshot": name, "fixture": fixture_name, "sha": manifest.get("sha"), **result}
+            )
+    return results
+
+
+def compare(previous: dict, current: dict, threshold: float, min_seconds: float) -> list[dict]:
+    """Print the stage time ratios and objective changes from `previous` to `current` and
+    return the entries slower by more than `threshold` or with a lower objective.
+
+    Stages shorter than `min_seconds` are too noisy to count as regressions.
+    """
+
+    def entries(results: dict) -> dict:
+        table = {}
+        for run in results["runs"]:
+            for record in run["stages"]:
+                key = (run["snapshot"], run["fixture"], record["stage"])
+                table[key] = ("seconds", record["wall_seconds"])
+            for solution in run["solutions"]:
+                key = (run["snapshot"], run["fixture"], f"objective_{solution['budget']}")
+                table[key] = ("objective", solution["value"])
+                key = (run["snapshot"], run["fixture"], f"heuristic_{solution['budget']}")
+                table[key] = ("objective", solution.get("heuristic_value"))
+        return table
+
+    before, after = entries(previous), entries(current)
+    rows, regressions = [], []
+    for key, (kind, value) in after.items():
+        if key not in before:
+            continue
+        previous_value = before[key][1]
+        if kind == "seconds":
+            change = value / previous_value if previous_value else 1.0
+            regressed = change > threshold and previous_value >= min_seconds
+        else:
+            change = (value or 0) - (previous_value or 0)
+            regressed = change < -1e-6 * max(1.0, abs(previous_value or 0))
+        row = {"snapshot": key[0], "fixture": key[1], "entry": key[2]}
+        row.update({"before": previous_value, "after": value, "change": change})
+        row["regressed"] = "yes" if regressed else ""
+        rows.append(row)
+        if regressed:
+            regressions.append(row)
+    print(tabulate(rows, headers="keys", floatfmt=".3f"))
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark the empire pipeline stages on frozen data snapshots.",
+    )
+    parser.add_argument("--snapshots", nargs="+", help="snapshot names (default: all)")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[100, 300, 500])
+    parser.add_argument("--time-limit", type=float, default=60, help="seconds per solve")
+    parser.add_argument("--processes", type=int, default=1, help="solver processes")
+    parser.add_argument("--backend", default="pulp", choices=["pulp", "highspy"])
+    parser.add_argument("--out", default="benchmark_results.json", help="results json file")
+    parser.add_argument("--compare", help="previous results json file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25, help="stage time ratio counted as a regression"
+    )
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.1, help="shortest stage time to compare"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    snapshot_names = args.snapshots or sorted(
+        p.name for p in snapshots_path.glob("*") if p.joinpath(manifest_filename).is_file()
+    )
+    if not snapshot_names:
+        raise SystemExit(
+            f"No snapshots found in '{snapshots_path}', create one with `benchmarks.snapshot`."
+        )
+
+    solver = {
+        "num_processes": args.processes,
+        "mip_rel_gap": 1e-4,
+        "mip_feasibility_tolerance": 1e-4,
+        "primal_feasibility_tolerance": 1e-4,
+        "time_limit": args.time_limit,
+        "random_seed": 0,
+    }
+    results = run(snapshot_names, sorted(args.budgets), solver, args.backend)
+    Path(args.out).write_text(json.dumps(results, indent=4))
+    print("benchmark results written to:", args.out)
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        regressions = compare(previous, results, args.threshold, args.min_seconds)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regressions against '{args.compare}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# snapshot.py
+
+"""Freeze the initialized workerman data and prices/modifiers exports as a benchmark snapshot.
+
+    python -m benchmarks.snapshot NAME --fixture default prices.json modifiers.json
+                                       [--fixture other other_prices.json]
+
+The data files are copied from the package data directory (run the optimizer once to
+initialize them) into `benchmarks/snapshots/NAME/data` and each fixture's prices and
+optional modifiers files next to it, listed in `snapshot.json`.
+"""
+
+import argparse
+import json
+from pathlib import Path
+import shutil
+
+import bdo_empire.data_store as ds
+from bdo_empire.initialize import local_data_filenames, workerman_data_filenames
+
+from benchmarks.run import manifest_filename, snapshots_path
+
+
+def snapshot(name: str, fixtures: list[list[str]]) -> Path:
+    snapshot_path = snapshots_path.joinpath(name)
+    data_path = snapshot_path.joinpath("data")
+    data_path.mkdir(parents=True, exist_ok=True)
+
+    filenames = sorted(set(workerman_data_filenames + local_data_filenames + ["git_commit.txt"]))
+    for filename in filenames:
+        if not ds.is_file(filename):
+            raise FileNotFoundError(
+                f"Data file '{filename}' is missing, initialize the data first."
+            )
+        shutil.copyfile(ds.path().joinpath(filename), data_path.joinpath(filename))
+
+    manifest = {"sha": ds.read_text("git_commit.txt"), "fixtures": {}}
+    for fixture_name, *files in fixtures:
+        fixture = {}
+        for kind, filepath in zip(["prices", "modifiers"], files):
+            filename = f"{fixture_name}_{kind}.json"
+            shutil.copyfile(filepath, snapshot_path.joinpath(filename))
+            fixture[kind] = filename
+        manifest["fixtures"][fixture_name] = fixture
+
+    snapshot_path.joinpath(manifest_filename).write_text(json.dumps(manifest, indent=4))
+    print("snapshot written to:", snapshot_path)
+    return snapshot_path
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.snapshot",
+        description="Freeze the current data files and input fixtures as a benchmark snapshot.",
+    )
+    parser.add_argument("name", help="snapshot name")
+    parser.add_argument(
+        "--fixture",
+        nargs="+",
+        action="append",
+        required=True,
+        metavar="NAME PRICES [MODIFIERS]",
+        help="fixture name, prices file and optional modifiers file (repeatable)",
+    )
+    args = parser.parse_args(argv)
+    for fixture in args.fixture:
+        if len(fixture) not in [2, 3]:
+            parser.error("--fixture takes NAME PRICES [MODIFIERS]")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    snapshot(args.name, args.fixture)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# cli.py
+
+"""Headless entry point: run the empire optimization from json config files."""
+
+import argparse
+import json
+from pathlib import Path
+import textwrap
+
+from bdo_empire.initialize import initialize_data
+from bdo_empire.pipeline import (
+    make_config,
+    optimize_empire,
+    optimize_empire_sweep,
+    purchased_lodging,
+    read_modifiers,
+    read_prices,
+    solver_config,
+    write_workerman_json,
+)
+from bdo_empire.profiling import write_profile
+from bdo_empire.progress import ProgressLog
+
+
+run_config_help = textwrap.dedent(
+    """\
+    A run config looks like:
+
+        {
+            "budget": 300,
+            "prices": "path/to/custom_prices.json",
+            "modifiers": "path/to/modifiers.json",
+            "lodging": {"Velia": 0, "Heidel": 2},
+            "outpath": "path/to/output/dir",
+            "outfile": "optimized_empire.json",
+            "top_n": 4,
+            "nearest_n": 5,
+            "waypoint_ub": 25,
+            "backend": "pulp",
+            "value_engine": "numpy",
+            "reduce": true,
+            "lazy": false,
+            "solution_cache": true,
+            "heuristic": null,
+            "decompose": false,
+            "profile": false,
+            "progress": false,
+            "target_gap": 0.001,
+            "solver": {"num_processes": 4, "time_limit": 600}
+        }
+
+    Only `budget`, `prices` and `outpath` are required.
+
+      budgets         a list in place of `budget`, solved on a single graph and model
+      lodging         a dict or the path to a lodging file exported from the gui
+      solver          entries merged over the default solver config
+      backend         build the model with "pulp" or directly with "highspy"
+      value_engine    value the nodes "numpy" vectorized or with a "python" process pool
+      reduce          remove plants, lodgings and group flows unusable within the budget
+      lazy            add only the connectivity constraints a solution violates
+      solution_cache  re-use stored optimal solutions and start from the nearest one
+      heuristic       "answer" writes a greedy empire without solving the mip, "start"
+                      starts the solver from it
+      decompose       compute a Lagrangian bound first, writing the repaired empire
+                      when it is within the solver's `mip_rel_gap` of the bound
+      profile         write each stage's times, memory and model size to
+                      `{outfile stem}_profile.json` (or `sweep_profile.json`)
+      progress        write the solver's incumbent, bound, gap and nodes over time to
+                      `{outfile stem}_progress.json` (or `sweep_progress.json`)
+      target_gap      stop each solve once its gap reaches this value
+    """
+)
+
+
+def read_lodging(lodging: dict | str | None) -> dict:
+    lodging_data = purchased_lodging.copy()
+    if isinstance(lodging, str):
+        lodging = json.loads(Path(lodging).read_text())
+    for town, value in (lodging or {}).items():
+        if town not in lodging_data:
+            raise ValueError(f"Unknown lodging town: {town}")
+        lodging_data[town] = int(value)
+    return lodging_data
+
+
+def read_run_config(filepath: str | Path, overrides: dict) -> dict:
+    run_config = json.loads(Path(filepath).read_text())
+    if "budget" in run_config and "budgets" in run_config:
+        raise ValueError(f"Run config '{filepath}' has both 'budget' and 'budgets'")
+    if overrides.get("budget") is not None and "budgets" in run_config:
+        raise ValueError(f"Run config '{filepath}' has 'budgets', --budget can not override them")
+    if overrides.get("budgets") is not None:
+        run_config.pop("budget", None)
+    run_config.update({k: v for k, v in overrides.items() if v is not None})
+    if "budget" not in run_config and "budgets" not in run_config:
+        raise ValueError(f"Run config '{filepath}' is missing required key 'budget'")
+    for key in ["prices", "outpath"]:
+        if key not in run_config:
+            raise ValueError(f"Run config '{filepath}' is missing required key '{key}'")
+    return run_config
+
+
+def run(run_config: dict) -> None:
+    budgets = [int(b) for b in run_config.get("budgets", [run_config.get("budget")])]
+    solver = solver_config.copy()
+    solver.update(run_config.get("solver", {}))
+    config_settings = [
+        "name",
+        "top_n",
+        "nearest_n",
+        "waypoint_ub",
+        "backend",
+        "value_engine",
+        "reduce",
+        "lazy",
+        "solution_cache",
+        "heuristic",
+        "decompose",
+        "profile",
+    ]
+    config = make_config(
+        budgets[0],
+        solver,
+        **{k: run_config[k] for k in config_settings if k in run_config},
+    )
+    lodging = read_lodging(run_config.get("lodging"))
+    prices = read_prices(run_config["prices"])
+    modifiers = read_modifiers(run_config.get("modifiers"))
+    outpath = Path(run_config["outpath"])
+    outpath.mkdir(parents=True, exist_ok=True)
+
+    progress = None
+    if run_config.get("progress") or run_config.get("target_gap") is not None:
+        progress = ProgressLog(run_config.get("target_gap"))
+
+    if "budgets" in run_config:
+        optimize_empire_sweep(config, prices, modifiers, lodging, budgets, outpath, progress)
+        if run_config.get("progress"):
+            progress.write(outpath.joinpath("sweep_progress.json"))
+        return
+
+    workerman_json = optimize_empire(config, prices, modifiers, lodging, progress)
+    outfile = run_config.get("outfile", "optimized_empire.json")
+    outfile = write_workerman_json(workerman_json, outpath, outfile)
+    write_profile(outfile.with_name(f"{outfile.stem}_profile.json"))
+    if run_config.get("progress"):
+        progress.write(outfile.with_name(f"{outfile.stem}_progress.json"))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="empire-optimizer-cli",
+        description="Optimize a worker node empire without the gui.",
+        epilog=run_config_help,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("configs", nargs="+", help="json run config file(s), run in order")
+    parser.add_argument(
+        "--budget", type=int, help="override the budget of every run config without budgets"
+    )
+    parser.add_argument("--outpath", help="override the output directory of every run config")
+    parser.add_argument(
+        "--offline", action="store_true", help="use the local data bundle without the network"
+    )
+    parser.add_argument("--data-bundle", help="initialize the data from this data bundle file")
+    parser.add_argument(
+        "--sweep",
+        type=int,
+        nargs=3,
+        metavar=("START", "STOP", "STEP"),
+        help="solve every budget from START to STOP (inclusive) in STEP increments in place of"
+        " the budget of every run config",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.budget is not None and args.sweep:
+        raise ValueError("--budget and --sweep can not be combined")
+    overrides = {"budget": args.budget, "outpath": args.outpath}
+    if args.sweep:
+        start, stop, step = args.sweep
+        overrides["budgets"] = list(range(start, stop + 1, step))
+    run_configs = [read_run_config(filepath, overrides) for filepath in args.configs]
+
+    initialize_data(offline=args.offline, bundle=args.data_bundle)
+    for filepath, run_config in zip(args.configs, run_configs):
+        print(f"Begin optimization of '{filepath}'...")
+        run(run_config)
+        print("Completed.")
+
+
+if __name__ == "__main__":
+    main()
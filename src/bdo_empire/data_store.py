@@ -1,12 +1,44 @@
 # data_store.py
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+import hashlib
+import http.client
 import importlib.resources
 import json
+import os
 from pathlib import Path
-from urllib import request
+import tempfile
+import threading
+from urllib.parse import urlsplit
+import zipfile
+import zlib
+
+import numpy as np
+
+WORKERMAN_URL = "https://raw.githubusercontent.com/shrddr/workermanjs/refs/heads/main"
+BRANCH_URL = "https://api.github.com/repos/shrddr/workermanjs/branches/main"
+DOWNLOADS_FILENAME = "downloads.json"
+BINARY_CACHE_DIRNAME = ".binary"
+download_workers = 8
+
+data_path: Path | None = None
+# (scheme, netloc) -> idle kept alive connections shared by the download threads
+idle_connections: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+connections_lock = threading.Lock()
+# json file path -> (file stamp, numeric table arrays or json text)
+read_cache: dict[Path, tuple[tuple[int, int], dict[str, np.ndarray] | str]] = {}
+
+
+def set_path(data_dir: Path | None) -> None:
+    """Use `data_dir` for all data files instead of the package data directory (None resets)."""
+    global data_path
+    data_path = data_dir
 
 
 def path() -> Path:
+    if data_path is not None:
+        return data_path
     with importlib.resources.as_file(importlib.resources.files().joinpath("data")) as path:
         return path
 
@@ -19,48 +51,253 @@ def read_text(filename: str) -> str:
     return path().joinpath(filename).read_text(encoding="utf-8")
 
 
+def file_stamp(filepath: Path) -> tuple[int, int]:
+    stat = filepath.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_atomic(filepath: Path, mode: str, write) -> None:
+    """Call `write` with a temporary file that replaces `filepath` once fully written."""
+    encoding = None if "b" in mode else "utf-8"
+    with tempfile.NamedTemporaryFile(
+        mode, encoding=encoding, dir=filepath.parent, prefix=f".{filepath.name}.", delete=False
+    ) as data_file:
+        try:
+            write(data_file)
+        except BaseException:
+            data_file.close()
+            os.unlink(data_file.name)
+            raise
+    os.replace(data_file.name, filepath)
+
+
+def table_arrays(data) -> dict[str, np.ndarray] | None:
+    """Return the arrays of `data` if it is a numeric table, `{key: [[number, ...], ...]}`
+    with rows of one length and numbers of one type, otherwise None."""
+    if not isinstance(data, dict) or not all(isinstance(rows, list) for rows in data.values()):
+        return None
+    rows = [row for table_rows in data.values() for row in table_rows]
+    if not all(isinstance(row, list) for row in rows):
+        return None
+    if {type(value) for row in rows for value in row} not in [{int}, {float}]:
+        return None
+    try:
+        values = np.array(rows)
+    except (ValueError, OverflowError):
+        return None
+    if values.ndim != 2 or values.dtype.kind not in "if":
+        return None
+    return {
+        "keys": np.array(list(data), dtype=str),
+        "counts": np.array([len(table_rows) for table_rows in data.values()]),
+        "values": values,
+    }
+
+
+def table_data(arrays: dict[str, np.ndarray]) -> dict:
+    rows = arrays["values"].tolist()
+    data = {}
+    start = 0
+    for key, count in zip(arrays["keys"].tolist(), arrays["counts"].tolist()):
+        data[key] = rows[start : start + count]
+        start += count
+    return data
+
+
+def binary_filename(filename: str) -> str:
+    return f"{BINARY_CACHE_DIRNAME}/{filename}.npz"
+
+
+def cache_content(filename: str, content: str, data) -> None:
+    """Keep the numeric table arrays of `data`, or else the json `content`, in memory and
+    the arrays on disk as well, stamped with the json file's stamp."""
+    filepath = path().joinpath(filename)
+    stamp = file_stamp(filepath)
+    arrays = table_arrays(data)
+    if arrays is None:
+        read_cache[filepath] = (stamp, content)
+        return
+    read_cache[filepath] = (stamp, arrays)
+    try:
+        path().joinpath(BINARY_CACHE_DIRNAME).mkdir(exist_ok=True)
+        write_arrays(binary_filename(filename), {**arrays, "stamp": np.array(stamp)})
+    except OSError:
+        # Without a writable data directory the json is parsed on each new process.
+        pass
+
+
+def read_binary(filename: str, stamp: tuple[int, int]) -> dict[str, np.ndarray] | None:
+    """Return the numeric table arrays of `filename` if the binary cache file is current."""
+    try:
+        arrays = read_arrays(binary_filename(filename))
+        if tuple(arrays.pop("stamp").tolist()) != stamp:
+            return None
+    except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile, zlib.error):
+        return None
+    return arrays
+
+
 def read_json(filename: str) -> dict:
-    content = read_text(filename)
-    return json.loads(content)
+    """Read the json data of `filename`.
+
+    The first read of a numeric table, see `table_arrays`, converts it into an npz copy in
+    the data directory's `.binary` folder which later reads, also in new processes, load
+    for as long as the json file's mtime and size are unchanged. Tables are kept in memory
+    as arrays and other files as json text. Every read returns new objects so callers may
+    modify the data.
+    """
+    filepath = path().joinpath(filename)
+    stamp = file_stamp(filepath)
+    cached = read_cache.get(filepath)
+    if cached is None or cached[0] != stamp:
+        arrays = read_binary(filename, stamp)
+        if arrays is None:
+            content = read_text(filename)
+            data = json.loads(content)
+            cache_content(filename, content, data)
+            return data
+        cached = (stamp, arrays)
+        read_cache[filepath] = cached
+    if isinstance(cached[1], str):
+        return json.loads(cached[1])
+    return table_data(cached[1])
 
 
 def write_json(filename: str, data: dict | str) -> None:
+    """Write `data` as compact json, replacing `filename` only once the whole file is written."""
     if isinstance(data, str):
         try:
             data = json.loads(data)
         except json.JSONDecodeError:
             raise ValueError("Data is a string but not valid JSON")
-    with path().joinpath(filename).open("w", encoding="utf-8") as data_file:
-        json.dump(data, data_file, indent=4)
+    content = json.dumps(data, separators=(",", ":"))
+    write_atomic(path().joinpath(filename), "w", lambda f: f.write(content))
+    cache_content(filename, content, data)
 
 
-def request_content(url: str) -> str:
+def read_arrays(filename: str) -> dict[str, np.ndarray]:
+    with np.load(path().joinpath(filename), allow_pickle=False) as arrays:
+        return dict(arrays)
+
+
+def write_arrays(filename: str, arrays: dict[str, np.ndarray]) -> None:
+    write_atomic(path().joinpath(filename), "wb", lambda f: np.savez(f, **arrays))
+
+
+@cache
+def ssl_context():
     import certifi
     import ssl
 
-    context = ssl.create_default_context(cafile=certifi.where())
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def new_connection(scheme: str, netloc: str) -> http.client.HTTPConnection:
+    if scheme == "https":
+        return http.client.HTTPSConnection(netloc, timeout=60, context=ssl_context())
+    return http.client.HTTPConnection(netloc, timeout=60)
+
+
+def take_connection(scheme: str, netloc: str) -> http.client.HTTPConnection:
+    """Return an idle kept alive connection to `netloc` or a new one."""
+    with connections_lock:
+        idle = idle_connections.get((scheme, netloc))
+        if idle:
+            return idle.pop()
+    return new_connection(scheme, netloc)
+
+
+def put_connection(scheme: str, netloc: str, conn: http.client.HTTPConnection) -> None:
+    """Keep `conn` for the next request to `netloc`, by any thread."""
+    with connections_lock:
+        idle = idle_connections.setdefault((scheme, netloc), [])
+        if len(idle) < download_workers:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def request(url: str, headers: dict | None = None) -> tuple[int, bytes, str | None]:
+    """GET `url` returning the status (200 or 304), content and ETag of the response."""
+    parts = urlsplit(url)
+    target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    headers = {"User-Agent": "bdo-empire", **(headers or {})}
+    for attempt in range(2):
+        if attempt:
+            conn = new_connection(parts.scheme, parts.netloc)
+        else:
+            conn = take_connection(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", target, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+            break
+        except (http.client.HTTPException, OSError):
+            # The server may have closed the kept alive connection, retry on a new one.
+            conn.close()
+            if attempt:
+                raise
+    put_connection(parts.scheme, parts.netloc, conn)
+    if response.status not in [200, 304]:
+        raise ConnectionError(f"GET {url} failed: {response.status} {response.reason}")
+    return response.status, content, response.getheader("ETag")
+
+
+def request_content(url: str) -> str:
     try:
-        with request.urlopen(url, context=context) as response:
-            content = response.read().decode("utf-8")
+        _, content, _ = request(url)
     except Exception as e:
         print(f"Error fetching content: {e}")
         raise
-    return content
+    return content.decode("utf-8")
 
 
-def download_json(filename: str) -> None:
-    url = "https://raw.githubusercontent.com/shrddr/workermanjs/refs/heads/main/data"
+def data_url(filename: str) -> str:
     if filename in ["plantzone_drops.json", "skills.json"]:
-        url = f"{url}/manual/{filename}"
-    else:
-        url = f"{url}/{filename}"
-    content = request_content(url)
-    write_json(filename, content)
+        return f"{WORKERMAN_URL}/data/manual/{filename}"
+    return f"{WORKERMAN_URL}/data/{filename}"
+
+
+def download_json(filename: str, previous: dict | None = None) -> tuple[dict, bool]:
+    """Download `filename` unless it is unchanged from the `previous` download.
+
+    The request is conditional on the previous ETag and the file is only rewritten when
+    the content hash differs. Returns the download's `{"etag", "sha256"}` entry and
+    whether the file changed.
+    """
+    previous = previous if previous and is_file(filename) else {}
+    headers = {"If-None-Match": previous["etag"]} if previous.get("etag") else {}
+    try:
+        status, content, etag = request(data_url(filename), headers)
+    except Exception as e:
+        print(f"Error fetching `{filename}`: {e}")
+        raise
+    if status == 304:
+        return previous, False
+    digest = hashlib.sha256(content).hexdigest()
+    if digest == previous.get("sha256"):
+        return {"etag": etag, "sha256": digest}, False
+    write_json(filename, content.decode("utf-8"))
+    return {"etag": etag, "sha256": digest}, True
+
+
+def download_json_files(filenames: list[str]) -> list[str]:
+    """Download the changed `filenames` concurrently, returning the names of those changed."""
+    downloads = read_json(DOWNLOADS_FILENAME) if is_file(DOWNLOADS_FILENAME) else {}
+    filenames = list(dict.fromkeys(filenames))
+    with ThreadPoolExecutor(min(download_workers, len(filenames))) as pool:
+        results = list(pool.map(lambda f: download_json(f, downloads.get(f)), filenames))
+    changed = []
+    for filename, (entry, is_changed) in zip(filenames, results):
+        downloads[filename] = entry
+        if is_changed:
+            changed.append(filename)
+    write_json(DOWNLOADS_FILENAME, downloads)
+    return changed
 
 
 def download_sha() -> str:
-    url = "https://api.github.com/repos/shrddr/workermanjs/branches/main"
-    content = request_content(url)
+    content = request_content(BRANCH_URL)
     json_data = json.loads(content)
     return json_data["commit"]["sha"]
 
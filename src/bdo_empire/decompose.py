@@ -0,0 +1,314 @@
+# decompose.py
+
+"""Lagrangian decomposition bound of the empire problem.
+
+The mip couples the groups (towns) only through the shared budget, the waypoint and town
+nodes whose cost is paid once whichever groups use them and the plants serving a single
+group. Giving every group its own copy `z[g, v]` of the shared nodes and relaxing
+
+- the `TotalCost` budget row with multiplier `lam`,
+- the copy rows `z[g, v] <= x[v]` of the shared nodes with multipliers `mu[g, v]`,
+- the rows `sum_g z[g, p] <= 1` of plants with several groups with multipliers `pi[p]`,
+
+leaves one small independent mip per group: select plants, connect them to the group's
+town and choose a lodging tier, paying `lam * cost` for its own nodes, `mu` for the
+shared ones and `pi` for the plants. Each subproblem keeps the budget row over its own
+nodes, the shared node capacity, connectivity and group 619 rows are dropped. For any
+non-negative multipliers
+
+    L = lam * budget + sum(pi) + sum_v max(0, sum_g mu[g, v] - lam * cost[v]) + sum_g sub[g]
+
+is an upper bound of the optimum when each `sub[g]` is the group mip's dual bound. The
+multipliers are improved by subgradient steps and each iteration's plant selections are
+repaired into a feasible empire with the greedy heuristic, giving a lower bound.
+"""
+
+from collections.abc import Callable
+from multiprocessing import Pool
+import threading
+import time
+
+import numpy as np
+from pulp import LpProblem
+
+from bdo_empire.generate_graph_data import GraphData, Node
+from bdo_empire.heuristic import (
+    assignments_value,
+    empire_solution,
+    greedy_fill,
+    local_search,
+    path_types,
+    prize,
+)
+from bdo_empire.optimize_highs import HighsProblem
+from bdo_empire.profiling import stage
+from bdo_empire.solution import GreedySolution
+
+max_iterations = 100
+# Seconds of subgradient iterations, lowered to the solver's `time_limit` when it is less.
+decompose_seconds = 60.0
+# Halve the step scale after this many iterations without a better bound.
+step_patience = 3
+min_step_scale = 1e-3
+
+# The dual bound of a subproblem stopped at its time limit is still a valid bound.
+subproblem_options = {"output_flag": False, "mip_rel_gap": 1e-4, "threads": 1, "time_limit": 1.0}
+
+
+def group_nodes(G: GraphData, group: Node) -> list[Node]:
+    """Return the plant, waypoint and town nodes able to carry `group`'s flow."""
+    nodes = [v for v in G["V"].values() if v.type in path_types and group in v.groups]
+    return [v for v in nodes if not v.isPlant or group.id in v.group_prizes]
+
+
+def group_subproblem(G: GraphData, group: Node, budget: int) -> HighsProblem:
+    """Return the mip of `group` using its own copies of the nodes carrying its flow.
+
+    Columns `x_{key}` select the nodes, plants send one unit of flow to the town which
+    passes it to the group through a single chosen lodging tier. The objective is set
+    by `subproblem_costs`.
+    """
+    prob = HighsProblem(f"group_{group.id}")
+    nodes = group_nodes(G, group)
+    keys = {v.key for v in nodes}
+    x = {v.key: prob.add_var(f"x_{v.key}", 0, 1, "Binary") for v in nodes}
+
+    inflows: dict[str, list] = {key: [] for key in keys | {group.key}}
+    outflows: dict[str, list] = {key: [] for key in keys}
+    for v in nodes:
+        for arc in v.outbound_arcs:
+            destination = arc.destination
+            if destination is group or (destination.key in keys and not destination.isPlant):
+                ub = 1 if v.isPlant else group.ub
+                var = prob.add_var(f"flow_{arc.name()}", 0, ub, "Integer")
+                outflows[v.key].append(var)
+                inflows[destination.key].append(var)
+
+    for v in nodes:
+        out_terms = [(var, -1) for var in outflows[v.key]]
+        if v.isPlant:
+            prob.add_row(out_terms + [(x[v.key], 1)], 0, 0)
+        else:
+            in_terms = [(var, 1) for var in inflows[v.key]]
+            prob.add_row(in_terms + out_terms, 0, 0)
+            prob.add_row(in_terms + [(x[v.key], -v.ub)], -np.inf, 0)
+
+    lodgings = [lodging for lodging in G["L"].values() if lodging.groups[0] is group]
+    for lodging in lodgings:
+        x[lodging.key] = prob.add_var(f"x_{lodging.key}", 0, 1, "Binary")
+    prob.add_row([(x[lodging.key], 1) for lodging in lodgings], -np.inf, 1)
+    terms = [(var, 1) for var in inflows[group.key]]
+    terms += [(x[lodging.key], -lodging.ub) for lodging in lodgings]
+    prob.add_row(terms, -np.inf, 0)
+    prob.add_row([(var, G["V"][key].cost) for key, var in x.items()], -np.inf, budget)
+    return prob
+
+
+# Group subproblems of a pool worker process, set once per process by `init_pool_worker`.
+pool_subproblems: dict[str, HighsProblem] = {}
+
+
+def init_pool_worker(subproblems: dict[str, HighsProblem]) -> None:
+    global pool_subproblems
+    pool_subproblems = subproblems
+
+
+def solve_subproblem(task: tuple[str, np.ndarray]) -> tuple[str, float, list[float]]:
+    """Solve a group's mip with the column costs of `task`, returning its dual bound and
+    column values."""
+    group_id, col_cost = task
+    prob = pool_subproblems[group_id]
+    if prob.solverModel is None:
+        prob.build(subproblem_options)
+    highs = prob.solverModel
+    highs.changeColsCost(len(col_cost), np.arange(len(col_cost), dtype=np.int32), col_cost)
+    highs.run()
+    col_value = list(highs.getSolution().col_value)
+    return group_id, highs.getInfo().mip_dual_bound, col_value
+
+
+def subproblem_costs(
+    G: GraphData, group: Node, prob: HighsProblem, lam: float, mu: dict, pi: dict
+) -> np.ndarray:
+    col_cost = np.zeros(len(prob.vars))
+    for var in prob.vars:
+        if not var.name.startswith("x_"):
+            continue
+        v = G["V"][var.name[2:]]
+        if (group.id, v.key) in mu:
+            col_cost[var.index] = -mu[group.id, v.key]
+        else:
+            col_cost[var.index] = -lam * v.cost
+        if v.isPlant:
+            col_cost[var.index] += prize(v, group.id) - pi.get(v.key, 0.0)
+    return col_cost
+
+
+def objective_value(prob) -> float | None:
+    if isinstance(prob, LpProblem):
+        return prob.objective.value()
+    return prob.objective_value
+
+
+def within_gap(value: float, bound: float, mip_rel_gap: float) -> bool:
+    return bound - value <= mip_rel_gap * max(1.0, abs(bound))
+
+
+def certify(prob, bound: float, mip_rel_gap: float) -> bool:
+    """True when the value of `prob` is within `mip_rel_gap` of `bound`.
+
+    The solution is as good as an optimal one at the solver's gap but keeps its status,
+    `solution_cache` stores it as certified.
+    """
+    value = objective_value(prob)
+    return value is not None and within_gap(value, bound, mip_rel_gap)
+
+
+def bound_stop(bound: float, mip_rel_gap: float, on_progress: Callable | None) -> Callable:
+    """Return an `on_progress` stopping the solve once the incumbent is within
+    `mip_rel_gap` of `bound`, passing the events on to `on_progress`."""
+
+    def stop(event: dict) -> bool:
+        stopped = bool(on_progress(event)) if on_progress is not None else False
+        return stopped or within_gap(event["incumbent"], bound, mip_rel_gap)
+
+    return stop
+
+
+def decompose(
+    data: dict, G: GraphData, cancel: threading.Event | None = None
+) -> tuple[GreedySolution, float]:
+    """Return the best repaired empire and the Lagrangian upper bound of the optimum.
+
+    Iterates until the gap between them closes to the solver's `mip_rel_gap`, the step
+    scale vanishes, `max_iterations` or `decompose_seconds` is reached or `cancel` is set.
+    The group subproblems are solved by a pool of `num_processes` workers.
+    """
+    config = data["config"]
+    budget = config["budget"]
+    mip_rel_gap = config["solver"].get("mip_rel_gap", 1e-4)
+    seconds = min(decompose_seconds, config["solver"].get("time_limit", np.inf))
+    deadline = time.perf_counter() + seconds
+    num_processes = config["solver"]["num_processes"]
+    print(f"Decomposing into {len(G['G'])} group subproblems...")
+
+    with stage("decompose") as info:
+        groups = {group.id: group for group in G["G"].values()}
+        subproblems = {
+            group_id: group_subproblem(G, group, budget) for group_id, group in groups.items()
+        }
+        node_groups: dict[str, list[str]] = {}
+        for group in groups.values():
+            for v in group_nodes(G, group):
+                node_groups.setdefault(v.key, []).append(group.id)
+        shared = {
+            key: group_ids
+            for key, group_ids in node_groups.items()
+            if len(group_ids) > 1 and not G["V"][key].isPlant
+        }
+        plants = {
+            key: group_ids
+            for key, group_ids in node_groups.items()
+            if len(group_ids) > 1 and G["V"][key].isPlant
+        }
+
+        best = local_search(G, greedy_fill(G, {}, budget), budget)
+        lower = assignments_value(G, best)
+        lam = lower / budget if budget else 0.0
+        mu = {
+            (group_id, key): lam * G["V"][key].cost / len(group_ids)
+            for key, group_ids in shared.items()
+            for group_id in group_ids
+        }
+        pi = {key: 0.0 for key in plants}
+        upper, scale, stale, iteration = np.inf, 1.0, 0, 0
+
+        pool = Pool(num_processes, init_pool_worker, (subproblems,)) if num_processes > 1 else None
+        if pool is None:
+            init_pool_worker(subproblems)
+        try:
+            while iteration < max_iterations and time.perf_counter() < deadline:
+                if cancel is not None and cancel.is_set():
+                    break
+                iteration += 1
+                tasks = [
+                    (group_id, subproblem_costs(G, groups[group_id], prob, lam, mu, pi))
+                    for group_id, prob in subproblems.items()
+                ]
+                results = (
+                    pool.map(solve_subproblem, tasks) if pool else map(solve_subproblem, tasks)
+                )
+
+                # Selected node copies and the budget used by the nodes paid in the groups.
+                selected: set[tuple[str, str]] = set()
+                used = 0.0
+                bound = lam * budget + sum(pi.values())
+                for group_id, sub_bound, col_value in results:
+                    bound += sub_bound
+                    for var in subproblems[group_id].vars:
+                        if var.name.startswith("x_") and col_value[var.index] > 0.5:
+                            key = var.name[2:]
+                            selected.add((group_id, key))
+                            if (group_id, key) not in mu:
+                                used += G["V"][key].cost
+                x_shared = {}
+                for key, group_ids in shared.items():
+                    surplus = sum(mu[g, key] for g in group_ids) - lam * G["V"][key].cost
+                    x_shared[key] = 1.0 if surplus > 0 else 0.0
+                    bound += max(0.0, surplus)
+                    used += G["V"][key].cost * x_shared[key]
+
+                if bound < upper - 1e-6:
+                    upper, stale = bound, 0
+                else:
+                    stale += 1
+                    if stale >= step_patience:
+                        scale, stale = scale / 2, 0
+
+                candidates = {(key, g) for (g, key) in selected if G["V"][key].isPlant}
+                repaired = greedy_fill(G, greedy_fill(G, {}, budget, candidates), budget)
+                if assignments_value(G, repaired) > lower:
+                    best, lower = repaired, assignments_value(G, repaired)
+
+                gap = (upper - lower) / max(1.0, abs(upper))
+                print(
+                    f"  ...iteration {iteration}: bound {upper:,.0f} value {lower:,.0f}"
+                    f" gap {gap:.4%}"
+                )
+                if within_gap(lower, upper, mip_rel_gap) or scale < min_step_scale:
+                    break
+
+                # Subgradients of L, the multipliers move against them.
+                d_lam = budget - used
+                d_mu = {
+                    (g, key): x_shared[key] - ((g, key) in selected)
+                    for key, group_ids in shared.items()
+                    for g in group_ids
+                }
+                d_pi = {
+                    key: 1.0 - sum((g, key) in selected for g in group_ids)
+                    for key, group_ids in plants.items()
+                }
+                norm = (
+                    d_lam**2 + sum(d**2 for d in d_mu.values()) + sum(d**2 for d in d_pi.values())
+                )
+                if norm == 0:
+                    break
+                step = scale * (bound - lower) / norm
+                lam = max(0.0, lam - step * d_lam)
+                mu = {k: max(0.0, mu[k] - step * d) for k, d in d_mu.items()}
+                pi = {k: max(0.0, pi[k] - step * d) for k, d in d_pi.items()}
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        best = local_search(G, best, budget)
+        prob = empire_solution(G, best)
+        gap = (upper - prob.objective_value) / max(1.0, abs(upper))
+        info.update(
+            {"iterations": iteration, "bound": upper, "value": prob.objective_value, "gap": gap}
+        )
+
+    print(f"  ...value {prob.objective_value:,.0f} within {gap:.4%} of the bound {upper:,.0f}")
+    return prob, upper
@@ -6,6 +6,8 @@ from typing import Any, Dict, List, TypedDict
 
 import networkx as nx
 
+from bdo_empire.profiling import stage
+
 
 class GraphData(TypedDict):
     V: Dict[str, Node]
@@ -31,6 +33,25 @@ class NodeType(IntEnum):
 
 
 class Node:
+    __slots__ = (
+        "id",
+        "type",
+        "ub",
+        "lb",
+        "cost",
+        "group_prizes",
+        "groups",
+        "key",
+        "inbound_arcs",
+        "outbound_arcs",
+        "vars",
+        "isPlant",
+        "isLodging",
+        "isTown",
+        "isWaypoint",
+        "isGroup",
+    )
+
     def __init__(
         self,
         id: str,
@@ -47,7 +68,7 @@ class Node:
         self.cost = cost
         self.group_prizes: Dict[str, Dict[str, Any]] = {}
         self.groups = groups if groups else []
-        self.key = self.name()
+        self.key = id if type in [NodeType.𝓢, NodeType.𝓣] else f"{type.name}_{id}"
         self.inbound_arcs: List[Arc] = []
         self.outbound_arcs: List[Arc] = []
         self.vars = {}
@@ -58,9 +79,7 @@ class Node:
         self.isGroup = type == NodeType.group
 
     def name(self) -> str:
-        if self.type in [NodeType.𝓢, NodeType.𝓣]:
-            return self.id
-        return f"{self.type.name}_{self.id}"
+        return self.key
 
     def inSolution(self):
         x_var = self.vars.get("x", None)
@@ -97,21 +116,24 @@ class Node:
         return f"Node(name: {self.name()}, ub: {self.ub}, lb: {self.lb}, cost: {self.cost}, value: {self.group_prizes})"
 
     def __eq__(self, other) -> bool:
-        return self.name() == other.name()
+        return self.key == other.key
 
     def __hash__(self) -> int:
-        return hash((self.name()))
+        return hash(self.key)
 
 
 class Arc:
+    __slots__ = ("source", "destination", "ub", "cost", "key", "type", "vars", "arc_name")
+
     def __init__(self, source: Node, destination: Node, ub: int, cost: int = 0):
         self.source = source
         self.destination = destination
         self.ub = ub
         self.cost = cost
-        self.key = (source.name(), destination.name())
+        self.key = (source.key, destination.key)
         self.type = (source.type, destination.type)
         self.vars = {}
+        self.arc_name = f"{source.key}_to_{destination.key}"
 
     def as_dict(self) -> Dict[str, Any]:
         return {
@@ -128,16 +150,16 @@ class Arc:
         return self.source.inSolution() and self.destination.inSolution()
 
     def name(self) -> str:
-        return f"{self.source.name()}_to_{self.destination.name()}"
+        return self.arc_name
 
     def __repr__(self) -> str:
         return f"arc({self.source.name()} -> {self.destination.name()}, ub: {self.ub})"
 
     def __eq__(self, other) -> bool:
-        return (self.source, self.destination) == (other.source, other.destination)
+        return self.key == other.key
 
     def __hash__(self) -> int:
-        return hash((self.source.name() + self.destination.name()))
+        return hash(self.key)
 
 
 def add_arcs(nodes: Dict[str, Node], arcs: Dict[tuple, Arc], node_a: Node, node_b: Node):
@@ -362,7 +384,15 @@ def nearest_n_towns(ref_data: Dict[str, Any], G: GraphData, nearest_n: int):
     for arc in G["E"].values():
         weight = 999999 if "1727" in arc.name() else arc.destination.cost
         waypoint_graph.add_edge(arc.source.id, arc.destination.id, weight=weight)
-    all_pairs = dict(nx.all_pairs_bellman_ford_path_length(waypoint_graph, weight="weight"))
+
+    # Only the distances to the group towns are needed and the weights are non-negative, so
+    # run Dijkstra from each town over the reversed arcs instead of all pairs shortest paths.
+    reverse_graph = waypoint_graph.reverse(copy=False)
+    town_ids = {ref_data["group_to_town"][group.id] for group in G["G"].values()}
+    town_dists = {
+        town_id: nx.single_source_dijkstra_path_length(reverse_graph, town_id, weight="weight")
+        for town_id in town_ids
+    }
 
     nearest_towns_dist = {}
     nearest_towns = {}
@@ -372,7 +402,7 @@ def nearest_n_towns(ref_data: Dict[str, Any], G: GraphData, nearest_n: int):
             distances = []
             for group in G["G"].values():
                 town_id = ref_data["group_to_town"][group.id]
-                distances.append((group, all_pairs[node.id][town_id]))
+                distances.append((group, town_dists[town_id][node.id]))
             nearest_towns_dist[node_id] = sorted(distances, key=lambda x: x[1])[:nearest_n]
             nearest_towns[node_id] = [w for w, _ in nearest_towns_dist[node_id]]
 
@@ -381,7 +411,8 @@ def nearest_n_towns(ref_data: Dict[str, Any], G: GraphData, nearest_n: int):
 
 def finalize_groups(ref_data: Dict[str, Any], G: GraphData, nearest_n: int):
     # All group nodes have now been generated, finalize groups entries
-    nearest_towns = nearest_n_towns(ref_data, G, nearest_n)
+    with stage("nearest_n_towns"):
+        nearest_towns = nearest_n_towns(ref_data, G, nearest_n)
     for v in G["V"].values():
         if v.type in [NodeType.𝓢, NodeType.𝓣]:
             v.groups = [w for w in G["G"].values()]
@@ -391,6 +422,17 @@ def finalize_groups(ref_data: Dict[str, Any], G: GraphData, nearest_n: int):
             v.groups = [w for w in G["G"].values() if w.id in v.group_prizes.keys()]
 
 
+def make_graph_data(nodes: Dict[str, Node], arcs: Dict[tuple[str, str], Arc]) -> GraphData:
+    """Return the GraphData Dict of the nodes and arcs, both in insertion order."""
+    return {
+        "V": dict(sorted(nodes.items(), key=lambda item: item[1].type)),
+        "E": dict(sorted(arcs.items(), key=lambda item: item[1].type)),
+        "G": {k: v for k, v in nodes.items() if v.isGroup},
+        "P": {k: v for k, v in nodes.items() if v.isPlant},
+        "L": {k: v for k, v in nodes.items() if v.isLodging},
+    }
+
+
 def generate_graph_data(ref_data):
     """Generate and return a GraphData Dict composing the LP empire data."""
     print("Generating graph data...")
@@ -399,15 +441,11 @@ def generate_graph_data(ref_data):
 
     get_node(nodes, "𝓢", NodeType.𝓢, ref_data)
     get_node(nodes, "𝓣", NodeType.𝓣, ref_data)
-    process_links(nodes, arcs, ref_data)
+    with stage("process_links"):
+        process_links(nodes, arcs, ref_data)
 
-    G: GraphData = {
-        "V": dict(sorted(nodes.items(), key=lambda item: item[1].type)),
-        "E": dict(sorted(arcs.items(), key=lambda item: item[1].as_dict()["type"])),
-        "G": {k: v for k, v in nodes.items() if v.isGroup},
-        "P": {k: v for k, v in nodes.items() if v.isPlant},
-        "L": {k: v for k, v in nodes.items() if v.isLodging},
-    }
-    finalize_groups(ref_data, G, ref_data["config"]["nearest_n"])
+    G = make_graph_data(nodes, arcs)
+    with stage("finalize_groups"):
+        finalize_groups(ref_data, G, ref_data["config"]["nearest_n"])
 
     return G
@@ -1,10 +1,11 @@
 # generate_reference_data.py
 
-import hashlib
-import json
-
 import bdo_empire.data_store as ds
-from bdo_empire.generate_value_data import generate_value_data
+from bdo_empire.profiling import stage
+from bdo_empire.generate_value_data import generate_value_data, get_value_dependencies
+from bdo_empire.generate_value_data_vectorized import (
+    generate_value_data as generate_value_data_vectorized,
+)
 
 
 def get_data_files(data: dict) -> None:
@@ -12,26 +13,63 @@ def get_data_files(data: dict) -> None:
     data["all_plantzones"] = ds.read_json("plantzone.json")
     data["plantzone_drops"] = ds.read_json("plantzone_drops.json")
     data["lodging_data"] = ds.read_json("all_lodging_storage.json")
-    data["town_to_group"] = ds.read_json("town_node_translate.json")["tnk2tk"]
-    data["group_to_town"] = ds.read_json("town_node_translate.json")["tk2tnk"]
+    town_node_translate = ds.read_json("town_node_translate.json")
+    data["town_to_group"] = town_node_translate["tnk2tk"]
+    data["group_to_town"] = town_node_translate["tk2tnk"]
     data["group_to_townname"] = ds.read_json("warehouse_to_townname.json")
     data["waypoint_data"] = ds.read_json("exploration.json")
     data["waypoint_links"] = ds.read_json("deck_links.json")
 
 
+def changed_plantzones(previous: dict, prices: dict, modifiers: dict, data: dict) -> set[str]:
+    """Return the plantzones whose values depend on a price or modifier that changed."""
+    item_index, regiongroup_index = get_value_dependencies(
+        data["plantzone_drops"], data["all_plantzones"]
+    )
+    plantzones = set()
+    for key in previous["prices"].keys() | prices.keys():
+        if previous["prices"].get(key) != prices.get(key):
+            plantzones |= item_index.get(key, set())
+    for key in previous["modifiers"].keys() | modifiers.keys():
+        if previous["modifiers"].get(key) != modifiers.get(key):
+            plantzones |= regiongroup_index.get(key, set())
+    return plantzones
+
+
+def value_data_generator(config: dict):
+    """Return the node value generator selected by `config["value_engine"]`.
+
+    "numpy" (the default) values all entries as arrays in a single process while
+    "python" values towns in parallel using `num_processes` pool workers.
+    """
+    if config.get("value_engine", "numpy") == "python":
+        num_processes = config["solver"]["num_processes"]
+        return lambda *args: generate_value_data(*args, num_processes=num_processes)
+    return generate_value_data_vectorized
+
+
 def get_value_data(prices: dict, modifiers: dict, data: dict) -> None:
     print("Generating node values...")
-    sha_filename = "values_hash.txt"
-    current_sha = ds.read_text(sha_filename) if ds.is_file(sha_filename) else None
+    generate = value_data_generator(data["config"])
+    inputs_filename = "values_inputs.json"
+    data_sha = ds.read_text("git_commit.txt") if ds.is_file("git_commit.txt") else None
 
-    encoded = json.dumps({"p": prices, "m": modifiers}).encode()
-    latest_sha = hashlib.sha256(encoded).hexdigest()
+    previous = None
+    if ds.is_file(inputs_filename) and ds.is_file("node_values_per_town.json"):
+        previous = ds.read_json(inputs_filename)
+        if previous.get("sha") != data_sha:
+            previous = None
 
-    if latest_sha == current_sha:
-        print("  ...re-using existing node values data.")
+    if previous is None:
+        generate(prices, modifiers)
     else:
-        generate_value_data(prices, modifiers)
-        ds.path().joinpath(sha_filename).write_text(latest_sha)
+        plantzones = changed_plantzones(previous, prices, modifiers, data)
+        if plantzones:
+            print(f"  ...re-generating values of {len(plantzones)} changed plantzones.")
+            generate(prices, modifiers, plantzones)
+        else:
+            print("  ...re-using existing node values data.")
+    ds.write_json(inputs_filename, {"sha": data_sha, "prices": prices, "modifiers": modifiers})
 
     data["plant_values"] = ds.read_json("node_values_per_town.json")
     data["plants"] = data["plant_values"].keys()
@@ -54,7 +92,10 @@ def get_lodging_data(lodging: dict, data: dict) -> None:
 def generate_reference_data(config: dict, prices: dict, modifiers: dict, lodging: dict) -> dict:
     data = {}
     data["config"] = config
-    get_data_files(data)
-    get_value_data(prices, modifiers, data)
-    get_lodging_data(lodging, data)
+    with stage("read_data_files"):
+        get_data_files(data)
+    with stage("value_data"):
+        get_value_data(prices, modifiers, data)
+    with stage("lodging_data"):
+        get_lodging_data(lodging, data)
     return data
@@ -1,6 +1,8 @@
 # generate_value_data.py
 
+from collections.abc import Iterator
 from math import ceil
+from multiprocessing import Pool
 import bdo_empire.data_store as ds
 
 
@@ -200,9 +202,8 @@ def medianHuman(tnk: int, data: dict) -> dict:
     return makeMedianChar(7573, data)
 
 
-def optimize_skills(town: str, plantzone: int, dist: float, worker: dict, data: dict):
-    max_skills = 9
-    w_bonuses = {0: {"skills": [], "profit": 0}}
+def get_w_skills(data: dict) -> list[dict]:
+    """Return the work speed skills in descending order of work speed then movement speed."""
     w_actions = ["wspd"]
     w_actions.append("wspd_farm")
 
@@ -218,6 +219,23 @@ def optimize_skills(town: str, plantzone: int, dist: float, worker: dict, data:
             )
 
     w_skills.sort(key=lambda x: (x["amount"], x["mspd"]), reverse=True)
+    return w_skills
+
+
+def get_ml_skills(data: dict) -> set[str]:
+    """Return the movement speed and luck skills."""
+    ml_actions = ["mspd", "luck"]
+    return {
+        key
+        for key, skill in data["worker_skills"].items()
+        if any(act in skill for act in ml_actions)
+    }
+
+
+def optimize_skills(town: str, plantzone: int, dist: float, worker: dict, data: dict):
+    max_skills = 9
+    w_bonuses = {0: {"skills": [], "profit": 0}}
+    w_skills = get_w_skills(data)
 
     for i in range(1, max_skills + 1):
         temp_skills = [w["key"] for w in w_skills[:i]]
@@ -233,12 +251,7 @@ def optimize_skills(town: str, plantzone: int, dist: float, worker: dict, data:
                 if mod_profit > new_profit:
                     w_bonuses[i] = {"skills": mod_skills, "profit": mod_profit}
 
-    ml_actions = ["mspd", "luck"]
-    ml_skills = {
-        key
-        for key, skill in data["worker_skills"].items()
-        if any(act in skill for act in ml_actions)
-    }
+    ml_skills = get_ml_skills(data)
 
     step_results = [w_bonuses[max_skills]]
     ml_best_skills = []
@@ -267,7 +280,7 @@ def optimize_skills(town: str, plantzone: int, dist: float, worker: dict, data:
     return step_results[0]
 
 
-def generate_value_data(prices: dict, modifiers: dict) -> None:
+def prepare_data(prices: dict, modifiers: dict) -> dict:
     data = {}
     get_data_files(data)
     data["market_value"] = prices
@@ -276,43 +289,79 @@ def generate_value_data(prices: dict, modifiers: dict) -> None:
     # Workerman sorts by nearest node to town.
     for town in data["distances_tk2pzk"]:
         data["distances_tk2pzk"][town] = sorted(data["distances_tk2pzk"][town], key=lambda x: x[0])
+    return data
 
-    output = {}
+
+def is_valued_town(town: str) -> bool:
+    return town not in ["1375"]
+
+
+def is_valued_plantzone(plantzone: int, data: dict) -> bool:
+    if not data["plantzone"][str(plantzone)]["node"]["is_plantzone"]:
+        return False
+    if data["plantzone"][str(plantzone)]["node"]["kind"] in [12, 13]:
+        return False
+    return True
+
+
+def valued_entries(data: dict) -> Iterator[tuple[str, int, float]]:
+    """Yield the (town, plantzone, distance) entries to value in output order."""
     for town in data["distances_tk2pzk"].keys():
-        if town in ["1375"]:
+        if not is_valued_town(town):
             continue
+        for plantzone, dist in data["distances_tk2pzk"][town]:
+            if not is_valued_plantzone(plantzone, data):
+                continue
+            yield town, plantzone, dist
 
-        median_workers = {
-            "giant": medianGiant(town, data),
-            "goblin": medianGoblin(town, data),
-            "human": medianHuman(town, data),
-        }
 
-        for dist_data in data["distances_tk2pzk"][town]:
-            plantzone, dist = dist_data
-            if not data["plantzone"][str(plantzone)]["node"]["is_plantzone"]:
-                continue
-            if data["plantzone"][str(plantzone)]["node"]["kind"] in [12, 13]:
-                continue
+def get_value_dependencies(
+    plantzone_drops: dict, plantzone: dict
+) -> tuple[dict[str, set[str]], dict[str, set[str]]]:
+    """Return the item key and regiongroup key to dependent plantzone key indexes."""
+    item_index: dict[str, set[str]] = {}
+    for pzk, drop in plantzone_drops.items():
+        for bunch in ["lucky", "unlucky", "unlucky_gi"]:
+            for item_key in drop.get(bunch, {}).keys():
+                item_index.setdefault(str(item_key), set()).add(pzk)
+
+    regiongroup_index: dict[str, set[str]] = {}
+    for pzk, pz_data in plantzone.items():
+        regiongroup_index.setdefault(str(pz_data["regiongroup"]), set()).add(pzk)
+
+    return item_index, regiongroup_index
+
+
+def get_median_workers(town: str, data: dict) -> dict:
+    return {
+        "giant": medianGiant(town, data),
+        "goblin": medianGoblin(town, data),
+        "human": medianHuman(town, data),
+    }
+
 
-            optimized_workers = {
-                "giant": optimize_skills(town, plantzone, dist, median_workers["giant"], data),
-                "goblin": optimize_skills(town, plantzone, dist, median_workers["goblin"], data),
-                "human": optimize_skills(town, plantzone, dist, median_workers["human"], data),
-            }
-            optimized_worker = max(optimized_workers.items(), key=lambda item: item[1]["profit"])
-
-            if str(plantzone) not in output:
-                output[str(plantzone)] = {}
-            output[str(plantzone)][str(town)] = {}
-            output[str(plantzone)][str(town)]["worker"] = optimized_worker[0]
-            output[str(plantzone)][str(town)]["value"] = optimized_worker[1]["profit"]
-            output[str(plantzone)][str(town)]["worker_data"] = median_workers[
-                optimized_worker[0]
-            ].copy()
-            output[str(plantzone)][str(town)]["worker_data"]["skills"] = [
-                int(s) for s in optimized_worker[1]["skills"].copy()
-            ]
+def read_previous_value_data(plantzones: set[str] | None) -> dict:
+    """Return the existing node values when only `plantzones` are being re-valued."""
+    if plantzones is None:
+        return {}
+    return ds.read_json("node_values_per_town.json")
+
+
+def is_stale(town: str, plantzone: int, plantzones: set[str] | None, previous: dict) -> bool:
+    """Return whether the (town, plantzone) entry needs to be (re-)valued."""
+    if plantzones is None:
+        return True
+    return str(plantzone) in plantzones or str(town) not in previous.get(str(plantzone), {})
+
+
+def write_value_data(values: dict[tuple[str, str], dict], previous: dict, data: dict) -> None:
+    """Assemble the valued and previous (plantzone, town) entries in output order and write them."""
+    output = {}
+    for town, plantzone, _ in valued_entries(data):
+        pzk, tk = str(plantzone), str(town)
+        if pzk not in output:
+            output[pzk] = {}
+        output[pzk][tk] = values[(pzk, tk)] if (pzk, tk) in values else previous[pzk][tk]
 
     # Make the list a plantzone keyed list sorted by value in descending order for 'top_n'
     for plantzone, warehouse_data in output.copy().items():
@@ -321,3 +370,71 @@ def generate_value_data(prices: dict, modifiers: dict) -> None:
         )
 
     ds.write_json("node_values_per_town.json", output)
+
+
+def value_town(town: str, plantzone_dists: list, data: dict) -> dict[tuple[str, str], dict]:
+    """Return the optimized worker value entries of a town's (plantzone, distance) list."""
+    median_workers = get_median_workers(town, data)
+
+    values = {}
+    for plantzone, dist in plantzone_dists:
+        optimized_workers = {
+            "giant": optimize_skills(town, plantzone, dist, median_workers["giant"], data),
+            "goblin": optimize_skills(town, plantzone, dist, median_workers["goblin"], data),
+            "human": optimize_skills(town, plantzone, dist, median_workers["human"], data),
+        }
+        optimized_worker = max(optimized_workers.items(), key=lambda item: item[1]["profit"])
+
+        entry = {}
+        entry["worker"] = optimized_worker[0]
+        entry["value"] = optimized_worker[1]["profit"]
+        entry["worker_data"] = median_workers[optimized_worker[0]].copy()
+        entry["worker_data"]["skills"] = [int(s) for s in optimized_worker[1]["skills"].copy()]
+        values[(str(plantzone), str(town))] = entry
+    return values
+
+
+# Static value data of a pool worker process, set once per process by `init_pool_worker`.
+pool_data: dict = {}
+
+
+def init_pool_worker(data: dict) -> None:
+    global pool_data
+    pool_data = data
+
+
+def value_town_task(task: tuple[str, list]) -> dict[tuple[str, str], dict]:
+    town, plantzone_dists = task
+    return value_town(town, plantzone_dists, pool_data)
+
+
+def generate_value_data(
+    prices: dict, modifiers: dict, plantzones: set[str] | None = None, num_processes: int = 1
+) -> None:
+    """Generate and write `node_values_per_town.json`.
+
+    When `plantzones` is given only those plantzones (and any entries missing from the
+    existing `node_values_per_town.json`) are valued, all other entries are reused.
+    With `num_processes` > 1 towns are valued by a process pool.
+    """
+    data = prepare_data(prices, modifiers)
+    previous = read_previous_value_data(plantzones)
+
+    tasks: dict[str, list] = {}
+    for town, plantzone, dist in valued_entries(data):
+        if is_stale(town, plantzone, plantzones, previous):
+            tasks.setdefault(town, []).append((plantzone, dist))
+
+    if num_processes > 1 and len(tasks) > 1:
+        processes = min(num_processes, len(tasks))
+        with Pool(processes, initializer=init_pool_worker, initargs=(data,)) as pool:
+            results = pool.map(value_town_task, tasks.items())
+    else:
+        results = [
+            value_town(town, plantzone_dists, data) for town, plantzone_dists in tasks.items()
+        ]
+
+    values = {}
+    for result in results:
+        values.update(result)
+    write_value_data(values, previous, data)
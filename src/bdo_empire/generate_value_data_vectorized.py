@@ -0,0 +1,253 @@
+# generate_value_data_vectorized.py
+
+"""NumPy implementation of `generate_value_data`.
+
+Every (town, plantzone, worker) triple follows the same greedy skill search as
+`generate_value_data.optimize_skills` but each search step is evaluated for all
+triples and all candidate skills at once. The arithmetic is done in the same order
+as the scalar code so the output is identical.
+"""
+
+from collections.abc import Callable
+
+import numpy as np
+
+from bdo_empire.generate_value_data import (
+    get_median_workers,
+    get_ml_skills,
+    get_w_skills,
+    is_stale,
+    isGiant,
+    prepare_data,
+    price_bunch,
+    read_previous_value_data,
+    skill_bonus,
+    valued_entries,
+    write_value_data,
+)
+
+WORKER_TYPES = ["giant", "goblin", "human"]
+MAX_SKILLS = 9
+
+
+def plantzone_prices(plantzone: str, data: dict) -> dict:
+    """Return the per cycle lucky/unlucky drop values and workload inputs of a plantzone."""
+    drop = data["plantzone_drops"][plantzone]
+    luckyPart = price_bunch(drop["lucky"], data)
+    unluckyValue = price_bunch(drop["unlucky"], data)
+    unluckyValue_gi = price_bunch(drop["unlucky_gi"], data)
+
+    rgk = data["plantzone"][plantzone]["regiongroup"]
+    modifier = data["modifiers"].get(str(rgk), 0)
+    if modifier == "":
+        modifier = 0
+
+    return {
+        "luckyValue": unluckyValue + luckyPart,
+        "unluckyValue": unluckyValue,
+        "luckyValue_gi": unluckyValue_gi + luckyPart,
+        "unluckyValue_gi": unluckyValue_gi,
+        "workload": drop["workload"],
+        "modifier": modifier,
+    }
+
+
+def get_triples(
+    data: dict, include: Callable[[str, int], bool] | None = None
+) -> tuple[list[tuple[str, int, dict]], dict[str, np.ndarray]]:
+    """Return the (town, plantzone, median workers) entries and the per triple input arrays.
+
+    Triples are ordered by entry then by `WORKER_TYPES`. When given, only entries for
+    which `include(town, plantzone)` is true are returned.
+    """
+    entries = []
+    columns = {
+        k: [] for k in ["wspd", "mspd", "mspd_base", "luck", "dist", "lucky", "unlucky", "workload"]
+    }
+    columns["modifier"] = []
+    columns["sentinel"] = []
+    prices = {}
+    median_workers_by_town = {}
+
+    for town, plantzone, dist in valued_entries(data):
+        if include is not None and not include(town, plantzone):
+            continue
+        if town not in median_workers_by_town:
+            median_workers_by_town[town] = get_median_workers(town, data)
+        median_workers = median_workers_by_town[town]
+        entries.append((town, plantzone, median_workers))
+
+        if plantzone not in prices:
+            prices[plantzone] = plantzone_prices(str(plantzone), data)
+        pz_prices = prices[plantzone]
+
+        for worker_type in WORKER_TYPES:
+            worker = median_workers[worker_type]
+            is_giant = isGiant(worker["charkey"], data)
+            columns["wspd"].append(worker["wspd"])
+            columns["mspd"].append(worker["mspd"])
+            columns["mspd_base"].append(data["worker_static"][str(worker["charkey"])]["mspd"] / 100)
+            columns["luck"].append(worker["luck"])
+            columns["dist"].append(dist)
+            columns["lucky"].append(pz_prices["luckyValue_gi" if is_giant else "luckyValue"])
+            columns["unlucky"].append(pz_prices["unluckyValue_gi" if is_giant else "unluckyValue"])
+            columns["workload"].append(pz_prices["workload"])
+            columns["modifier"].append(pz_prices["modifier"])
+            columns["sentinel"].append(dist == 9999999)
+
+    triples = {k: np.array(v, dtype=np.float64) for k, v in columns.items() if k != "sentinel"}
+    triples["sentinel"] = np.array(columns["sentinel"], dtype=bool)
+    return entries, triples
+
+
+def profit(bonus: dict, triples: dict[str, np.ndarray]) -> np.ndarray:
+    """Vectorized `profit()`, `bonus` entries broadcast against the triple arrays."""
+    wspd = triples["wspd"] + bonus["wspd"]
+    mspd_base = triples["mspd_base"]
+    mspd = mspd_base * ((triples["mspd"] / mspd_base) + bonus["mspd"] / 100)
+    luck = triples["luck"] + bonus["luck"]
+
+    cycleValue = (luck / 100) * triples["lucky"] + (1 - luck / 100) * triples["unlucky"]
+
+    moveMinutes = 2 * triples["dist"] / mspd / 60
+    activeWorkload = triples["workload"] * (2 - triples["modifier"] / 100)
+    workMinutes = np.ceil(activeWorkload / wspd)
+    cycleMinutes = 10 * workMinutes + moveMinutes
+    cyclesDaily = 24 * 60 / cycleMinutes
+
+    priceDaily = cyclesDaily * cycleValue
+    return np.where(triples["sentinel"], 0.0, priceDaily)
+
+
+def add_skill_bonus(bonus: dict, skill: dict) -> dict:
+    """Add a skill's bonuses to `bonus` in the same order as `skill_bonus()`."""
+    return {
+        "wspd": bonus["wspd"] + skill["wspd"] + skill["wspd_farm"],
+        "mspd": bonus["mspd"] + skill["mspd"],
+        "luck": bonus["luck"] + skill["luck"],
+    }
+
+
+def optimize_skills(
+    triples: dict[str, np.ndarray], data: dict
+) -> tuple[np.ndarray, Callable[[int], list]]:
+    """Vectorized `optimize_skills()` over all triples.
+
+    Returns the best profit of each triple and a function returning the skill list of
+    a triple index.
+    """
+    num_triples = len(triples["wspd"])
+    w_skills = get_w_skills(data)
+    wm_skills = [ss for ss in w_skills if ss["mspd"] > 0]
+
+    # Work speed phase: the candidate skill sets are the same for all triples.
+    w_sets: dict[int, list[list[str]]] = {0: [[]]}
+    w_profits: dict[int, np.ndarray] = {0: np.zeros(num_triples)}
+    w_choice: dict[int, np.ndarray] = {0: np.zeros(num_triples, dtype=np.intp)}
+    for i in range(1, MAX_SKILLS + 1):
+        temp_skills = [w["key"] for w in w_skills[:i]]
+        w_sets[i] = [temp_skills]
+        w_profits[i] = profit(skill_bonus(temp_skills, data), triples)
+        w_choice[i] = np.zeros(num_triples, dtype=np.intp)
+
+        if all(not data["worker_skills"][sk].get("mspd", 0) for sk in temp_skills) and wm_skills:
+            mod_skills = temp_skills.copy()
+            mod_skills[-1] = wm_skills[0]["key"]
+            w_sets[i].append(mod_skills)
+            mod_profit = profit(skill_bonus(mod_skills, data), triples)
+            use_mod = mod_profit > w_profits[i]
+            w_profits[i] = np.where(use_mod, mod_profit, w_profits[i])
+            w_choice[i] = use_mod.astype(np.intp)
+
+    # Movement speed and luck phase: candidates depend on each triple's previous picks.
+    ml_skills = list(get_ml_skills(data))
+    ml_stats = {
+        stat: np.array(
+            [data["worker_skills"][sk].get(stat, 0) for sk in ml_skills], dtype=np.float64
+        )
+        for stat in ["wspd", "wspd_farm", "mspd", "luck"]
+    }
+    no_skill = {stat: 0 for stat in ["wspd", "wspd_farm", "mspd", "luck"]}
+    rows = np.arange(num_triples)
+    removed = np.zeros((num_triples, len(ml_skills)), dtype=bool)
+    ml_best = []
+    step_profits = [w_profits[MAX_SKILLS]]
+    for i in range(1, MAX_SKILLS + 1):
+        w_i = MAX_SKILLS - i
+        set_bonuses = [skill_bonus(skills, data) for skills in w_sets[w_i]]
+        bonus = {
+            stat: np.choose(w_choice[w_i], [sb[stat] for sb in set_bonuses])
+            for stat in ["wspd", "mspd", "luck"]
+        }
+        for best in ml_best:
+            has_skill = best >= 0
+            picked = {
+                stat: np.where(has_skill, values[best], no_skill[stat])
+                for stat, values in ml_stats.items()
+            }
+            bonus = add_skill_bonus(bonus, picked)
+
+        in_w_sets = np.array([[sk in skills for sk in ml_skills] for skills in w_sets[w_i]])
+        valid = ~removed & ~in_w_sets[w_choice[w_i]]
+
+        candidate_bonus = add_skill_bonus(
+            {stat: value[:, None] for stat, value in bonus.items()}, ml_stats
+        )
+        candidate_triples = {k: v[:, None] for k, v in triples.items()}
+        candidate_profits = np.where(valid, profit(candidate_bonus, candidate_triples), -np.inf)
+
+        has_candidate = valid.any(axis=1)
+        best = np.argmax(candidate_profits, axis=1)
+        step_profits.append(np.where(has_candidate, candidate_profits[rows, best], -np.inf))
+        removed[rows[has_candidate], best[has_candidate]] = True
+        ml_best.append(np.where(has_candidate, best, -1))
+
+    step_profits = np.stack(step_profits)
+    best_step = np.argmax(step_profits, axis=0)
+    best_profit = step_profits[best_step, rows]
+
+    def skills_of(triple: int) -> list:
+        step = best_step[triple]
+        w_i = MAX_SKILLS - step
+        skills = list(w_sets[w_i][w_choice[w_i][triple]])
+        for best in ml_best[:step]:
+            skills.append(ml_skills[best[triple]] if best[triple] >= 0 else 0)
+        return skills
+
+    return best_profit, skills_of
+
+
+def generate_value_data(prices: dict, modifiers: dict, plantzones: set[str] | None = None) -> None:
+    """Generate and write `node_values_per_town.json`.
+
+    When `plantzones` is given only those plantzones (and any entries missing from the
+    existing `node_values_per_town.json`) are valued, all other entries are reused.
+    """
+    data = prepare_data(prices, modifiers)
+    previous = read_previous_value_data(plantzones)
+
+    def include(town: str, plantzone: int) -> bool:
+        return is_stale(town, plantzone, plantzones, previous)
+
+    entries, triples = get_triples(data, include)
+
+    values = {}
+    if entries:
+        best_profit, skills_of = optimize_skills(triples, data)
+        best_profit = best_profit.reshape(-1, len(WORKER_TYPES))
+        best_worker = np.argmax(best_profit, axis=1)
+        sentinel = triples["sentinel"].reshape(-1, len(WORKER_TYPES))[:, 0]
+
+        for i, (town, plantzone, median_workers) in enumerate(entries):
+            worker_type = WORKER_TYPES[best_worker[i]]
+            value = 0 if sentinel[i] else float(best_profit[i, best_worker[i]])
+            skills = skills_of(i * len(WORKER_TYPES) + best_worker[i])
+
+            entry = {}
+            entry["worker"] = worker_type
+            entry["value"] = value
+            entry["worker_data"] = median_workers[worker_type].copy()
+            entry["worker_data"]["skills"] = [int(s) for s in skills]
+            values[(str(plantzone), str(town))] = entry
+
+    write_value_data(values, previous, data)
@@ -8,7 +8,9 @@ import networkx as nx
 from pulp import LpProblem
 from tabulate import tabulate
 
-from bdo_empire.generate_graph_data import GraphData
+from bdo_empire.generate_graph_data import GraphData, NodeType as NT
+from bdo_empire.profiling import stage
+from bdo_empire.solution import EmpireSolution, solution_of
 
 
 def get_workerman_json(workers, ref_data, lodging):
@@ -46,6 +48,14 @@ def make_workerman_worker(town_id: int, origin_id: int, worker_data: dict, stash
     return worker
 
 
+def town_distances(graph: nx.DiGraph, town_ids: set[str]) -> dict[str, dict[str, float]]:
+    """Return the shortest path lengths from each of `town_ids` to every reachable node."""
+    return {
+        town_id: nx.single_source_dijkstra_path_length(graph, town_id, weight="weight")
+        for town_id in town_ids
+    }
+
+
 def order_workerman_workers(graph, user_workers: list[dict], solution_distances):
     """Order user workers into import order for correct workerman paths construction."""
 
@@ -55,12 +65,15 @@ def order_workerman_workers(graph, user_workers: list[dict], solution_distances)
     workerman_user_workers = [user_workers[i] for i, _ in distance_indices]
 
     # Iterative ordering of user workers by shortest paths with weight removal on used arcs.
+    # Distances are only needed from the workers' towns and only change when weights are removed.
     ordered_workers = []
+    dists = None
     while workerman_user_workers:
+        if dists is None:
+            dists = town_distances(graph, {str(w["tnk"]) for w in workerman_user_workers})
         distances = []
-        all_pairs = dict(nx.all_pairs_bellman_ford_path_length(graph, weight="weight"))
         for worker in workerman_user_workers:
-            distance = all_pairs[str(worker["tnk"])][str(worker["job"]["pzk"])]
+            distance = dists[str(worker["tnk"])][str(worker["job"]["pzk"])]
             distances.append(distance)
         min_value = min(distances)
         min_indice = distances.index(min_value)
@@ -73,81 +86,50 @@ def order_workerman_workers(graph, user_workers: list[dict], solution_distances)
             if graph.edges[(s, d)]["weight"] >= 1:
                 for edge in graph.in_edges(d):
                     graph.edges[edge]["weight"] = 0
+                dists = None
                 break
 
     return ordered_workers
 
 
-def generate_graph(graph_data: GraphData, prob):
+def generate_graph(solution: EmpireSolution) -> nx.DiGraph:
+    """Return the graph of the flow carrying arcs between plants, waypoints, towns and
+    groups, reversed to run from the towns and weighted by the arc source's cost."""
     graph = nx.DiGraph()
-    exclude_keywords = ["lodging", "𝓢", "𝓣"]
-
-    for var_key, var in prob.variablesDict().items():
-        if not round(var.varValue) >= 1:
-            continue
-        exclude = any(keyword in var_key for keyword in exclude_keywords)
-        if exclude:
+    excluded_types = [NT.𝓢, NT.𝓣, NT.lodging]
+    for arc, _, _ in solution.arcs:
+        source, destination = arc.source, arc.destination
+        if source.type in excluded_types or destination.type in excluded_types:
             continue
-
-        u, v = None, None
-        if "groupflow_" in var_key and "_on_" in var_key:
-            tmp = var_key.split("_on_")
-            tmp = tmp[1].split("_to_")
-            u = tmp[0]
-            v = tmp[1]
-        else:
-            continue
-
-        source, destination = u, v
-        weight = graph_data["V"][source].cost
-        graph.add_edge(destination.split("_")[1], source.split("_")[1], weight=weight)
-
+        graph.add_edge(destination.id, source.id, weight=source.cost)
     return graph
 
 
-def extract_solution(prob) -> tuple[dict, dict, dict]:
-    lodging_vars = {}
-    origin_vars = {}
-    waypoint_vars = {}
-    for k, v in prob.variablesDict().items():
-        if not round(v.varValue) >= 1:
-            continue
-        if k.startswith("flow_lodging_") and "_to_" not in k:
-            lodging_vars[k.replace("flow_", "")] = v
-        elif "_on_plant_" in k:
-            origin_vars[k.split("_")[4]] = k.split("_")[1]
-        elif k.startswith("x_waypoint") or k == "x_town_1343":
-            waypoint_vars[k.replace("x_", "")] = v
-    return lodging_vars, origin_vars, waypoint_vars
-
-
-def process_solution(origin_vars: dict, data: dict, graph_data: GraphData, graph: nx.DiGraph):
-    all_pairs = dict(nx.all_pairs_bellman_ford_path_length(graph, weight="weight"))
+def process_solution(solution: EmpireSolution, data: dict, graph: nx.DiGraph):
+    town_ids = {data["group_to_town"][v] for v in solution.plants.values()}
+    town_dists = town_distances(graph, town_ids)
 
     calculated_value = 0
     distances = []
-    origin_cost = 0
     outputs = []
-    town_ids = set()
     workerman_user_workers = []
     root_ranks = []
     stash_town_id = 601
-    for k, v in origin_vars.items():
+    for origin, v in solution.plants.items():
         town_id = data["group_to_town"][v]
-        town_ids.add(town_id)
-        distances.append(all_pairs[town_id][k])
+        distances.append(town_dists[town_id][origin.id])
 
-        origin = graph_data["V"][f"plant_{k}"]
         worker_data = origin.group_prizes[v]["worker_data"]
         user_worker = make_workerman_worker(int(town_id), int(origin.id), worker_data, stash_town_id)
         workerman_user_workers.append(user_worker)
 
         value = origin.group_prizes[v]["value"]
         worker = origin.group_prizes[v]["worker"]
-        root_rank = list(origin.group_prizes.keys()).index(v) + 1
+        # Ranked among all of the plant's prizes, `reduce_graph_data` prunes `group_prizes`.
+        prizes = [k for k, prize in data["plant_values"][origin.id].items() if prize["value"] != 0]
+        root_rank = prizes.index(v) + 1
         root_ranks.append(root_rank)
 
-        origin_cost += origin.cost
         calculated_value += value
 
         output = {
@@ -159,20 +141,37 @@ def process_solution(origin_vars: dict, data: dict, graph_data: GraphData, graph
         }
         outputs.append(output)
 
-    return calculated_value, distances, origin_cost, outputs, workerman_user_workers
+    return calculated_value, distances, outputs, workerman_user_workers
+
+
+def print_summary(outputs, solution: EmpireSolution, data: dict, total_value: float):
+    """Print town, origin, worker summary report.
 
+    Active towns with a cost are counted with the waypoints.
+    """
+    towns = [town for town in solution.towns if town.cost > 0]
+    counts = {"origins": len(solution.plants), "waypoints": len(solution.waypoints) + len(towns)}
+    costs = {
+        "lodgings": sum(lodging.cost for lodging in solution.lodgings),
+        "origins": sum(plant.cost for plant in solution.plants),
+        "waypoints": sum(v.cost for v in solution.waypoints + towns),
+    }
+    by_groups = Counter(solution.plants.values()).most_common()
 
-def print_summary(outputs, counts: dict, costs: dict, total_value: float):
-    """Print town, origin, worker summary report."""
     outputs = natsort.natsorted(outputs, key=lambda x: (x["warehouse"], x["node"]))
     colalign = ("right", "right", "left", "right", "right")
-    print(tabulate(outputs, headers="keys", colalign=colalign))
-    print("By Town:\n\n", tabulate([[k, v] for k, v in counts["by_groups"].items()]), "\n")
+    if outputs:
+        print(tabulate(outputs, headers="keys", colalign=colalign))
+    by_towns = [[data["group_to_townname"][k], v] for k, v in by_groups]
+    print("By Town:\n\n", tabulate(by_towns), "\n")
     print("  Lodging cost:", costs["lodgings"])
     print("  Worker Nodes:", counts["origins"], "cost:", costs["origins"])
     print("     Waypoints:", counts["waypoints"], "cost:", costs["waypoints"])
     print("    Total Cost:", sum(c for c in costs.values()))
     print("         Value:", locale.currency(round(total_value), grouping=True, symbol=True)[:-3])
+    for town in towns:
+        townname = data["group_to_townname"].get(data["town_to_group"].get(town.id), town.key)
+        print(f"{townname} active (cost {town.cost}) and included with waypoints.")
 
 
 def generate_workerman_data(
@@ -181,25 +180,15 @@ def generate_workerman_data(
     print("Creating workerman json...")
     locale.setlocale(locale.LC_ALL, "")
 
-    graph = generate_graph(graph_data, prob)
-    lodging_vars, origin_vars, waypoint_vars = extract_solution(prob)
-    solution = process_solution(origin_vars, data, graph_data, graph)
-    calculated_value, distances, origin_cost, outputs, workerman_user_workers = solution
-    workerman_ordered_workers = order_workerman_workers(graph, workerman_user_workers, distances)
+    solution = EmpireSolution(solution_of(prob), graph_data)
+    graph = generate_graph(solution)
+    solution_data = process_solution(solution, data, graph)
+    calculated_value, distances, outputs, workerman_user_workers = solution_data
+    with stage("order_workerman_workers"):
+        workerman_ordered_workers = order_workerman_workers(
+            graph, workerman_user_workers, distances
+        )
     workerman_json = get_workerman_json(workerman_ordered_workers, data, lodging)
 
-    counts: dict = {"origins": len(origin_vars), "waypoints": len(waypoint_vars)}
-    counts["by_groups"] = {
-        str(data["group_to_townname"][k]): v for k, v in Counter(origin_vars.values()).most_common()
-    }
-    costs = {
-        "lodgings": sum(graph_data["V"][k].cost for k in lodging_vars.keys()),
-        "origins": origin_cost,
-        "waypoints": sum(graph_data["V"][k].cost for k in waypoint_vars.keys()),
-    }
-
-    print_summary(outputs, counts, costs, calculated_value)
-    if "town_1343" in waypoint_vars.keys():
-        print("Ancado Inner Harbor active (cost 1) and included with waypoints.")
-
+    print_summary(outputs, solution, data, calculated_value)
     return workerman_json
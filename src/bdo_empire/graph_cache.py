@@ -0,0 +1,189 @@
+# graph_cache.py
+
+"""On-disk cache of the generated graph.
+
+The graph is stored as flat arrays of node attributes and arc endpoints together with
+a fingerprint of every input `generate_graph_data` reads. When the fingerprint matches
+`GraphData` is rebuilt from the arrays without re-running the link processing,
+sparsification and nearest town searches.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict
+import zipfile
+import zlib
+
+import numpy as np
+
+import bdo_empire.data_store as ds
+from bdo_empire.profiling import stage
+from bdo_empire.generate_graph_data import (
+    Arc,
+    GraphData,
+    Node,
+    NodeType,
+    generate_graph_data,
+    make_graph_data,
+)
+
+GRAPH_CACHE_FILENAME = "graph_cache.npz"
+
+# Bump when graph generation changes so existing caches are rebuilt.
+GRAPH_CACHE_VERSION = 1
+
+graph_config_keys = ["top_n", "nearest_n", "waypoint_ub"]
+graph_data_keys = [
+    "all_plantzones",
+    "group_to_town",
+    "lodging_data",
+    "max_ub",
+    "plant_values",
+    "plants",
+    "town_to_group",
+    "towns",
+    "waypoint_data",
+    "waypoint_links",
+]
+
+
+def graph_fingerprint(ref_data: Dict[str, Any]) -> str:
+    """Return a hash of the config settings and reference data the graph is built from."""
+    inputs = {
+        "version": GRAPH_CACHE_VERSION,
+        "config": {k: ref_data["config"][k] for k in graph_config_keys},
+        "data": {k: ref_data[k] for k in graph_data_keys},
+    }
+    content = json.dumps(inputs, sort_keys=True, default=list)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def index_ranges(lists: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    """Return `lists` as (start, index) arrays, list i is `index[start[i] : start[i + 1]]`."""
+    start, index = [0], []
+    for entries in lists:
+        index.extend(entries)
+        start.append(len(index))
+    return np.array(start, dtype=np.int32), np.array(index, dtype=np.int32)
+
+
+def graph_to_arrays(G: GraphData) -> dict[str, np.ndarray]:
+    """Return the nodes and arcs of `G` as flat arrays.
+
+    Node groups and arc lists are stored as index ranges so their order is kept. Plant
+    group prizes store only the group ids, the values are re-read from `plant_values`.
+    """
+    nodes = list(G["V"].values())
+    arcs = list(G["E"].values())
+    node_index = {node.key: i for i, node in enumerate(nodes)}
+    arc_index = {arc.key: i for i, arc in enumerate(arcs)}
+
+    arrays = {
+        "node_id": np.array([node.id for node in nodes], dtype=str),
+        "node_type": np.array([int(node.type) for node in nodes], dtype=np.int8),
+        "node_ub": np.array([node.ub for node in nodes]),
+        "node_lb": np.array([node.lb for node in nodes]),
+        "node_cost": np.array([node.cost for node in nodes]),
+        "arc_source": np.array([node_index[arc.source.key] for arc in arcs], dtype=np.int32),
+        "arc_destination": np.array(
+            [node_index[arc.destination.key] for arc in arcs], dtype=np.int32
+        ),
+        "arc_ub": np.array([arc.ub for arc in arcs]),
+        "prize_group": np.array(
+            [group_id for node in nodes for group_id in node.group_prizes], dtype=str
+        ),
+    }
+    arrays["prize_start"], _ = index_ranges([list(node.group_prizes) for node in nodes])
+    arrays["groups_start"], arrays["groups_index"] = index_ranges(
+        [[node_index[group.key] for group in node.groups] for node in nodes]
+    )
+    arrays["inbound_start"], arrays["inbound_index"] = index_ranges(
+        [[arc_index[arc.key] for arc in node.inbound_arcs] for node in nodes]
+    )
+    arrays["outbound_start"], arrays["outbound_index"] = index_ranges(
+        [[arc_index[arc.key] for arc in node.outbound_arcs] for node in nodes]
+    )
+    return arrays
+
+
+def graph_from_arrays(arrays: dict[str, np.ndarray], ref_data: Dict[str, Any]) -> GraphData:
+    """Rebuild the GraphData Dict written by `graph_to_arrays`.
+
+    The graph is rebuilt eagerly rather than on first access. `reduce_graph_data`, the
+    models and the heuristic walk every node's groups and arcs as soon as the graph is
+    returned and modify the nodes in place, so deferring the rebuild would only move the
+    work of a few milliseconds.
+    """
+    node_types = {int(node_type): node_type for node_type in NodeType}
+    node_list = [
+        Node(node_id, node_types[node_type], ub, lb, cost)
+        for node_id, node_type, ub, lb, cost in zip(
+            arrays["node_id"].tolist(),
+            arrays["node_type"].tolist(),
+            arrays["node_ub"].tolist(),
+            arrays["node_lb"].tolist(),
+            arrays["node_cost"].tolist(),
+        )
+    ]
+    arc_list = [
+        Arc(node_list[source], node_list[destination], ub=ub)
+        for source, destination, ub in zip(
+            arrays["arc_source"].tolist(),
+            arrays["arc_destination"].tolist(),
+            arrays["arc_ub"].tolist(),
+        )
+    ]
+
+    def ranges(name: str, values: list) -> list[list]:
+        start = arrays[f"{name}_start"].tolist()
+        return [values[start[i] : start[i + 1]] for i in range(len(node_list))]
+
+    groups = ranges("groups", [node_list[j] for j in arrays["groups_index"].tolist()])
+    inbound = ranges("inbound", [arc_list[j] for j in arrays["inbound_index"].tolist()])
+    outbound = ranges("outbound", [arc_list[j] for j in arrays["outbound_index"].tolist()])
+    prizes = ranges("prize", arrays["prize_group"].tolist())
+    nodes: Dict[str, Node] = {}
+    for i, node in enumerate(node_list):
+        node.groups = groups[i]
+        node.inbound_arcs = inbound[i]
+        node.outbound_arcs = outbound[i]
+        for group_id in prizes[i]:
+            node.group_prizes[group_id] = ref_data["plant_values"][node.id][group_id]
+        nodes[node.key] = node
+
+    arcs = {arc.key: arc for arc in arc_list}
+    return make_graph_data(nodes, arcs)
+
+
+def read_graph_cache(fingerprint: str, ref_data: Dict[str, Any]) -> GraphData | None:
+    if not ds.is_file(GRAPH_CACHE_FILENAME):
+        return None
+    try:
+        arrays = ds.read_arrays(GRAPH_CACHE_FILENAME)
+    except (OSError, EOFError, ValueError, zipfile.BadZipFile, zlib.error) as e:
+        print(f"  ...ignoring unreadable graph cache: {e}")
+        return None
+    if str(arrays.get("fingerprint")) != fingerprint:
+        return None
+    return graph_from_arrays(arrays, ref_data)
+
+
+def write_graph_cache(fingerprint: str, G: GraphData) -> None:
+    arrays = graph_to_arrays(G)
+    arrays["fingerprint"] = np.array(fingerprint)
+    ds.write_arrays(GRAPH_CACHE_FILENAME, arrays)
+
+
+def get_graph_data(ref_data: Dict[str, Any]) -> GraphData:
+    """Return the cached graph for `ref_data` or generate and cache it."""
+    with stage("graph_data") as info:
+        fingerprint = graph_fingerprint(ref_data)
+        G = read_graph_cache(fingerprint, ref_data)
+        info["cached"] = G is not None
+        if G is not None:
+            print("Re-using cached graph data...")
+        else:
+            G = generate_graph_data(ref_data)
+            write_graph_cache(fingerprint, G)
+        info.update({"nodes": len(G["V"]), "arcs": len(G["E"])})
+    return G
@@ -0,0 +1,212 @@
+# heuristic.py
+
+"""Greedy empire construction giving a feasible solution without the mip solver.
+
+Plants are added one at a time, each time taking the plant -> group assignment with the
+highest value per added cost that still fits the budget. An assignment's cost is its
+cheapest path of plant, waypoint and town nodes to the group's town, with the nodes
+already paid for costing nothing, plus the step to the group's next lodging tier. A
+local search then drops each assignment in turn and re-fills the freed budget greedily,
+keeping the result whenever the value improves.
+
+Node capacities (`waypoint_ub`) are respected so the solution satisfies every row of
+the model and can be used as a mip start. Group 619, whose town connection needs one
+of the model's fixed waypoint sets, is not assigned plants.
+"""
+
+import heapq
+from math import inf
+import time
+
+from bdo_empire.generate_graph_data import GraphData, Node, NodeType as NT
+from bdo_empire.profiling import stage
+from bdo_empire.solution import GreedySolution
+from bdo_empire.solution_cache import lodging_node
+
+path_types = [NT.plant, NT.waypoint, NT.town]
+excluded_groups = ["619"]
+local_search_seconds = 0.5
+
+# plant key -> (group id, path node keys from the plant to the group's town)
+Assignments = dict[str, tuple[str, list[str]]]
+
+
+def prize(plant: Node, group_id: str) -> float:
+    return round(plant.group_prizes[group_id]["value"], 2)
+
+
+def town_paths(
+    G: GraphData, group: Node, active: set[str], load: dict[str, int]
+) -> dict[str, tuple[float, str | None]]:
+    """Return `{node key: (cost, next node key)}` of the cheapest paths to `group`'s town.
+
+    Paths use the plant, waypoint and town nodes carrying the group's flow with spare
+    capacity, active nodes cost nothing.
+    """
+    paths: dict[str, tuple[float, str | None]] = {}
+    heap = []
+    for arc in group.inbound_arcs:
+        town = arc.source
+        if group in town.groups and load.get(town.key, 0) < town.ub:
+            heap.append((0 if town.key in active else town.cost, town.key, ""))
+    heapq.heapify(heap)
+    while heap:
+        cost, key, next_key = heapq.heappop(heap)
+        if key in paths:
+            continue
+        paths[key] = (cost, next_key or None)
+        node = G["V"][key]
+        if node.isPlant:
+            continue
+        for arc in node.inbound_arcs:
+            other = arc.source
+            if other.key in paths or other.type not in path_types or group not in other.groups:
+                continue
+            if load.get(other.key, 0) >= other.ub:
+                continue
+            other_cost = 0 if other.key in active else other.cost
+            heapq.heappush(heap, (cost + other_cost, other.key, key))
+    return paths
+
+
+def solution_nodes(G: GraphData, assignments: Assignments) -> tuple[set[str], dict, float]:
+    """Return the active node keys, node loads and cost of `assignments`."""
+    nodes = {"𝓢", "𝓣"}
+    load: dict[str, int] = {}
+    counts: dict[str, int] = {}
+    for group_id, path in assignments.values():
+        nodes.update(path)
+        for key in path:
+            load[key] = load.get(key, 0) + 1
+        counts[group_id] = counts.get(group_id, 0) + 1
+    for group_id, count in counts.items():
+        lodging = lodging_node(G, group_id, count)
+        if lodging is None:
+            return nodes, load, inf
+        nodes.update([f"group_{group_id}", lodging.key])
+    return nodes, load, sum(G["V"][key].cost for key in nodes)
+
+
+def lodging_step(G: GraphData, group_id: str, count: int) -> float:
+    """Return the added lodging cost of a group's `count + 1`th plant."""
+    lodging = lodging_node(G, group_id, count + 1)
+    if lodging is None:
+        return inf
+    previous = lodging_node(G, group_id, count) if count else None
+    return lodging.cost - (previous.cost if previous else 0)
+
+
+def greedy_fill(
+    G: GraphData,
+    assignments: Assignments,
+    budget: int,
+    candidates: set[tuple[str, str]] | None = None,
+) -> Assignments:
+    """Add the best value per cost assignments to `assignments` while they fit `budget`.
+
+    With `candidates` only those `(plant key, group id)` assignments are added. A group's
+    cheapest paths are kept until an added path passes a node able to carry its flow.
+    """
+    assignments = dict(assignments)
+    nodes, load, cost = solution_nodes(G, assignments)
+    group_paths: dict[str, dict[str, tuple[float, str | None]]] = {}
+    while True:
+        counts: dict[str, int] = {}
+        for group_id, _ in assignments.values():
+            counts[group_id] = counts.get(group_id, 0) + 1
+
+        best = None
+        for group in G["G"].values():
+            if group.id in excluded_groups or counts.get(group.id, 0) >= group.ub:
+                continue
+            step = lodging_step(G, group.id, counts.get(group.id, 0))
+            if cost + step > budget:
+                continue
+            paths = None
+            for plant in G["P"].values():
+                if plant.key in assignments or group not in plant.groups:
+                    continue
+                if candidates is not None and (plant.key, group.id) not in candidates:
+                    continue
+                if paths is None:
+                    if group.id not in group_paths:
+                        group_paths[group.id] = town_paths(G, group, nodes, load)
+                    paths = group_paths[group.id]
+                if plant.key not in paths:
+                    continue
+                added = paths[plant.key][0] + step
+                if cost + added > budget:
+                    continue
+                value = prize(plant, group.id)
+                ratio = value / added if added > 0 else inf
+                if best is None or (ratio, value) > best[0]:
+                    best = ((ratio, value), plant, group, paths)
+
+        if best is None:
+            return assignments
+        _, plant, group, paths = best
+        path, key = [], plant.key
+        while key is not None:
+            path.append(key)
+            key = paths[key][1]
+        assignments[plant.key] = (group.id, path)
+        nodes, load, cost = solution_nodes(G, assignments)
+        for key in path:
+            for changed in G["V"][key].groups:
+                group_paths.pop(changed.id, None)
+
+
+def assignments_value(G: GraphData, assignments: Assignments) -> float:
+    return sum(prize(G["P"][key], group_id) for key, (group_id, _) in assignments.items())
+
+
+def local_search(G: GraphData, assignments: Assignments, budget: int) -> Assignments:
+    """Drop each assignment in turn, re-fill greedily and keep any improvement."""
+    deadline = time.perf_counter() + local_search_seconds
+    value = assignments_value(G, assignments)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for key in sorted(assignments, key=lambda k: prize(G["P"][k], assignments[k][0])):
+            if time.perf_counter() >= deadline:
+                break
+            if key not in assignments:
+                continue
+            remaining = {k: v for k, v in assignments.items() if k != key}
+            candidate = greedy_fill(G, remaining, budget)
+            candidate_value = assignments_value(G, candidate)
+            if candidate_value > value + 1e-6:
+                assignments, value, improved = candidate, candidate_value, True
+    return assignments
+
+
+def empire_solution(G: GraphData, assignments: Assignments) -> GreedySolution:
+    """Return the solution of `assignments`, each plant's flow running from the source
+    along its path to the group, its lodging and the sink."""
+    nodes, _, _ = solution_nodes(G, assignments)
+    counts: dict[str, int] = {}
+    for group_id, _ in assignments.values():
+        counts[group_id] = counts.get(group_id, 0) + 1
+    lodgings = {group_id: lodging_node(G, group_id, n).key for group_id, n in counts.items()}
+    flows: dict[tuple[tuple[str, str], str], int] = {}
+    for group_id, path in assignments.values():
+        keys = ["𝓢"] + path + [f"group_{group_id}", lodgings[group_id], "𝓣"]
+        for arc_key in zip(keys, keys[1:]):
+            flows[arc_key, group_id] = flows.get((arc_key, group_id), 0) + 1
+    return GreedySolution(assignments_value(G, assignments), nodes, flows)
+
+
+def heuristic(data: dict, G: GraphData) -> GreedySolution:
+    """Return the greedy empire of `G` for `data["config"]["budget"]`."""
+    print("Building greedy empire...")
+    budget = data["config"]["budget"]
+    with stage("heuristic") as info:
+        assignments = greedy_fill(G, {}, budget)
+        greedy_value = assignments_value(G, assignments)
+        assignments = local_search(G, assignments, budget)
+        solution = empire_solution(G, assignments)
+        info.update({"greedy_value": greedy_value, "value": solution.objective_value})
+    print(
+        f"  ...greedy value {greedy_value:,.0f}, after local search {solution.objective_value:,.0f}"
+    )
+    return solution
@@ -1,8 +1,20 @@
 # initialize.py
 
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
+from pathlib import Path
+import zipfile
+import zlib
+
 import bdo_empire.data_store as ds
 
+DATA_BUNDLE_FILENAME = "data_bundle.zip"
+BUNDLE_MANIFEST_FILENAME = "manifest.json"
+
+# Raised reading a truncated, corrupt or incomplete data bundle.
+bundle_errors = (zipfile.BadZipFile, zlib.error, EOFError, OSError, KeyError, ValueError)
+
 
 workerman_data_filenames = [
     # Used for node value generation
@@ -29,7 +41,7 @@ local_data_filenames = [
 def extract_tk2tnk_from_js() -> None:
     import re
 
-    url = "https://raw.githubusercontent.com/shrddr/workermanjs/refs/heads/main/src/stores/game.js"
+    url = f"{ds.WORKERMAN_URL}/src/stores/game.js"
     js_content = ds.request_content(url)
 
     # re to match the _tk2tnk dictionary
@@ -54,7 +66,7 @@ def extract_tk2tnk_from_js() -> None:
 
 
 def extract_town_names() -> dict:
-    url = "https://raw.githubusercontent.com/shrddr/workermanjs/refs/heads/main/data/loc.json"
+    url = f"{ds.WORKERMAN_URL}/data/loc.json"
     json_content = ds.request_content(url)
     json_data = json.loads(json_content)
     json_data = json_data["en"]["town"]
@@ -69,30 +81,147 @@ def generate_warehouse_to_town_names(town_names: dict) -> None:
 
 
 def initialize_workerman_data(last_sha: str) -> None:
-    for filename in workerman_data_filenames:
-        print(f"Getting `{filename}`...", end="")
-        ds.download_json(filename)
-        print("complete.")
-
-    print("Generating `town_node_translate.json`...", end="")
-    extract_tk2tnk_from_js()
-    print("complete.")
-
-    print("Extracting town name list...", end="")
-    town_names = extract_town_names()
-    print("complete.")
+    # The data files, town translation and town names are fetched concurrently and only
+    # the data files changed since the previous download are rewritten.
+    filenames = list(dict.fromkeys(workerman_data_filenames))
+    print(f"Getting {len(filenames)} data files, town translations and town names...")
+    with ThreadPoolExecutor(3) as pool:
+        changed = pool.submit(ds.download_json_files, filenames)
+        translations = pool.submit(extract_tk2tnk_from_js)
+        town_names = pool.submit(extract_town_names)
+        changed, _, town_names = changed.result(), translations.result(), town_names.result()
+    print(f"  ...{len(changed)} changed: {', '.join(changed) if changed else 'none'}")
 
     print("Generating warehouse to town name list...", end="")
     generate_warehouse_to_town_names(town_names)
     print("complete.")
 
     ds.path().joinpath("git_commit.txt").write_text(last_sha)
-
-
-def initialize_data() -> None:
-    # Any error in initialization is fatal and is raised via urllib.
+    write_data_bundle()
+
+
+def data_filenames() -> list[str]:
+    return sorted(set(workerman_data_filenames + local_data_filenames))
+
+
+def local_sha() -> str | None:
+    return ds.read_text("git_commit.txt") if ds.is_file("git_commit.txt") else None
+
+
+def file_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def bundle_path() -> Path:
+    return ds.path().joinpath(DATA_BUNDLE_FILENAME)
+
+
+def write_data_bundle(filepath: str | Path | None = None) -> Path:
+    """Write the data files, their sha256 digests and the data sha as a single archive."""
+    filepath = Path(filepath) if filepath else bundle_path()
+    manifest = {"sha": local_sha(), "files": {}}
+    with zipfile.ZipFile(filepath, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for filename in data_filenames():
+            content = ds.path().joinpath(filename).read_bytes()
+            manifest["files"][filename] = file_digest(content)
+            bundle.writestr(filename, content)
+        bundle.writestr(BUNDLE_MANIFEST_FILENAME, json.dumps(manifest, indent=4))
+    return filepath
+
+
+def read_bundle_manifest(filepath: str | Path) -> dict:
+    with zipfile.ZipFile(filepath) as bundle:
+        return json.loads(bundle.read(BUNDLE_MANIFEST_FILENAME))
+
+
+def data_matches_bundle(manifest: dict) -> bool:
+    """Return True when the local data files are the bundle's files and version."""
+    if local_sha() != manifest["sha"]:
+        return False
+    for filename, digest in manifest["files"].items():
+        if not ds.is_file(filename):
+            return False
+        if file_digest(ds.path().joinpath(filename).read_bytes()) != digest:
+            return False
+    return True
+
+
+def read_data_bundle(filepath: str | Path | None = None) -> str:
+    """Verify the bundle's files against their digests, unpack them and return its sha."""
+    filepath = Path(filepath) if filepath else bundle_path()
+    with zipfile.ZipFile(filepath) as bundle:
+        manifest = json.loads(bundle.read(BUNDLE_MANIFEST_FILENAME))
+        missing = set(data_filenames()) - manifest["files"].keys()
+        if missing:
+            raise ValueError(f"Data bundle '{filepath}' is missing {sorted(missing)}")
+        contents = {}
+        for filename, digest in manifest["files"].items():
+            contents[filename] = bundle.read(filename)
+            if file_digest(contents[filename]) != digest:
+                raise ValueError(f"Data bundle '{filepath}' file '{filename}' is corrupt")
+
+    for filename, content in contents.items():
+        ds.path().joinpath(filename).write_bytes(content)
+    ds.path().joinpath("git_commit.txt").write_text(manifest["sha"])
+    if filepath != bundle_path():
+        write_data_bundle()
+    return manifest["sha"]
+
+
+def initialize_offline_data(filepath: str | Path | None = None) -> None:
+    """Initialize the data files from the data bundle without using the network.
+
+    Local files differing from the bundle are restored from it, without a bundle the local
+    files are used as they are. An unreadable local bundle is treated as missing and written
+    again from the local files, an unreadable given bundle raises a `ValueError`.
+    """
+    filepath = Path(filepath) if filepath else bundle_path()
+    if filepath.is_file():
+        try:
+            if filepath != bundle_path() or not data_matches_bundle(read_bundle_manifest(filepath)):
+                print(f"Unpacking data bundle '{filepath}'...")
+                read_data_bundle(filepath)
+            return
+        except bundle_errors as e:
+            if filepath != bundle_path():
+                raise ValueError(f"Data bundle '{filepath}' is unreadable: {e}") from e
+            print(f"  ...ignoring unreadable data bundle '{filepath}': {e}")
+            filepath.unlink(missing_ok=True)
+    if not ds.initialized(local_sha(), data_filenames()):
+        raise FileNotFoundError(
+            "No data files or data bundle are available, initialize the data once online."
+        )
+    if not bundle_path().is_file():
+        write_data_bundle()
+
+
+def check_for_update() -> str | None:
+    """Return the latest data sha when it differs from the local data, None when the data
+    is current or the check fails."""
+    try:
+        last_sha = ds.download_sha()
+    except Exception:
+        return None
+    return None if last_sha == local_sha() else last_sha
+
+
+def initialize_data(offline: bool = False, bundle: str | Path | None = None) -> None:
+    """Make sure the data files are initialized.
+
+    Online the data is updated whenever the workermanjs repository changes and any error is
+    fatal: a `ConnectionError` for a failed response, `http.client.HTTPException` or
+    `OSError` when the connection fails after a retry and `ValueError` for unexpected
+    content. With `offline` or a `bundle` file the network is not used and the data comes
+    from the (verified) data bundle, see `initialize_offline_data`.
+    """
     print("Checking data files...")
+    if offline or bundle:
+        initialize_offline_data(bundle)
+        print("Initialized...")
+        return
     last_sha = ds.download_sha()
-    if not ds.initialized(last_sha, workerman_data_filenames + local_data_filenames):
+    if not ds.initialized(last_sha, data_filenames()):
         initialize_workerman_data(last_sha)
+    elif not bundle_path().is_file():
+        write_data_bundle()
     print("Initialized...")
@@ -2,61 +2,26 @@
 
 from enum import Enum
 import json
-from math import inf
 from pathlib import Path
-from random import randint
+import queue
+import threading
 from tkinter import DISABLED, NORMAL, filedialog
+import traceback
 
 import customtkinter as ctk
 from CTkToolTip import CTkToolTip as ctktt
-from psutil import cpu_count
-
-from bdo_empire.initialize import initialize_data
-from bdo_empire.generate_graph_data import generate_graph_data
-from bdo_empire.generate_reference_data import generate_reference_data
-from bdo_empire.generate_workerman_data import generate_workerman_data
-from bdo_empire.optimize import optimize
-
-
-solver_config = {
-    "num_processes": max(1, cpu_count(logical=False) - 1),
-    "mip_rel_gap": 1e-4,
-    "mip_feasibility_tolerance": 1e-4,
-    "primal_feasibility_tolerance": 1e-4,
-    "time_limit": inf,
-    "random_seed": randint(0, 2147483647),
-}
-
-purchased_lodging = {
-    "Velia": 0,
-    "Heidel": 0,
-    "Glish": 0,
-    "Calpheon City": 0,
-    "Olvia": 0,
-    "Keplan": 0,
-    "Port Epheria": 0,
-    "Trent": 0,
-    "Iliya Island": 0,
-    "Altinova": 0,
-    "Tarif": 0,
-    "Valencia City": 0,
-    "Shakatu": 0,
-    "Sand Grain Bazaar": 0,
-    "Ancado Inner Harbor": 0,
-    "Arehaza": 0,
-    "Old Wisdom Tree": 0,
-    "Grána": 0,
-    "Duvencrune": 0,
-    "O'draxxia": 0,
-    "Eilton": 0,
-    "Dalbeol Village": 0,
-    "Nampo's Moodle Village": 0,
-    "Nopsae's Byeot County": 0,
-    "Muzgar": 0,
-    "Yukjo Street": 0,
-    "Godu Village": 0,
-    "Bukpo": 0,
-}
+
+from bdo_empire.initialize import check_for_update, initialize_data, local_sha
+from bdo_empire.pipeline import (
+    make_config,
+    optimize_empire,
+    purchased_lodging,
+    read_modifiers,
+    read_prices,
+    solver_config,
+    write_workerman_json,
+)
+from bdo_empire.solution import NoSolutionError
 
 
 class WidgetState(Enum):
@@ -73,9 +38,9 @@ class EmpireOptimizerApp(ctk.CTk):
         super().__init__()
 
         self.title("Empire Optimizer")
-        self.geometry("660x300")
+        self.geometry("660x510")
 
-        self.data_state = WidgetState.Required
+        self.data_state = WidgetState.Ready
         self.prices_state = WidgetState.Required
         self.modifiers_state = WidgetState.Optional
         self.lodging_state = WidgetState.Optional
@@ -83,10 +48,29 @@ class EmpireOptimizerApp(ctk.CTk):
         self.outpath_state = WidgetState.Required
         self.optimize_state = WidgetState.Waiting
 
+        self.optimize_thread: threading.Thread | None = None
+        self.cancel_event = threading.Event()
+        self.progress_queue = queue.Queue()
+        self.data_update: str | None = None
+        self.data_queue = queue.Queue()
+
         self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.check_data_update()
 
     def create_widgets(self):
         row = 0
+        self.data_label = ctk.CTkLabel(self, text="Data")
+        self.data_label.grid(row=row, column=0, padx=10, pady=10)
+        self.data_version = ctk.CTkLabel(self, text=data_version())
+        self.data_version.grid(row=row, column=1, padx=10, pady=10)
+        self.data_button = ctk.CTkButton(
+            self, text="Update Data", command=self.update_data, state=DISABLED
+        )
+        self.data_button.grid(row=row, column=2, padx=10, pady=10)
+        self.data_status = ctk.CTkLabel(self, text=self.data_state.name)
+        self.data_status.grid(row=row, column=3, padx=10, pady=10)
+        ctktt(self.data_button, message="Download the workerman data update when one is available.")
 
         row += 1
         self.cp_label = ctk.CTkLabel(self, text="CP Limit")
@@ -150,6 +134,15 @@ class EmpireOptimizerApp(ctk.CTk):
         self.optimize_status.grid(row=row, column=3, padx=10, pady=10)
         self.config_button = ctk.CTkButton(self, text="Config Solver", command=self.config_solver)
         self.config_button.grid(row=row, column=2, padx=10, pady=10)
+        self.cancel_button = ctk.CTkButton(
+            self, text="Cancel", command=self.cancel_optimize, state=DISABLED, width=80
+        )
+        self.cancel_button.grid(row=row, column=0, padx=10, pady=10)
+        ctktt(self.cancel_button, message="Stop the optimization and keep the best solution found.")
+
+        row += 1
+        self.progress_box = ctk.CTkTextbox(self, height=140, state=DISABLED)
+        self.progress_box.grid(row=row, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
 
     def browse_prices_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
@@ -350,6 +343,8 @@ class EmpireOptimizerApp(ctk.CTk):
             and self.lodging_state is not WidgetState.Error
             and self.cp_state is WidgetState.Ready
             and self.outpath_state is WidgetState.Ready
+            and self.optimize_state is not WidgetState.Running
+            and self.data_state is not WidgetState.Running
         ):
             self.optimize_state = WidgetState.Ready
             self.optimize_button.configure(state=NORMAL)
@@ -393,43 +388,170 @@ class EmpireOptimizerApp(ctk.CTk):
         print("Begin optimization...")
         self.optimize_state = WidgetState.Running
         self.optimize_status.configure(text=self.optimize_state.name, text_color="green")
-        self.optimize_status.update()
-
-        config = {}
-        config["name"] = "Empire"
-        config["budget"] = int(self.cp_entry.get())
-        config["top_n"] = 4
-        config["nearest_n"] = 5
-        config["waypoint_ub"] = 25
-        config["solver"] = solver_config
-
-        lodging = purchased_lodging
-        prices = json.loads(Path(self.prices_entry.get()).read_text())["effectivePrices"]
-        modifiers = (
-            json.loads(Path(self.modifiers_entry.get()).read_text())["regionModifiers"]
-            if self.modifiers_entry.get()
-            else {}
+        self.optimize_button.configure(state=DISABLED)
+        self.cancel_button.configure(state=NORMAL)
+        self.data_button.configure(state=DISABLED)
+        self.clear_progress()
+
+        config = make_config(int(self.cp_entry.get()), solver_config.copy())
+        lodging = purchased_lodging.copy()
+        prices = read_prices(self.prices_entry.get())
+        modifiers = read_modifiers(self.modifiers_entry.get())
+        outpath = self.outpath_entry.get()
+
+        # The pipeline runs in a worker thread, widgets are only updated from `poll_optimize`.
+        self.cancel_event.clear()
+        self.optimize_thread = threading.Thread(
+            target=self.run_optimize,
+            args=(config, prices, modifiers, lodging, outpath),
+            daemon=True,
         )
+        self.optimize_thread.start()
+        self.after(200, self.poll_optimize)
 
-        data = generate_reference_data(config, prices, modifiers, lodging)
-        graph_data = generate_graph_data(data)
-        prob = optimize(data, graph_data)
-        workerman_json = generate_workerman_data(prob, lodging, data, graph_data)
+    def run_optimize(self, config, prices, modifiers, lodging, outpath):
+        try:
+            workerman_json = optimize_empire(
+                config, prices, modifiers, lodging, self.on_progress, self.cancel_event
+            )
+            write_workerman_json(workerman_json, outpath, "optimized_empire.json")
+            message = (
+                "Cancelled, best solution found written."
+                if self.cancel_event.is_set()
+                else "Completed."
+            )
+            self.progress_queue.put(("done", message))
+        except NoSolutionError as e:
+            if e.cancelled:
+                self.progress_queue.put(("done", str(e)))
+            else:
+                self.progress_queue.put(("error", f"Error: {e}"))
+        except Exception as e:
+            traceback.print_exc()
+            self.progress_queue.put(("error", f"Error: {e}"))
+
+    def on_progress(self, event: dict) -> None:
+        """Called from the solver, forwards the event, `cancel_event` stops the pipeline."""
+        self.progress_queue.put(("progress", event))
+
+    def cancel_optimize(self):
+        print("Cancelling optimization...")
+        self.cancel_event.set()
+        self.cancel_button.configure(state=DISABLED)
+        self.write_progress("Cancelling, waiting for the solver to stop...")
+
+    def poll_optimize(self):
+        while True:
+            try:
+                kind, message = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.write_progress(format_progress(message))
+            else:
+                print(message)
+                self.write_progress(message)
+                self.finish_optimize(kind == "error")
+                return
+        self.after(200, self.poll_optimize)
+
+    def finish_optimize(self, failed: bool):
+        self.cancel_button.configure(state=DISABLED)
+        if self.data_update is not None:
+            self.data_button.configure(state=NORMAL)
+        if failed:
+            self.optimize_state = WidgetState.Error
+            self.optimize_status.configure(text=self.optimize_state.name, text_color="red")
+        else:
+            self.optimize_state = WidgetState.Waiting
+            self.optimize_status.configure(text=self.optimize_state.name)
+        self.update_optimize_button_state()
 
-        outpath = Path(self.outpath_entry.get())
-        outfile = outpath.joinpath("optimized_empire.json")
-        with open(outfile, "w") as json_file:
-            json.dump(workerman_json, json_file, indent=4)
-        print("workerman json written to:", outfile)
-        print("Completed.")
+    def clear_progress(self):
+        self.progress_box.configure(state=NORMAL)
+        self.progress_box.delete("1.0", ctk.END)
+        self.progress_box.configure(state=DISABLED)
+
+    def write_progress(self, line: str):
+        self.progress_box.configure(state=NORMAL)
+        self.progress_box.insert(ctk.END, line + "\n")
+        self.progress_box.see(ctk.END)
+        self.progress_box.configure(state=DISABLED)
+
+    def check_data_update(self):
+        # The data in use is already initialized, only the latest version is looked up.
+        threading.Thread(
+            target=lambda: self.data_queue.put(("checked", check_for_update())), daemon=True
+        ).start()
+        self.after(500, self.poll_data)
+
+    def update_data(self):
+        print("Updating data...")
+        self.data_state = WidgetState.Running
+        self.data_status.configure(text=self.data_state.name, text_color="green")
+        self.data_button.configure(state=DISABLED)
+        self.update_optimize_button_state()
+        threading.Thread(target=self.run_update_data, daemon=True).start()
+        self.after(500, self.poll_data)
+
+    def run_update_data(self):
+        try:
+            initialize_data()
+            self.data_queue.put(("updated", None))
+        except Exception as e:
+            traceback.print_exc()
+            self.data_queue.put(("error", f"Error: {e}"))
+
+    def poll_data(self):
+        try:
+            kind, message = self.data_queue.get_nowait()
+        except queue.Empty:
+            self.after(500, self.poll_data)
+            return
+
+        if kind == "error":
+            print(message)
+            self.data_state = WidgetState.Error
+            self.data_status.configure(text=self.data_state.name, text_color="red")
+            self.data_button.configure(state=NORMAL)
+        elif kind == "checked" and message is not None:
+            print(f"Data update available: {message}")
+            self.data_update = message
+            self.data_status.configure(text="Update Available")
+            if self.optimize_state is not WidgetState.Running:
+                self.data_button.configure(state=NORMAL)
+        elif kind == "updated":
+            self.data_update = None
+            self.data_state = WidgetState.Ready
+            self.data_status.configure(text=self.data_state.name)
+            self.data_version.configure(text=data_version())
+        self.update_optimize_button_state()
 
-        self.optimize_state = WidgetState.Waiting
-        self.optimize_status.configure(text=self.optimize_state.name)
-        self.optimize_status.update()
+    def close(self):
+        # Stops a running solve, parallel solver processes exit with the app.
+        self.cancel_event.set()
+        self.destroy()
+
+
+def format_progress(event: dict) -> str:
+    return (
+        f"[{event['worker']}] {event['time']:7.1f}s  value {event['incumbent']:,.0f}"
+        f"  bound {event['bound']:,.0f}  gap {event['gap']:.2%}  nodes {event['nodes']}"
+    )
+
+
+def data_version() -> str:
+    sha = local_sha()
+    return f"workermanjs {sha[:7]}" if sha else "workermanjs unknown"
 
 
 def main():
-    initialize_data()
+    # Start from the local data bundle, the network is only needed on the first run.
+    try:
+        initialize_data(offline=True)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        initialize_data()
     app = EmpireOptimizerApp()
     app.mainloop()
 
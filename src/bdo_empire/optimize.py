@@ -1,9 +1,26 @@
 # optimize.py
 
-from pulp import HiGHS, LpVariable, lpSum, LpProblem, LpMaximize
+from collections.abc import Callable
+from math import inf
+
+import numpy as np
+from pulp import (
+    HiGHS,
+    LpConstraint,
+    LpVariable,
+    lpSum,
+    LpProblem,
+    LpMaximize,
+    LpSolutionOptimal,
+    LpStatusOptimal,
+)
 
 from bdo_empire.generate_graph_data import Arc, GraphData, Node, NodeType as NT
 from bdo_empire.optimize_par import solve_par
+from bdo_empire.profiling import stage
+from bdo_empire.progress import watch_progress
+from bdo_empire.solution import NoSolutionError, lp_statuses, solution_status
+from bdo_empire.solution_cache import apply_mip_start
 
 
 def filter_arcs(v: Node, groupflow: str, arcs: list[Arc]) -> list[Arc]:
@@ -28,8 +45,29 @@ def link_in_out_by_group(prob: LpProblem, v: Node, in_arcs: list[Arc], out_arcs:
     prob += f <= v.ub * v.vars["x"], f"x_{v.name()}"
 
 
+def connectivity_constraints(G: GraphData) -> list[LpConstraint]:
+    """Return the neighbor count constraints of every node, requiring active nodes to have
+    active neighbors to pass flow through."""
+    constraints = []
+    for node in G["V"].values():
+        if node.type in [NT.S, NT.T]:
+            continue
+
+        in_neighbors = [arc.source.vars["x"] for arc in node.inbound_arcs]
+        out_neighbors = [arc.destination.vars["x"] for arc in node.outbound_arcs]
+        if node.isWaypoint:
+            constraints.append(lpSum(in_neighbors) - 2 * node.vars["x"] >= 0)
+        else:
+            constraints.append(lpSum(in_neighbors) + lpSum(out_neighbors) - 2 * node.vars["x"] >= 0)
+        constraints.append(lpSum(out_neighbors) >= node.vars["x"])
+    return constraints
+
+
 def create_problem(config: dict, G: GraphData) -> LpProblem:
-    """Create the problem and add the variables and constraints."""
+    """Create the problem and add the variables and constraints.
+
+    With `config["lazy"]` set the connectivity constraints are left out, see `solve_lazy`.
+    """
 
     prob = LpProblem(config["name"], LpMaximize)
 
@@ -70,17 +108,9 @@ def create_problem(config: dict, G: GraphData) -> LpProblem:
     link_in_out_by_group(prob, G["V"]["𝓣"], G["V"]["𝓣"].inbound_arcs, G["V"]["𝓢"].outbound_arcs)
     prob += G["V"]["𝓢"].vars["x"] == 1, "x_source"
 
-    for node in G["V"].values():
-        if node.type in [NT.S, NT.T]:
-            continue
-
-        in_neighbors = [arc.source.vars["x"] for arc in node.inbound_arcs]
-        out_neighbors = [arc.destination.vars["x"] for arc in node.outbound_arcs]
-        if node.isWaypoint:
-            prob += lpSum(in_neighbors) - 2 * node.vars["x"] >= 0
-        else:
-            prob += lpSum(in_neighbors) + lpSum(out_neighbors) - 2 * node.vars["x"] >= 0
-        prob += lpSum(out_neighbors) >= node.vars["x"]
+    if not config["lazy"]:
+        for constraint in connectivity_constraints(G):
+            prob += constraint
 
     # Edge case handling.
     # If group 619 is active it must be connected to a near town.
@@ -98,7 +128,140 @@ def create_problem(config: dict, G: GraphData) -> LpProblem:
     return prob
 
 
-def optimize(data: dict, graph_data: GraphData) -> LpProblem:
+def model_size(prob: LpProblem) -> dict:
+    return {
+        "rows": prob.numConstraints(),
+        "columns": prob.numVariables(),
+        "nonzeros": sum(1 for c in prob.constraints.values() for v in c.values() if v != 0),
+    }
+
+
+def solve(
+    prob: LpProblem,
+    solver: HiGHS,
+    on_progress: Callable | None = None,
+    mip_start: dict[str, float] | None = None,
+) -> None:
+    """`prob.solve(solver)` sending the solver progress to `on_progress`, see `progress`,
+    and starting from the partial solution `mip_start`, see `solution_cache`."""
+    solver.createAndConfigureSolver(prob)
+    solver.buildSolverModel(prob)
+    apply_mip_start(prob.solverModel, prob.variables(), mip_start)
+    if on_progress is not None:
+        watch_progress(prob.solverModel, on_progress, -1)
+    solver.callSolver(prob)
+    assign_solution(prob)
+
+
+def resolve(prob: LpProblem, mip_start: dict[str, float] | None = None) -> None:
+    """Re-run the solver model built by `solve`, starting from the partial solution
+    `mip_start`."""
+    apply_mip_start(prob.solverModel, prob.variables(), mip_start)
+    prob.solverModel.run()
+    assign_solution(prob)
+
+
+def assign_solution(prob: LpProblem) -> None:
+    """Assign the solution and status of the solved `prob.solverModel` to `prob`.
+
+    pulp's `findSolutionValues` has no status for solves stopped by `on_progress`, the
+    HiGHS model status is mapped with `solution_status` instead. A `NoSolutionError` is
+    raised when the solve ended without a solution.
+    """
+    highs = prob.solverModel
+    model_status = highs.modelStatusToString(highs.getModelStatus())
+    solution = highs.getSolution()
+    if not solution.value_valid:
+        raise NoSolutionError(model_status)
+    col_value = solution.col_value
+    for var in prob.variables():
+        var.varValue = col_value[var.index]
+    sol_status = solution_status(model_status, highs.getInfo().objective_function_value)
+    prob.assignStatus(lp_statuses[sol_status], sol_status)
+
+
+def is_satisfied(constraint: LpConstraint, eps: float = 0.5) -> bool:
+    """`constraint.valid(eps)` taking variables without a value as 0.
+
+    Variables only appearing in constraints not yet added to the problem have no value.
+    """
+    value = constraint.constant
+    for var, coefficient in constraint.items():
+        value += coefficient * (var.varValue or 0)
+    return value * constraint.sense >= -eps
+
+
+def add_model_constraint(prob: LpProblem, constraint: LpConstraint) -> None:
+    """Add `constraint` to the problem and, the way pulp's `buildSolverModel` adds rows, to
+    the solver model when it has been built."""
+    prob += constraint
+    highs = getattr(prob, "solverModel", None)
+    if highs is None:
+        return
+    terms = [(var.index, coefficient) for var, coefficient in constraint.items() if coefficient]
+    lb, ub = constraint.getLb(), constraint.getUb()
+    index = np.array([i for i, _ in terms], dtype=np.int32)
+    value = np.array([c for _, c in terms], dtype=np.float64)
+    highs.addRow(-inf if lb is None else lb, inf if ub is None else ub, len(terms), index, value)
+
+
+def lazy_start(constraints: list[LpConstraint], violated: list[LpConstraint]) -> dict[str, float]:
+    """Return the values of the constraints' variables in the current solution as a partial
+    start, leaving the variables of the `violated` constraints for the solver to complete."""
+    free = {var.name for constraint in violated for var in constraint.keys()}
+    return {
+        var.name: round(var.varValue or 0)
+        for constraint in constraints
+        for var in constraint.keys()
+        if var.name not in free
+    }
+
+
+def solve_lazy(
+    prob: LpProblem,
+    constraints: list[LpConstraint],
+    solve_once: Callable,
+    mip_start: dict[str, float] | None = None,
+) -> LpProblem:
+    """Solve with `solve_once(prob, start, target)`, adding the violated `constraints` and
+    re-solving until an optimal solution satisfies them all.
+
+    The connectivity constraints only cut off solutions paying for nodes that carry no
+    flow, so the model without them has the same optimal value and few are ever added.
+    The first solve starts from `mip_start`, each re-solve from the previous solution with
+    the nodes of the violated constraints left free, see `lazy_start`. The previous optimal
+    value bounds the re-solve's value so the re-solve is optimal as soon as a solution
+    reaches it, `target` stops the solver there. Solves stopped early (time limit or
+    `on_progress`) end the loop with their solution.
+    """
+    pending = list(constraints)
+    start, target = mip_start, None
+    iteration = 1
+    while True:
+        prob = solve_once(prob, start, target)
+        if target is not None and prob.objective.value() >= target:
+            prob.assignStatus(LpStatusOptimal, LpSolutionOptimal)
+        if prob.sol_status != LpSolutionOptimal:
+            return prob
+        violated = [constraint for constraint in pending if not is_satisfied(constraint)]
+        if not violated:
+            return prob
+        print(f"  ...iteration {iteration} adding {len(violated)} violated connectivity rows")
+        start = lazy_start(constraints, violated)
+        # The prizes are rounded to cents.
+        target = prob.objective.value() - 0.01
+        for constraint in violated:
+            add_model_constraint(prob, constraint)
+        pending = [constraint for constraint in pending if is_satisfied(constraint)]
+        iteration += 1
+
+
+def optimize(
+    data: dict,
+    graph_data: GraphData,
+    on_progress: Callable | None = None,
+    mip_start: dict[str, float] | None = None,
+) -> LpProblem:
     num_processes = data["config"]["solver"]["num_processes"]
     print(
         f"\nSolving:  graph with {len(graph_data['V'])} nodes and {len(graph_data['E'])} arcs"
@@ -107,17 +270,38 @@ def optimize(data: dict, graph_data: GraphData) -> LpProblem:
     )
 
     print("Creating mip problem...")
-    prob = create_problem(data["config"], graph_data)
+    with stage("create_problem") as info:
+        prob = create_problem(data["config"], graph_data)
+        info.update(model_size(prob))
     print("Solving mip problem...")
 
     options = {k: v for k, v in data["config"]["solver"].items() if k != "num_processes"}
 
-    if num_processes == 1:
-        print(f"Single process starting using {options}")
-        solver = HiGHS()
-        solver.optionsDict = options
-        prob.solve(solver)
-    else:
-        prob = solve_par(prob, options, num_processes)
+    def solve_once(
+        prob: LpProblem, start: dict[str, float] | None, target: float | None
+    ) -> LpProblem:
+        # pulp's HiGHS model minimizes the negated objective.
+        target_options = {} if target is None else {"objective_target": -target}
+        if num_processes > 1:
+            return solve_par(prob, options | target_options, num_processes, on_progress, start)
+        if getattr(prob, "solverModel", None) is None:
+            print(f"Single process starting using {options}")
+            solver = HiGHS()
+            solver.optionsDict = options
+            solve(prob, solver, on_progress, start)
+        else:
+            for key, value in target_options.items():
+                prob.solverModel.setOptionValue(key, value)
+            resolve(prob, start)
+        return prob
+
+    with stage("solve") as info:
+        if data["config"]["lazy"]:
+            rows = prob.numConstraints()
+            constraints = connectivity_constraints(graph_data)
+            prob = solve_lazy(prob, constraints, solve_once, mip_start)
+            info["lazy_rows_added"] = prob.numConstraints() - rows
+        else:
+            prob = solve_once(prob, mip_start, None)
 
     return prob
@@ -0,0 +1,404 @@
+# optimize_highs.py
+
+from collections.abc import Callable
+
+import highspy
+import numpy as np
+
+from bdo_empire.generate_graph_data import GraphData, Node, NodeType as NT
+from bdo_empire.optimize import filter_arcs
+from bdo_empire.optimize_par import solve_portfolio
+from bdo_empire.profiling import stage
+from bdo_empire.progress import watch_progress
+from bdo_empire.solution import NoSolutionError
+from bdo_empire.solution_cache import apply_mip_start
+
+
+class HighsVar:
+    """A model column standing in for pulp's LpVariable in `Node.vars` and `Arc.vars`."""
+
+    __slots__ = ("name", "index", "lowBound", "upBound", "cat", "varValue")
+
+    def __init__(self, name: str, index: int, lowBound: float, upBound: float, cat: str):
+        self.name = name
+        self.index = index
+        self.lowBound = lowBound
+        self.upBound = upBound
+        self.cat = cat
+        self.varValue: float | None = None
+
+    def value(self) -> float | None:
+        return self.varValue
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "lowBound": self.lowBound,
+            "upBound": self.upBound,
+            "cat": self.cat,
+            "varValue": self.varValue,
+        }
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class HighsProblem:
+    """A maximization problem built directly as row-wise (CSR) arrays for highspy.
+
+    Rows are added as `(var, coefficient)` terms with duplicate columns summed and
+    zero coefficients dropped, the same as pulp does when it builds its HiGHS model.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.vars: list[HighsVar] = []
+        self.col_cost: list[float] = []
+        self.row_lower: list[float] = []
+        self.row_upper: list[float] = []
+        self.row_names: list[str] = []
+        self.a_start: list[int] = [0]
+        self.a_index: list[int] = []
+        self.a_value: list[float] = []
+        self.solverModel: highspy.Highs | None = None
+        self.status = "Not Solved"
+        self.objective_value: float | None = None
+
+    def add_var(self, name: str, lb: float, ub: float, cat: str) -> HighsVar:
+        var = HighsVar(name, len(self.vars), lb, ub, cat)
+        self.vars.append(var)
+        self.col_cost.append(0.0)
+        return var
+
+    def add_row(self, terms: list[tuple[HighsVar, float]], lb: float, ub: float, name: str = ""):
+        coefficients: dict[int, float] = {}
+        for var, coefficient in terms:
+            coefficients[var.index] = coefficients.get(var.index, 0) + coefficient
+        for index, coefficient in coefficients.items():
+            if coefficient != 0:
+                self.a_index.append(index)
+                self.a_value.append(coefficient)
+        self.a_start.append(len(self.a_index))
+        self.row_lower.append(lb)
+        self.row_upper.append(ub)
+        self.row_names.append(name if name else f"_C{len(self.row_names) + 1}")
+
+    def add_model_row(self, terms: list[tuple[HighsVar, float]], lb: float, ub: float) -> None:
+        """Add a row to the problem and to the solver model when it has been built."""
+        self.add_row(terms, lb, ub)
+        if self.solverModel is not None:
+            start, end = self.a_start[-2], self.a_start[-1]
+            index = np.array(self.a_index[start:end], dtype=np.int32)
+            value = np.array(self.a_value[start:end], dtype=np.float64)
+            self.solverModel.addRow(lb, ub, end - start, index, value)
+
+    def set_objective(self, terms: list[tuple[HighsVar, float]]) -> None:
+        for var, coefficient in terms:
+            self.col_cost[var.index] += coefficient
+
+    def variables(self) -> list[HighsVar]:
+        return self.vars
+
+    def variablesDict(self) -> dict[str, HighsVar]:
+        return {var.name: var for var in self.vars}
+
+    def numRows(self) -> int:
+        return len(self.row_lower)
+
+    def to_lp(self) -> highspy.HighsLp:
+        lp = highspy.HighsLp()
+        lp.model_name_ = self.name
+        lp.num_col_ = len(self.vars)
+        lp.num_row_ = self.numRows()
+        lp.sense_ = highspy.ObjSense.kMaximize
+        lp.col_cost_ = np.array(self.col_cost, dtype=np.float64)
+        lp.col_lower_ = np.array([var.lowBound for var in self.vars], dtype=np.float64)
+        lp.col_upper_ = np.array([var.upBound for var in self.vars], dtype=np.float64)
+        lp.col_names_ = [var.name for var in self.vars]
+        lp.row_lower_ = np.array(self.row_lower, dtype=np.float64)
+        lp.row_upper_ = np.array(self.row_upper, dtype=np.float64)
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_ = lp.num_col_
+        lp.a_matrix_.num_row_ = lp.num_row_
+        lp.a_matrix_.start_ = np.array(self.a_start, dtype=np.int32)
+        lp.a_matrix_.index_ = np.array(self.a_index, dtype=np.int32)
+        lp.a_matrix_.value_ = np.array(self.a_value, dtype=np.float64)
+        lp.integrality_ = [
+            highspy.HighsVarType.kContinuous
+            if var.cat == "Continuous"
+            else highspy.HighsVarType.kInteger
+            for var in self.vars
+        ]
+        return lp
+
+    def build(self, options: dict) -> highspy.Highs:
+        """Create the solver model with `options` and pass it the problem."""
+        self.solverModel = highspy.Highs()
+        for key, value in options.items():
+            self.solverModel.setOptionValue(key, value)
+        self.solverModel.passModel(self.to_lp())
+        return self.solverModel
+
+    def run(
+        self,
+        options: dict,
+        on_progress: Callable | None = None,
+        mip_start: dict[str, float] | None = None,
+    ) -> list[float]:
+        """Build the solver model, solve it and return the column values.
+
+        The solver progress is sent to `on_progress`, see `progress`, and the solve starts
+        from the partial solution `mip_start`, see `solution_cache`.
+        """
+        self.build(options)
+        if on_progress is not None:
+            watch_progress(self.solverModel, on_progress, 1)
+        return self.resolve(mip_start)
+
+    def resolve(self, mip_start: dict[str, float] | None = None) -> list[float]:
+        """Re-run the existing solver model, starting from the partial solution `mip_start`,
+        and return the column values.
+
+        A `NoSolutionError` is raised when the solve ended without a solution.
+        """
+        assert self.solverModel is not None, "HighsProblem.run() must be called before resolve()."
+        apply_mip_start(self.solverModel, self.vars, mip_start)
+        self.solverModel.run()
+        model_status = self.solverModel.getModelStatus()
+        self.status = self.solverModel.modelStatusToString(model_status)
+        solution = self.solverModel.getSolution()
+        if not solution.value_valid:
+            raise NoSolutionError(self.status)
+        col_value = list(solution.col_value)
+        self.assign_solution(col_value)
+        return col_value
+
+    def assign_solution(self, col_value: list[float]) -> None:
+        for var in self.vars:
+            var.varValue = col_value[var.index]
+        self.objective_value = sum(c * v for c, v in zip(self.col_cost, col_value))
+
+
+def link_in_out_by_group(prob: HighsProblem, v: Node, in_arcs: list, out_arcs: list) -> None:
+    all_inflows = []
+    f = v.vars["f"]
+    for group in v.groups:
+        groupflow_key = f"groupflow_{group.id}"
+        inflows = filter_arcs(v, groupflow_key, in_arcs)
+        outflows = filter_arcs(v, groupflow_key, out_arcs)
+        terms = [(var, 1) for var in inflows] + [(var, -1) for var in outflows]
+        prob.add_row(terms, 0, 0, f"balance_{groupflow_key}_at_{v.name()}")
+        all_inflows.extend(inflows)
+    prob.add_row([(f, 1)] + [(var, -1) for var in all_inflows], 0, 0, f"flow_{v.name()}")
+    prob.add_row([(f, 1), (v.vars["x"], -v.ub)], -np.inf, 0, f"x_{v.name()}")
+
+
+def connectivity_rows(G: GraphData) -> list[tuple[list[tuple[HighsVar, float]], float, float]]:
+    """Return the `(terms, lb, ub)` neighbor count rows of every node."""
+    rows = []
+    for node in G["V"].values():
+        if node.type in [NT.S, NT.T]:
+            continue
+
+        in_neighbors = [(arc.source.vars["x"], 1) for arc in node.inbound_arcs]
+        out_neighbors = [(arc.destination.vars["x"], 1) for arc in node.outbound_arcs]
+        if node.isWaypoint:
+            rows.append((in_neighbors + [(node.vars["x"], -2)], 0, np.inf))
+        else:
+            rows.append((in_neighbors + out_neighbors + [(node.vars["x"], -2)], 0, np.inf))
+        rows.append((out_neighbors + [(node.vars["x"], -1)], 0, np.inf))
+    return rows
+
+
+def create_problem(config: dict, G: GraphData) -> HighsProblem:
+    """Create the problem and add the variables and constraints.
+
+    This is the same model as `optimize.create_problem` without pulp's expression layer.
+    """
+
+    prob = HighsProblem(config["name"])
+
+    # Variables
+    cost = prob.add_var("cost", 0, config["budget"], "Integer")
+
+    for v in G["V"].values():
+        v.vars["x"] = prob.add_var(f"x_{v.name()}", 0, 1, "Binary")
+        v.vars["f"] = prob.add_var(f"flow_{v.name()}", 0, v.ub, "Integer")
+
+    for arc in G["E"].values():
+        for group in set(arc.source.groups).intersection(set(arc.destination.groups)):
+            key = f"groupflow_{group.id}"
+            ub = arc.ub if arc.source.type in [NT.group, NT.𝓢, NT.𝓣, NT.lodging] else group.ub
+            cat = "Binary" if arc.source.type in [NT.𝓢, NT.plant] else "Integer"
+            ub = 1 if cat == "Binary" else ub
+            arc.vars[key] = prob.add_var(f"{key}_on_{arc.name()}", 0, ub, cat)
+
+    # Objective
+    prize_values = [
+        (arc.vars[f"groupflow_{group.id}"], round(plant.group_prizes[group.id]["value"], 2))
+        for plant in G["P"].values()
+        for group in plant.groups
+        for arc in plant.inbound_arcs
+    ]
+    prob.set_objective(prize_values)
+
+    # Constraints
+    terms = [(cost, 1)] + [(v.vars["x"], -v.cost) for v in G["V"].values()]
+    prob.add_row(terms, 0, 0, "TotalCost")
+
+    for group in G["G"].values():
+        vars = [lodge.vars["x"] for lodge in G["L"].values() if lodge.groups[0] == group]
+        prob.add_row([(x, 1) for x in vars], -np.inf, 1, f"lodging_{group.id}")
+
+    for v in G["V"].values():
+        if v.type not in [NT.𝓢, NT.𝓣]:
+            link_in_out_by_group(prob, v, v.inbound_arcs, v.outbound_arcs)
+
+    link_in_out_by_group(prob, G["V"]["𝓣"], G["V"]["𝓣"].inbound_arcs, G["V"]["𝓢"].outbound_arcs)
+    prob.add_row([(G["V"]["𝓢"].vars["x"], 1)], 1, 1, "x_source")
+
+    if not config["lazy"]:
+        for terms, lb, ub in connectivity_rows(G):
+            prob.add_row(terms, lb, ub)
+
+    # Edge case handling.
+    # If group 619 is active it must be connected to a near town.
+    # There are three connection paths to select from...
+    connect_sets = [[1321, 1327, 1328, 1329, 1376], [1321, 1327, 1328, 1329, 1330, 1375], [1339]]
+    connect_vars = []
+    for i, connect_set in enumerate(connect_sets):
+        x = prob.add_var(f"x_group_619_connect_{i}", 0, 1, "Binary")
+        connect_vars.append(x)
+        terms = [(G["V"][f"waypoint_{wp}"].vars["x"], 1) for wp in connect_set]
+        prob.add_row(terms + [(x, -len(connect_set))], 0, np.inf)
+    terms = [(x, 1) for x in connect_vars] + [(G["V"]["group_619"].vars["x"], -1)]
+    prob.add_row(terms, 0, np.inf)
+
+    return prob
+
+
+def build_highs_model(prob: HighsProblem, options: dict) -> tuple[highspy.Highs, int]:
+    return prob.build(options), 1
+
+
+def solve_par(
+    prob: HighsProblem,
+    options_dict: dict,
+    num_processes: int,
+    on_progress: Callable | None = None,
+    mip_start: dict[str, float] | None = None,
+) -> HighsProblem:
+    solution = solve_portfolio(
+        prob,
+        options_dict,
+        num_processes,
+        len(prob.vars),
+        build_highs_model,
+        on_progress,
+        mip_start,
+    )
+    prob.status = solution.model_status
+    prob.assign_solution(solution.col_value(len(prob.vars)))
+    return prob
+
+
+def row_satisfied(terms: list[tuple[HighsVar, float]], lb: float, ub: float) -> bool:
+    activity = sum(var.varValue * coefficient for var, coefficient in terms)
+    return lb - 0.5 <= activity <= ub + 0.5
+
+
+def lazy_start(rows: list, violated: list) -> dict[str, float]:
+    """Return the values of the rows' columns in the current solution as a partial start,
+    leaving the columns of the `violated` rows for the solver to complete."""
+    free = {var.name for terms, _, _ in violated for var, _ in terms}
+    return {
+        var.name: round(var.varValue)
+        for terms, _, _ in rows
+        for var, _ in terms
+        if var.name not in free
+    }
+
+
+def solve_lazy(
+    prob: HighsProblem,
+    rows: list,
+    solve_once: Callable,
+    mip_start: dict[str, float] | None = None,
+) -> HighsProblem:
+    """Solve with `solve_once(prob, start, target)`, adding the violated `rows` and
+    re-solving until an optimal solution satisfies them all, see `optimize.solve_lazy`.
+
+    The rows are added to the existing solver model so single process solves re-run the
+    same HiGHS instance.
+    """
+    pending = list(rows)
+    start, target = mip_start, None
+    iteration = 1
+    while True:
+        prob = solve_once(prob, start, target)
+        if target is not None and prob.objective_value >= target:
+            prob.status = "Optimal"
+        if prob.status != "Optimal":
+            return prob
+        violated = [row for row in pending if not row_satisfied(*row)]
+        if not violated:
+            return prob
+        print(f"  ...iteration {iteration} adding {len(violated)} violated connectivity rows")
+        start = lazy_start(rows, violated)
+        # The prizes are rounded to cents.
+        target = prob.objective_value - 0.01
+        for terms, lb, ub in violated:
+            prob.add_model_row(terms, lb, ub)
+        pending = [row for row in pending if row_satisfied(*row)]
+        iteration += 1
+
+
+def model_size(prob: HighsProblem) -> dict:
+    return {"rows": prob.numRows(), "columns": len(prob.vars), "nonzeros": len(prob.a_index)}
+
+
+def optimize(
+    data: dict,
+    graph_data: GraphData,
+    on_progress: Callable | None = None,
+    mip_start: dict[str, float] | None = None,
+) -> HighsProblem:
+    num_processes = data["config"]["solver"]["num_processes"]
+    print(
+        f"\nSolving:  graph with {len(graph_data['V'])} nodes and {len(graph_data['E'])} arcs"
+        f"\n  Using:  budget of {data['config']['budget']}"
+        f"\n   With:  {num_processes} processes (highspy backend)."
+    )
+
+    print("Creating mip problem...")
+    with stage("create_problem") as info:
+        prob = create_problem(data["config"], graph_data)
+        info.update(model_size(prob))
+    print("Solving mip problem...")
+
+    options = {k: v for k, v in data["config"]["solver"].items() if k != "num_processes"}
+
+    def solve_once(
+        prob: HighsProblem, start: dict[str, float] | None, target: float | None
+    ) -> HighsProblem:
+        target_options = {} if target is None else {"objective_target": target}
+        if num_processes > 1:
+            return solve_par(prob, options | target_options, num_processes, on_progress, start)
+        if prob.solverModel is None:
+            print(f"Single process starting using {options}")
+            prob.run(options, on_progress, start)
+        else:
+            for key, value in target_options.items():
+                prob.solverModel.setOptionValue(key, value)
+            prob.resolve(start)
+        return prob
+
+    with stage("solve") as info:
+        if data["config"]["lazy"]:
+            rows = prob.numRows()
+            prob = solve_lazy(prob, connectivity_rows(graph_data), solve_once, mip_start)
+            info["lazy_rows_added"] = prob.numRows() - rows
+        else:
+            prob = solve_once(prob, mip_start, None)
+
+    return prob
@@ -1,41 +1,299 @@
+from collections.abc import Callable
 import multiprocessing
 from multiprocessing import Queue
-from random import randint
+from queue import Empty
+import traceback
+
+import highspy
+import numpy as np
 from pulp import HiGHS, LpProblem
 
+from bdo_empire.progress import progress_callback_types, progress_reporter
+from bdo_empire.solution import NoSolutionError, Solution, lp_statuses, solution_status
+from bdo_empire.solution_cache import apply_mip_start
+
+# Diversified settings merged over the solver options, cycled by process index.
+portfolio_settings = [
+    {},
+    {"mip_heuristic_effort": 0.3},
+    {"presolve": "off"},
+    {"mip_heuristic_effort": 0.01},
+]
+
+# Seconds the remaining workers get to notice the stop flag before being terminated.
+stop_grace_period = 5
+
+CB = highspy.cb.HighsCallbackType
+portfolio_callback_types = [
+    CB.kCallbackMipImprovingSolution,
+    CB.kCallbackMipInterrupt,
+    CB.kCallbackMipUserSolution,
+]
+
+
+class Incumbent:
+    """The best solution found by any portfolio worker, held in shared memory.
+
+    Values are stored in maximization terms, `bounds` holds each worker's latest dual
+    bound and `version` is incremented whenever a better solution is published.
+    """
+
+    def __init__(self, num_col: int, num_processes: int):
+        self.lock = multiprocessing.Lock()
+        self.stop = multiprocessing.Event()
+        self.value = multiprocessing.RawValue("d", -np.inf)
+        self.version = multiprocessing.RawValue("i", 0)
+        self.col_value = multiprocessing.RawArray("d", num_col)
+        self.bounds = multiprocessing.RawArray("d", [np.inf] * num_processes)
+
+    def publish(self, value: float, col_value: np.ndarray) -> bool:
+        with self.lock:
+            if value <= self.value.value:
+                return False
+            np.frombuffer(self.col_value, dtype=np.float64)[:] = col_value
+            self.value.value = value
+            self.version.value += 1
+            return True
+
+    def solution(self) -> tuple[float, np.ndarray]:
+        with self.lock:
+            return self.value.value, np.frombuffer(self.col_value, dtype=np.float64).copy()
+
+    def gap_closed(self, mip_rel_gap: float) -> bool:
+        """True when the best incumbent is within `mip_rel_gap` of the best worker bound."""
+        best = self.value.value
+        bound = min(self.bounds)
+        return best > -np.inf and bound - best <= mip_rel_gap * max(1.0, abs(best))
+
+
+def worker_options(options_dict: dict, process_index: int) -> dict:
+    options = options_dict.copy()
+    options.update(portfolio_settings[process_index % len(portfolio_settings)])
+    options["random_seed"] = (options.get("random_seed", 0) + process_index) % 2147483647
+    return options
+
+
+def portfolio_callback(
+    incumbent: Incumbent,
+    process_index: int,
+    sense: int,
+    mip_rel_gap: float,
+    report: Callable | None = None,
+):
+    """Return a HiGHS callback sharing incumbents and bounds with the other workers.
+
+    Improving solutions are published to `incumbent` and a newer shared incumbent better
+    than the worker's own is passed to HiGHS as a user solution. `sense` converts the model's objective to maximization terms, pulp's model is a
+    minimization of the negated objective. `report`, when given, is passed the callback
+    type and output of improving solution and interrupt callbacks to report progress.
+    """
+    seen_version = 0
+
+    def callback(callback_type, message, data_out, data_in, user_data):
+        nonlocal seen_version
+        if report is not None and callback_type in progress_callback_types:
+            report(callback_type, data_out)
+        if callback_type == CB.kCallbackMipImprovingSolution:
+            value = sense * data_out.objective_function_value
+            incumbent.publish(value, np.asarray(data_out.mip_solution))
+        elif callback_type == CB.kCallbackMipInterrupt:
+            incumbent.bounds[process_index] = sense * data_out.mip_dual_bound
+            if incumbent.stop.is_set() or incumbent.gap_closed(mip_rel_gap):
+                data_in.user_interrupt = True
+        elif callback_type == CB.kCallbackMipUserSolution:
+            version = incumbent.version.value
+            if version == seen_version:
+                return
+            seen_version = version
+            value, col_value = incumbent.solution()
+            if value > sense * data_out.mip_primal_bound:
+                data_in.setSolution(col_value)
+
+    return callback
+
+
+def build_pulp_model(prob: LpProblem, options: dict) -> tuple[highspy.Highs, int]:
+    solver = HiGHS()
+    solver.optionsDict = options
+    solver.createAndConfigureSolver(prob)
+    solver.buildSolverModel(prob)
+    return prob.solverModel, -1
+
 
 def solve_par_worker(
-    prob: LpProblem, options_dict: dict, queue: Queue, results: list, process_index: int
+    prob,
+    options_dict: dict,
+    build_model: Callable,
+    incumbent: Incumbent,
+    queue: Queue,
+    process_index: int,
+    report_progress: bool,
+    mip_start: dict[str, float] | None,
 ) -> None:
-    options_dict["random_seed"] = randint(0, 2147483647)
-    print(f"Process {process_index} starting using {options_dict}")
-    solver = HiGHS()
-    solver.optionsDict = options_dict
-    prob.solve(solver)
-    results[process_index] = prob.to_dict()
-    queue.put(process_index)
+    try:
+        solve_worker(
+            prob,
+            options_dict,
+            build_model,
+            incumbent,
+            queue,
+            process_index,
+            report_progress,
+            mip_start,
+        )
+    except Exception:
+        queue.put(("error", (process_index, traceback.format_exc())))
+
+
+def solve_worker(
+    prob,
+    options_dict: dict,
+    build_model: Callable,
+    incumbent: Incumbent,
+    queue: Queue,
+    process_index: int,
+    report_progress: bool,
+    mip_start: dict[str, float] | None,
+) -> None:
+    options = worker_options(options_dict, process_index)
+    print(f"Process {process_index} starting using {options}")
+    highs, sense = build_model(prob, options)
+    apply_mip_start(highs, prob.variables(), mip_start)
+
+    report = None
+    if report_progress:
+        report = progress_reporter(
+            lambda event: queue.put(("progress", event)), sense, process_index
+        )
+    mip_rel_gap = options.get("mip_rel_gap", 1e-4)
+    callback = portfolio_callback(incumbent, process_index, sense, mip_rel_gap, report)
+    highs.setCallback(callback, None)
+    for callback_type in portfolio_callback_types:
+        highs.startCallback(callback_type)
+
+    highs.run()
+
+    solution = highs.getSolution()
+    if solution.value_valid:
+        incumbent.publish(sense * highs.getInfo().objective_function_value, solution.col_value)
+    incumbent.bounds[process_index] = sense * highs.getInfo().mip_dual_bound
+    queue.put(("finished", (process_index, highs.modelStatusToString(highs.getModelStatus()))))
     return
 
 
-def solve_par(prob: LpProblem, options_dict: dict, num_processes: int) -> LpProblem:
-    manager = multiprocessing.Manager()
+def first_finished(
+    queue: Queue, processes: list, incumbent: Incumbent, on_progress: Callable | None
+) -> tuple[int | None, str]:
+    """Wait for the first worker result.
+
+    Progress events received meanwhile are passed to `on_progress` and the workers are
+    stopped when it returns True. A `RuntimeError` holding the first worker's traceback is
+    raised when every worker fails or exits without a result.
+    """
+    errors = []
+    while True:
+        try:
+            kind, message = queue.get(timeout=1)
+        except Empty:
+            if not any(process.is_alive() for process in processes):
+                raise RuntimeError(portfolio_error(errors, "exited without a result"))
+            continue
+        if kind == "finished":
+            return message
+        if kind == "error":
+            errors.append(message)
+            if len(errors) == len(processes):
+                raise RuntimeError(portfolio_error(errors, "failed"))
+        elif on_progress is not None and on_progress(message):
+            incumbent.stop.set()
+
+
+def portfolio_error(errors: list[tuple[int, str]], reason: str) -> str:
+    message = f"Every portfolio worker {reason}."
+    if errors:
+        process_index, error = errors[0]
+        message += f" Process {process_index} failed with:\n{error}"
+    return message
+
+
+def solve_portfolio(
+    prob,
+    options_dict: dict,
+    num_processes: int,
+    num_col: int,
+    build_model: Callable,
+    on_progress: Callable | None = None,
+    mip_start: dict[str, float] | None = None,
+) -> Solution:
+    """Solve `prob` with a portfolio of cooperating workers.
+
+    Each worker runs diversified settings and publishes its improving solutions and dual
+    bound to a shared `Incumbent`. Workers inject newer shared incumbents into their own
+    search and stop once the shared gap closes or another worker finishes. The result
+    is the compact solution of the best solution found by any worker, a `NoSolutionError`
+    is raised when no worker found one.
+
+    Each worker's progress events are passed to `on_progress`, see `progress`, and each
+    worker starts from the partial solution `mip_start`, see `solution_cache`.
+    """
     processes = []
     queue = multiprocessing.Queue()
-    results = manager.list(range(num_processes))
+    incumbent = Incumbent(num_col, num_processes)
 
     for i in range(num_processes):
         p = multiprocessing.Process(
-            target=solve_par_worker, args=(prob, options_dict, queue, results, i)
+            target=solve_par_worker,
+            args=(
+                prob,
+                options_dict,
+                build_model,
+                incumbent,
+                queue,
+                i,
+                on_progress is not None,
+                mip_start,
+            ),
+            daemon=True,
         )
         processes.append(p)
         p.start()
 
-    first_process = queue.get()
-    for i, process in enumerate(processes):
-        if process.is_alive():
-            print(f"Terminating process: {i}")
-            process.terminate()
-        process.join()
-    print(f"Using results from process {first_process}")
-    result = prob.from_dict(results[first_process])
-    return result[1]
+    try:
+        first_process, status = first_finished(queue, processes, incumbent, on_progress)
+        print(f"Process {first_process} finished with status: {status}")
+    finally:
+        incumbent.stop.set()
+        for i, process in enumerate(processes):
+            process.join(stop_grace_period)
+            if process.is_alive():
+                print(f"Terminating process: {i}")
+                process.terminate()
+                process.join()
+
+    if incumbent.gap_closed(options_dict.get("mip_rel_gap", 1e-4)):
+        status = "Optimal"
+    value, col_value = incumbent.solution()
+    if value == -np.inf:
+        raise NoSolutionError(status)
+    print(f"Using best portfolio solution with value {value:.2f}")
+    return Solution(solution_status(status, value), value, col_value, status)
+
+
+def solve_par(
+    prob: LpProblem,
+    options_dict: dict,
+    num_processes: int,
+    on_progress: Callable | None = None,
+    mip_start: dict[str, float] | None = None,
+) -> LpProblem:
+    variables = prob.variables()
+    solution = solve_portfolio(
+        prob, options_dict, num_processes, len(variables), build_pulp_model, on_progress, mip_start
+    )
+
+    # The workers' models number the columns in `prob.variables()` order, see `HiGHS`.
+    for i, var in enumerate(variables):
+        var.index = i
+        var.varValue = solution.value_of(var)
+    prob.assignStatus(lp_statuses[solution.sol_status], solution.sol_status)
+    return prob
@@ -0,0 +1,120 @@
+# optimize_sweep.py
+
+from collections.abc import Callable, Iterator
+import time
+
+import highspy
+from pulp import HiGHS, LpProblem, LpStatus
+
+from bdo_empire.generate_graph_data import GraphData
+from bdo_empire.optimize import assign_solution, create_problem, model_size, solve
+from bdo_empire.optimize_highs import (
+    HighsProblem,
+    create_problem as create_highs_problem,
+    model_size as highs_model_size,
+)
+from bdo_empire.profiling import stage
+from bdo_empire.progress import watch_progress
+
+
+def set_budget(prob: LpProblem | HighsProblem, budget: int) -> None:
+    """Change the upper bound of the `cost` variable in both the problem and the solver model."""
+    cost = prob.variablesDict()["cost"]
+    cost.upBound = budget
+    prob.solverModel.changeColBounds(cost.index, 0, budget)
+
+
+def set_mip_start(prob: LpProblem | HighsProblem) -> None:
+    """Pass the current variable values to the solver model as the starting incumbent."""
+    col_value = [0.0] * prob.solverModel.getNumCol()
+    for var in prob.variables():
+        col_value[var.index] = 0.0 if var.varValue is None else round(var.varValue)
+    solution = highspy.HighsSolution()
+    solution.col_value = col_value
+    solution.value_valid = True
+    prob.solverModel.setSolution(solution)
+
+
+def resolve(prob: LpProblem | HighsProblem, solver: HiGHS) -> None:
+    if isinstance(prob, HighsProblem):
+        prob.resolve()
+        return
+    solver.callSolver(prob)
+    assign_solution(prob)
+
+
+def solve_stats(prob: LpProblem | HighsProblem, budget: int, seconds: float) -> dict:
+    if isinstance(prob, HighsProblem):
+        status, value = prob.status, prob.objective_value
+    else:
+        status, value = LpStatus[prob.status], prob.objective.value()
+    return {
+        "budget": budget,
+        "status": status,
+        "value": value,
+        "cost": prob.variablesDict()["cost"].varValue,
+        "seconds": seconds,
+    }
+
+
+def solve_sweep(
+    data: dict, graph_data: GraphData, budgets: list[int], on_progress: Callable | None = None
+) -> Iterator[tuple[int, LpProblem | HighsProblem, dict]]:
+    """Solve the empire problem for each budget, yielding `(budget, prob, stats)` per solve.
+
+    The problem and solver model are built once for the smallest budget, after that only
+    the `cost` upper bound changes. Budgets are solved in ascending order so the previous
+    optimum is always a feasible MIP start for the next budget. The solver progress of
+    every solve is sent to `on_progress`, see `progress`, with the events' `budget` set.
+
+    Every budget is solved by the one solver model in this process, the solver setting
+    `num_processes` is not used.
+    """
+    budgets = sorted(set(budgets))
+    options = {k: v for k, v in data["config"]["solver"].items() if k != "num_processes"}
+
+    print(
+        f"\nSweeping:  graph with {len(graph_data['V'])} nodes and {len(graph_data['E'])} arcs"
+        f"\n   Using:  budgets {budgets[0]} to {budgets[-1]} ({len(budgets)} solves)"
+        "\n    With:  1 process."
+    )
+
+    print("Creating mip problem...")
+    data["config"]["budget"] = budgets[0]
+    # Warm started re-solves keep the full model, lazy rows are for single budget solves.
+    config = {**data["config"], "lazy": False}
+    with stage("create_problem") as info:
+        if data["config"]["backend"] == "highspy":
+            prob = create_highs_problem(config, graph_data)
+            info.update(highs_model_size(prob))
+        else:
+            prob = create_problem(config, graph_data)
+            info.update(model_size(prob))
+
+    solver = HiGHS()
+    solver.optionsDict = options
+    sweep_progress = None
+    if on_progress is not None:
+
+        def sweep_progress(event: dict) -> bool | None:
+            event["budget"] = data["config"]["budget"]
+            return on_progress(event)
+
+    for i, budget in enumerate(budgets):
+        print(f"Solving mip problem with budget {budget}...")
+        data["config"]["budget"] = budget
+        start_time = time.perf_counter()
+        with stage(f"solve_{budget}"):
+            if i == 0 and isinstance(prob, HighsProblem):
+                prob.run(options, sweep_progress)
+            elif i == 0:
+                solve(prob, solver, sweep_progress)
+            else:
+                set_budget(prob, budget)
+                set_mip_start(prob)
+                if sweep_progress is not None:
+                    sense = 1 if isinstance(prob, HighsProblem) else -1
+                    watch_progress(prob.solverModel, sweep_progress, sense)
+                resolve(prob, solver)
+        stats = solve_stats(prob, budget, time.perf_counter() - start_time)
+        yield budget, prob, stats
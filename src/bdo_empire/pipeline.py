@@ -0,0 +1,262 @@
+# pipeline.py
+
+from collections.abc import Callable
+import json
+from math import inf
+from pathlib import Path
+from random import randint
+import threading
+
+from psutil import cpu_count
+
+from bdo_empire.decompose import bound_stop, certify, decompose
+from bdo_empire.generate_reference_data import generate_reference_data
+from bdo_empire.generate_workerman_data import generate_workerman_data
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.heuristic import heuristic
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.optimize_sweep import solve_sweep
+from bdo_empire.profiling import stage, start_profile, write_profile
+from bdo_empire.progress import cancel_stop
+from bdo_empire.reduce_graph_data import reduce_graph_data
+from bdo_empire.solution import NoSolutionError, interrupted_status
+from bdo_empire.solution_cache import find_solution, mip_start, solution_key, store_solution
+
+
+solver_config = {
+    "num_processes": max(1, cpu_count(logical=False) - 1),
+    "mip_rel_gap": 1e-4,
+    "mip_feasibility_tolerance": 1e-4,
+    "primal_feasibility_tolerance": 1e-4,
+    "time_limit": inf,
+    "random_seed": randint(0, 2147483647),
+}
+
+purchased_lodging = {
+    "Velia": 0,
+    "Heidel": 0,
+    "Glish": 0,
+    "Calpheon City": 0,
+    "Olvia": 0,
+    "Keplan": 0,
+    "Port Epheria": 0,
+    "Trent": 0,
+    "Iliya Island": 0,
+    "Altinova": 0,
+    "Tarif": 0,
+    "Valencia City": 0,
+    "Shakatu": 0,
+    "Sand Grain Bazaar": 0,
+    "Ancado Inner Harbor": 0,
+    "Arehaza": 0,
+    "Old Wisdom Tree": 0,
+    "Grána": 0,
+    "Duvencrune": 0,
+    "O'draxxia": 0,
+    "Eilton": 0,
+    "Dalbeol Village": 0,
+    "Nampo's Moodle Village": 0,
+    "Nopsae's Byeot County": 0,
+    "Muzgar": 0,
+    "Yukjo Street": 0,
+    "Godu Village": 0,
+    "Bukpo": 0,
+}
+
+
+def make_config(budget: int, solver: dict, **kwargs) -> dict:
+    """Return an optimization config with the standard graph settings."""
+    config = {}
+    config["name"] = kwargs.get("name", "Empire")
+    config["budget"] = budget
+    config["top_n"] = kwargs.get("top_n", 4)
+    config["nearest_n"] = kwargs.get("nearest_n", 5)
+    config["waypoint_ub"] = kwargs.get("waypoint_ub", 25)
+    config["backend"] = kwargs.get("backend", "pulp")
+    config["value_engine"] = kwargs.get("value_engine", "numpy")
+    config["reduce"] = kwargs.get("reduce", True)
+    config["lazy"] = kwargs.get("lazy", False)
+    config["solution_cache"] = kwargs.get("solution_cache", True)
+    config["heuristic"] = kwargs.get("heuristic", None)
+    config["decompose"] = kwargs.get("decompose", False)
+    config["profile"] = kwargs.get("profile", False)
+    config["solver"] = solver
+    return config
+
+
+def read_prices(filepath: str | Path) -> dict:
+    return json.loads(Path(filepath).read_text())["effectivePrices"]
+
+
+def read_modifiers(filepath: str | Path | None) -> dict:
+    if not filepath:
+        return {}
+    return json.loads(Path(filepath).read_text())["regionModifiers"]
+
+
+def write_workerman_json(workerman_json: dict, outpath: str | Path, filename: str) -> Path:
+    outfile = Path(outpath).joinpath(filename)
+    with open(outfile, "w") as json_file:
+        json.dump(workerman_json, json_file, indent=4)
+    print("workerman json written to:", outfile)
+    return outfile
+
+
+def heuristic_event(prob, event: str = "heuristic", bound: float = inf) -> dict:
+    """Return the progress event of a greedy or decomposition empire, see `progress`."""
+    value = prob.objective_value
+    return {
+        "worker": 0,
+        "event": event,
+        "time": 0.0,
+        "incumbent": value,
+        "bound": bound,
+        "gap": (bound - value) / max(1.0, abs(bound)) if bound < inf else inf,
+        "nodes": 0,
+    }
+
+
+def is_cancelled(cancel: threading.Event | None) -> bool:
+    return cancel is not None and cancel.is_set()
+
+
+def check_cancel(cancel: threading.Event | None) -> None:
+    """Raise a cancelled `NoSolutionError` once `cancel` is set."""
+    if is_cancelled(cancel):
+        raise NoSolutionError(interrupted_status)
+
+
+def optimize_empire(
+    config: dict,
+    prices: dict,
+    modifiers: dict,
+    lodging: dict,
+    on_progress: Callable | None = None,
+    cancel: threading.Event | None = None,
+) -> dict:
+    """Run the full reference -> graph -> mip -> workerman pipeline and return the workerman json.
+
+    When `config["profile"]` is set the stage records are kept for `write_profile`. The
+    solver progress is sent to `on_progress`, see `progress`. With `config["solution_cache"]`
+    set a stored solution of the budget is returned as is and otherwise the nearest stored
+    budget's solution is the solver's starting point, see `solution_cache`.
+
+    `config["heuristic"]` set to "answer" returns the greedy empire of `heuristic` without
+    solving the mip and set to "start" uses it as the solver's starting point when there
+    is no stored solution to start from.
+
+    With `config["decompose"]` set the Lagrangian bound and repaired empire of `decompose`
+    are computed first. The empire is returned when it is within the solver's
+    `mip_rel_gap` of the bound, otherwise it is the starting point when there is no other
+    and the solve stops once its incumbent is within `mip_rel_gap` of the bound.
+
+    Setting `cancel` stops the pipeline at the next stage and stops the decomposition and
+    solve. The best empire found so far is returned, a `NoSolutionError` is raised when
+    there is none.
+    """
+    start_profile(config.get("profile", False))
+    with stage("reference_data"):
+        data = generate_reference_data(config, prices, modifiers, lodging)
+
+    key, nearest = None, None
+    if config["solution_cache"]:
+        with stage("solution_cache") as info:
+            key = solution_key(data, lodging)
+            exact, nearest = find_solution(key, config["budget"])
+            info["hit"] = "exact" if exact else "near" if nearest else None
+        if exact is not None:
+            print(f"Re-using the stored solution of budget {config['budget']}...")
+            return exact["workerman"]
+
+    check_cancel(cancel)
+    graph_data = get_graph_data(data)
+    if config["reduce"]:
+        graph_data = reduce_graph_data(graph_data, config["budget"])
+    check_cancel(cancel)
+    start = None
+    if nearest is not None:
+        start = mip_start(graph_data, nearest, config["budget"])
+        if start is not None:
+            print(f"Starting from the stored solution of budget {nearest['budget']}...")
+        else:
+            print(f"  ...the stored solution of budget {nearest['budget']} can not be repaired.")
+    if config["heuristic"] == "answer" or (config["heuristic"] == "start" and start is None):
+        prob = heuristic(data, graph_data)
+        if on_progress is not None:
+            on_progress(heuristic_event(prob))
+        if config["heuristic"] == "answer" or is_cancelled(cancel):
+            with stage("workerman_data"):
+                return generate_workerman_data(prob, lodging, data, graph_data)
+        start = prob.mip_start(graph_data)
+    prob, bound, certified = None, None, False
+    mip_rel_gap = config["solver"].get("mip_rel_gap", 1e-4)
+    if config["decompose"]:
+        decomposed, bound = decompose(data, graph_data, cancel)
+        if on_progress is not None:
+            on_progress(heuristic_event(decomposed, "decompose", bound))
+        certified = certify(decomposed, bound, mip_rel_gap)
+        if certified:
+            print("  ...within mip_rel_gap of the bound, skipping the solve.")
+            prob = decomposed
+        elif is_cancelled(cancel):
+            prob = decomposed
+        else:
+            if start is None:
+                start = decomposed.mip_start(graph_data)
+            on_progress = bound_stop(bound, mip_rel_gap, on_progress)
+    if prob is None:
+        if cancel is not None:
+            on_progress = cancel_stop(cancel, on_progress)
+        with stage("optimize"):
+            if config["backend"] == "highspy":
+                prob = optimize_highs(data, graph_data, on_progress, start)
+            else:
+                prob = optimize(data, graph_data, on_progress, start)
+        if bound is not None:
+            certified = certify(prob, bound, mip_rel_gap)
+    with stage("workerman_data"):
+        workerman_json = generate_workerman_data(prob, lodging, data, graph_data)
+    if key is not None:
+        store_solution(key, config["budget"], prob, graph_data, workerman_json, certified)
+    return workerman_json
+
+
+def optimize_empire_sweep(
+    config: dict,
+    prices: dict,
+    modifiers: dict,
+    lodging: dict,
+    budgets: list[int],
+    outpath: str | Path,
+    on_progress: Callable | None = None,
+) -> list[dict]:
+    """Solve every budget on a single graph and model, writing one workerman json per budget
+    and a `sweep_results.json` table of budget, value and cost to `outpath`.
+
+    The optimal solutions are kept for later runs when `config["solution_cache"]` is set.
+    """
+    start_profile(config.get("profile", False))
+    with stage("reference_data"):
+        data = generate_reference_data(config, prices, modifiers, lodging)
+    graph_data = get_graph_data(data)
+    if config["reduce"]:
+        graph_data = reduce_graph_data(graph_data, max(budgets))
+    key = solution_key(data, lodging) if config["solution_cache"] else None
+
+    results = []
+    for budget, prob, stats in solve_sweep(data, graph_data, budgets, on_progress):
+        with stage(f"workerman_data_{budget}"):
+            workerman_json = generate_workerman_data(prob, lodging, data, graph_data)
+        if key is not None:
+            store_solution(key, budget, prob, graph_data, workerman_json)
+        outfile = write_workerman_json(workerman_json, outpath, f"optimized_empire_{budget}.json")
+        stats["outfile"] = outfile.name
+        results.append(stats)
+
+    outfile = Path(outpath).joinpath("sweep_results.json")
+    with open(outfile, "w") as json_file:
+        json.dump(results, json_file, indent=4)
+    print("sweep results written to:", outfile)
+    write_profile(Path(outpath).joinpath("sweep_profile.json"))
+    return results
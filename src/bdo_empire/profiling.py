@@ -0,0 +1,140 @@
+# profiling.py
+
+"""Stage level timing and memory records for the optimize pipeline.
+
+Profiling is off unless `start_profile(True)` is called, in which case every
+`stage()` block appends a record of its wall time, cpu time (including joined child
+processes) and memory. The memory is the process' resident memory at the end of the
+stage, its change over the stage and the peaks during the stage of the process and of
+its child processes (the worker pools), sampled every `sample_seconds`. Nested stages
+are recorded with `/` separated names in the order they start.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import json
+from pathlib import Path
+import sys
+import threading
+import time
+
+import psutil
+
+profile_records: list[dict] | None = None
+profile_stack: list[str] = []
+sample_seconds = 0.02
+
+
+def start_profile(enabled: bool) -> None:
+    """Clear any previous records and turn stage recording on or off."""
+    global profile_records
+    profile_records = [] if enabled else None
+    profile_stack.clear()
+
+
+def cpu_seconds() -> float:
+    times = psutil.Process().cpu_times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def children_maxrss() -> int:
+    """Return the peak resident memory in bytes of the largest child process waited for,
+    0 when the platform does not report it."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def memory_bytes(process: psutil.Process) -> tuple[int, int]:
+    """Return the resident memory of `process` and the sum of its child processes'."""
+    children = 0
+    for child in process.children(recursive=True):
+        try:
+            children += child.memory_info().rss
+        except psutil.Error:
+            # The child exited since it was listed.
+            pass
+    return process.memory_info().rss, children
+
+
+@contextmanager
+def sample_memory(record: dict) -> Iterator[None]:
+    """Record the memory use of the enclosed block in `record`, see the module docstring.
+
+    Children exiting between samples are covered by the peak of the largest child
+    process waited for when it grew during the block.
+    """
+    process = psutil.Process()
+    rss_start = process.memory_info().rss
+    maxrss_start = children_maxrss()
+    peaks = [rss_start, 0]
+    done = threading.Event()
+
+    def sample() -> None:
+        while True:
+            rss, children = memory_bytes(process)
+            peaks[0] = max(peaks[0], rss)
+            peaks[1] = max(peaks[1], children)
+            if done.wait(sample_seconds):
+                return
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield
+    finally:
+        done.set()
+        sampler.join()
+        rss = process.memory_info().rss
+        maxrss = children_maxrss()
+        record["rss_bytes"] = rss
+        record["rss_delta_bytes"] = rss - rss_start
+        record["peak_rss_bytes"] = max(peaks[0], rss)
+        record["children_peak_rss_bytes"] = max(peaks[1], maxrss if maxrss > maxrss_start else 0)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[dict]:
+    """Record the enclosed block as a stage named `name`.
+
+    The yielded dict is stored in the record so callers can add details such as the
+    model size. When profiling is off the block runs unrecorded.
+    """
+    info = {}
+    if profile_records is None:
+        yield info
+        return
+
+    profile_stack.append(name)
+    record = {"stage": "/".join(profile_stack)}
+    profile_records.append(record)
+    memory = {}
+    wall_start = time.perf_counter()
+    cpu_start = cpu_seconds()
+    try:
+        with sample_memory(memory):
+            yield info
+    finally:
+        record["wall_seconds"] = time.perf_counter() - wall_start
+        record["cpu_seconds"] = cpu_seconds() - cpu_start
+        record.update(memory)
+        record.update(info)
+        profile_stack.pop()
+
+
+def profile_report() -> list[dict] | None:
+    return None if profile_records is None else list(profile_records)
+
+
+def write_profile(outfile: str | Path) -> Path | None:
+    """Write the stage records as json to `outfile` if profiling is on."""
+    if profile_records is None:
+        return None
+    outfile = Path(outfile)
+    with open(outfile, "w") as json_file:
+        json.dump(profile_records, json_file, indent=4)
+    print("profile written to:", outfile)
+    return outfile
@@ -0,0 +1,124 @@
+# progress.py
+
+"""Solver progress events.
+
+While a mip is solving an `on_progress(event)` callable receives dicts of:
+
+    {
+        "worker": 0,            # process index in parallel solves
+        "event": "solution",    # "solution" on an improving solution else "progress"
+                                # ("heuristic" for the greedy empire, sent before the solve)
+        "time": 1.25,           # worker solve seconds
+        "incumbent": 12345.0,   # best objective found (-inf when none)
+        "bound": 23456.0,       # best possible objective (inf when unknown)
+        "gap": 0.47,            # relative gap as reported by HiGHS
+        "nodes": 10,            # branch and bound nodes explored
+    }
+
+"progress" events are sent at most every `progress_interval` seconds. Returning a
+truthy value from `on_progress` stops the solve and keeps the best solution found.
+"""
+
+from collections.abc import Callable
+import json
+from pathlib import Path
+import threading
+
+import highspy
+
+CB = highspy.cb.HighsCallbackType
+progress_interval = 1.0
+progress_callback_types = [CB.kCallbackMipImprovingSolution, CB.kCallbackMipInterrupt]
+
+
+def progress_event(callback_type, data_out, sense: int, worker: int) -> dict:
+    """Return the progress event of a HiGHS callback in maximization terms."""
+    is_solution = callback_type == CB.kCallbackMipImprovingSolution
+    incumbent = data_out.objective_function_value if is_solution else data_out.mip_primal_bound
+    return {
+        "worker": worker,
+        "event": "solution" if is_solution else "progress",
+        "time": data_out.running_time,
+        "incumbent": sense * incumbent,
+        "bound": sense * data_out.mip_dual_bound,
+        "gap": data_out.mip_gap,
+        "nodes": data_out.mip_node_count,
+    }
+
+
+def progress_reporter(emit: Callable[[dict], None], sense: int, worker: int = 0):
+    """Return a function of the HiGHS callback arguments calling `emit` with progress events.
+
+    Improving solutions are always reported, other events are throttled to one per
+    `progress_interval` seconds.
+    """
+    last_time = -progress_interval
+
+    def report(callback_type, data_out) -> None:
+        nonlocal last_time
+        if data_out.running_time < last_time:
+            last_time = -progress_interval  # A new run of the same model.
+        if callback_type == CB.kCallbackMipImprovingSolution:
+            emit(progress_event(callback_type, data_out, sense, worker))
+        elif data_out.running_time - last_time >= progress_interval:
+            last_time = data_out.running_time
+            emit(progress_event(callback_type, data_out, sense, worker))
+
+    return report
+
+
+def watch_progress(
+    highs: highspy.Highs, on_progress: Callable[[dict], bool | None], sense: int
+) -> None:
+    """Send the progress of `highs` solves to `on_progress`, stopping when it returns True.
+
+    `sense` converts the model objective to maximization terms, pulp's model is a
+    minimization of the negated objective.
+    """
+    stop = False
+
+    def emit(event: dict) -> None:
+        nonlocal stop
+        stop = bool(on_progress(event))
+
+    report = progress_reporter(emit, sense)
+
+    def callback(callback_type, message, data_out, data_in, user_data):
+        if callback_type in progress_callback_types:
+            report(callback_type, data_out)
+        if callback_type == CB.kCallbackMipInterrupt and stop:
+            data_in.user_interrupt = True
+
+    highs.setCallback(callback, None)
+    for callback_type in progress_callback_types:
+        highs.startCallback(callback_type)
+
+
+def cancel_stop(cancel: threading.Event, on_progress: Callable | None) -> Callable:
+    """Return an `on_progress` stopping the solve once `cancel` is set, passing the events
+    on to `on_progress`."""
+
+    def stop(event: dict) -> bool:
+        stopped = bool(on_progress(event)) if on_progress is not None else False
+        return stopped or cancel.is_set()
+
+    return stop
+
+
+class ProgressLog:
+    """An `on_progress` callable keeping every event, optionally stopping at `target_gap`."""
+
+    def __init__(self, target_gap: float | None = None):
+        self.target_gap = target_gap
+        self.events: list[dict] = []
+
+    def __call__(self, event: dict) -> bool:
+        self.events.append(event)
+        return self.target_gap is not None and event["gap"] <= self.target_gap
+
+    def write(self, outfile: str | Path) -> Path:
+        outfile = Path(outfile)
+        with open(outfile, "w") as json_file:
+            json.dump(self.events, json_file, indent=4)
+        print("progress written to:", outfile)
+        return outfile
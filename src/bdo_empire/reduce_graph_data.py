@@ -0,0 +1,172 @@
+# reduce_graph_data.py
+
+"""Budget based reduction of the generated graph before the model is built.
+
+Every unit of a group's flow travels a path of plant -> waypoints -> town -> group ->
+lodging and every node on that path is paid for, so a plant, waypoint or lodging that
+can not be on any such path within the budget can never be part of a feasible solution.
+The reduction removes:
+
+- plant -> group prize options whose cheapest connection exceeds the budget, from both
+  the plant's `groups` and `group_prizes`, and the plants left without any option,
+- groups from the `groups` of waypoints and towns that are not on any affordable path
+  of the group, which removes that group's flow variables and balance rows,
+- lodging tiers that are unaffordable or dominated by a cheaper tier holding every
+  plant that can reach the group, and the group's flow entirely when no plant can.
+
+Waypoint and town nodes are kept so their `x` variables remain for the side
+constraints of the model.
+"""
+
+import heapq
+from math import inf
+from typing import Dict
+
+from bdo_empire.generate_graph_data import Arc, GraphData, Node, NodeType as NT
+from bdo_empire.profiling import stage
+
+path_types = [NT.plant, NT.waypoint, NT.town]
+
+
+def path_costs(starts: list[Node], group_id: str, reverse: bool) -> Dict[str, float]:
+    """Return the cheapest total node cost of paths from `starts` to each reachable node.
+
+    Paths only use plant, waypoint and town nodes carrying `group_id`'s flow and the cost
+    includes both end nodes. With `reverse` the arcs are followed backwards.
+    """
+    costs: Dict[str, float] = {}
+    heap = [(node.cost, node.key, node) for node in starts]
+    heapq.heapify(heap)
+    while heap:
+        cost, key, node = heapq.heappop(heap)
+        if key in costs:
+            continue
+        costs[key] = cost
+        for arc in node.inbound_arcs if reverse else node.outbound_arcs:
+            other = arc.source if reverse else arc.destination
+            if other.key in costs or other.type not in path_types:
+                continue
+            if group_id in (g.id for g in other.groups):
+                heapq.heappush(heap, (cost + other.cost, other.key, other))
+    return costs
+
+
+def graph_size(G: GraphData) -> dict:
+    """Return the node, arc, group flow variable and group balance row counts of `G`."""
+    group_ids = {v.key: {g.id for g in v.groups} for v in G["V"].values()}
+    return {
+        "nodes": len(G["V"]),
+        "arcs": len(G["E"]),
+        "groupflow_vars": sum(
+            len(group_ids[arc.source.key] & group_ids[arc.destination.key])
+            for arc in G["E"].values()
+        ),
+        "balance_rows": sum(len(ids) for ids in group_ids.values()),
+    }
+
+
+def reduce_lodgings(lodgings: list[Node], plant_count: int, path_cost: float, budget: int):
+    """Return the lodging tiers of a group worth keeping.
+
+    A tier is kept when it is affordable and holds more of the group's `plant_count`
+    reachable plants than every cheaper tier.
+    """
+    kept = []
+    best_ub = 0
+    for lodging in sorted(lodgings, key=lambda lodging: (lodging.cost, -lodging.ub)):
+        if plant_count == 0 or lodging.cost + path_cost > budget:
+            continue
+        ub = min(lodging.ub, plant_count)
+        if ub > best_ub:
+            kept.append(lodging)
+            best_ub = ub
+    return kept
+
+
+def remove_nodes(G: GraphData, removed: set[str]) -> GraphData:
+    """Return `G` without the `removed` node keys and their arcs."""
+    if not removed:
+        return G
+
+    def keep(arc: Arc) -> bool:
+        return arc.source.key not in removed and arc.destination.key not in removed
+
+    for v in G["V"].values():
+        v.inbound_arcs = [arc for arc in v.inbound_arcs if keep(arc)]
+        v.outbound_arcs = [arc for arc in v.outbound_arcs if keep(arc)]
+    return {
+        "V": {k: v for k, v in G["V"].items() if k not in removed},
+        "E": {k: arc for k, arc in G["E"].items() if keep(arc)},
+        "G": G["G"],
+        "P": {k: v for k, v in G["P"].items() if k not in removed},
+        "L": {k: v for k, v in G["L"].items() if k not in removed},
+    }
+
+
+def reduce_graph_data(G: GraphData, budget: int) -> GraphData:
+    """Return `G` reduced to the nodes and group flows usable within `budget`.
+
+    The nodes of `G` are modified in place.
+    """
+    print("Reducing graph data...")
+    with stage("reduce_graph") as info:
+        before = graph_size(G)
+        removed: set[str] = set()
+        prize_options = 0
+        dropped_groups = 0
+
+        for group in G["G"].values():
+            towns = [arc.source for arc in group.inbound_arcs if arc.source.isTown]
+            towns = [town for town in towns if group in town.groups]
+            to_town = path_costs(towns, group.id, reverse=True)
+            lodgings = [lodging for lodging in G["L"].values() if lodging.groups[0] == group]
+            lodging_cost = min((lodging.cost for lodging in lodgings), default=inf)
+
+            plants = []
+            for plant in G["P"].values():
+                if group not in plant.groups:
+                    continue
+                if to_town.get(plant.key, inf) + lodging_cost > budget:
+                    plant.groups = [g for g in plant.groups if g != group]
+                    del plant.group_prizes[group.id]
+                    prize_options += 1
+                else:
+                    plants.append(plant)
+
+            path_cost = min((to_town[plant.key] for plant in plants), default=inf)
+            kept = reduce_lodgings(lodgings, len(plants), path_cost, budget)
+            removed.update(lodging.key for lodging in lodgings if lodging not in kept)
+            group.ub = min(group.ub, len(plants))
+
+            if not kept:
+                # No flow of the group can reach the sink.
+                dropped_groups += 1
+                for v in G["V"].values():
+                    # The group's lodgings are all removed and keep their group for lookups.
+                    if v is not group and not v.isLodging and group in v.groups:
+                        v.groups = [g for g in v.groups if g != group]
+                continue
+
+            # Keep the group on waypoints and towns lying on an affordable path.
+            lodging_cost = min(lodging.cost for lodging in kept)
+            from_plants = path_costs(plants, group.id, reverse=False)
+            for v in G["V"].values():
+                if not (v.isWaypoint or v.isTown) or group not in v.groups:
+                    continue
+                cost = from_plants.get(v.key, inf) + to_town.get(v.key, inf) - v.cost
+                if cost + lodging_cost > budget:
+                    v.groups = [g for g in v.groups if g != group]
+
+        removed.update(plant.key for plant in G["P"].values() if not plant.groups)
+        G = remove_nodes(G, removed)
+
+        after = graph_size(G)
+        info.update({"budget": budget, "prize_options": prize_options, "groups": dropped_groups})
+        info.update({f"{k}_removed": before[k] - after[k] for k in before})
+
+    print(
+        f"  ...removed {info['nodes_removed']} nodes, {info['arcs_removed']} arcs,"
+        f" {prize_options} plant options, {info['groupflow_vars_removed']} group flow"
+        f" variables and {info['balance_rows_removed']} balance constraints."
+    )
+    return G
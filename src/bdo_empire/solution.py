@@ -0,0 +1,218 @@
+# solution.py
+
+"""Compact solutions of the empire problem.
+
+Most columns of a solved model are zero. A `Solution` keeps the status, objective value
+and only the nonzero columns as column indices and values, rounded since every column
+of the model is integer. The status is always a pulp `LpSolution` status, the HiGHS model
+status of highspy and portfolio solves is kept as `model_status`. The problem's variables
+are held in `Node.vars` and `Arc.vars` and carry their column `index`, so the solution
+maps straight back to the graph's nodes and arcs without looking variables up by name.
+`EmpireSolution` is that graph view of a solution as used to write the workerman data. A
+`GreedySolution` is built on the graph alone, without a model.
+"""
+
+import numpy as np
+from pulp import (
+    LpProblem,
+    LpSolution,
+    LpSolutionInfeasible,
+    LpSolutionIntegerFeasible,
+    LpSolutionNoSolutionFound,
+    LpSolutionOptimal,
+    LpSolutionUnbounded,
+    LpStatusInfeasible,
+    LpStatusNotSolved,
+    LpStatusOptimal,
+    LpStatusUnbounded,
+)
+
+from bdo_empire.generate_graph_data import Arc, GraphData, Node
+
+# HiGHS model status -> pulp solution status, any other status is a feasible or no solution.
+highs_solution_status = {
+    "Optimal": LpSolutionOptimal,
+    "Infeasible": LpSolutionInfeasible,
+    "Primal infeasible or unbounded": LpSolutionInfeasible,
+    "Unbounded": LpSolutionUnbounded,
+}
+
+# pulp solution status -> problem status, as pulp's HiGHS interface assigns them.
+lp_statuses = {
+    LpSolutionOptimal: LpStatusOptimal,
+    LpSolutionIntegerFeasible: LpStatusOptimal,
+    LpSolutionInfeasible: LpStatusInfeasible,
+    LpSolutionUnbounded: LpStatusUnbounded,
+    LpSolutionNoSolutionFound: LpStatusNotSolved,
+}
+
+
+# HiGHS model status of solves stopped by `on_progress`, also used for cancelled pipelines.
+interrupted_status = "Interrupted by user"
+
+
+class NoSolutionError(RuntimeError):
+    """A solve ended without a solution, `cancelled` when it was stopped by the user."""
+
+    def __init__(self, model_status: str):
+        self.model_status = model_status
+        self.cancelled = model_status == interrupted_status
+        if self.cancelled:
+            message = "Cancelled, no solution found."
+        else:
+            message = f"No solution found, status: {model_status}."
+        super().__init__(message)
+
+
+def solution_status(model_status: str, objective_value: float | None) -> int:
+    """Return the pulp `LpSolution` status of a HiGHS `model_status`."""
+    if model_status in highs_solution_status:
+        return highs_solution_status[model_status]
+    if objective_value is None:
+        return LpSolutionNoSolutionFound
+    return LpSolutionIntegerFeasible
+
+
+class Solution:
+    __slots__ = (
+        "sol_status",
+        "model_status",
+        "objective_value",
+        "index",
+        "value",
+        "values_by_index",
+    )
+
+    def __init__(
+        self,
+        sol_status: int,
+        objective_value: float | None,
+        col_value,
+        model_status: str | None = None,
+    ) -> None:
+        col_value = np.round(np.asarray(col_value, dtype=np.float64))
+        self.sol_status = sol_status
+        self.model_status = model_status
+        self.objective_value = objective_value
+        self.index = np.flatnonzero(col_value).astype(np.int32)
+        self.value = col_value[self.index]
+        self.values_by_index = dict(zip(self.index.tolist(), self.value.tolist()))
+
+    @property
+    def status(self) -> str:
+        return LpSolution[self.sol_status]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __repr__(self) -> str:
+        return (
+            f"Solution(status: {self.status}, value: {self.objective_value}, nonzero: {len(self)})"
+        )
+
+    def col_value(self, num_col: int) -> list[float]:
+        """Return the dense column values of a model with `num_col` columns."""
+        col_value = np.zeros(num_col)
+        col_value[self.index] = self.value
+        return col_value.tolist()
+
+    def value_of(self, var) -> float:
+        """Return the value of `var`, 0 for variables left out of the solved model."""
+        index = getattr(var, "index", None)
+        return 0.0 if index is None else self.values_by_index.get(index, 0.0)
+
+    def nodes(self, G: GraphData) -> list[Node]:
+        """Return the active nodes of `G`."""
+        return [v for v in G["V"].values() if "x" in v.vars and self.value_of(v.vars["x"]) >= 1]
+
+    def arc_flows(self, G: GraphData) -> list[tuple[Arc, str, int]]:
+        """Return the `(arc, group id, flow)` of every group flow carried by an arc of `G`."""
+        flows = []
+        for arc in G["E"].values():
+            for key, var in arc.vars.items():
+                flow = self.value_of(var)
+                if flow >= 1:
+                    flows.append((arc, key.removeprefix("groupflow_"), int(flow)))
+        return flows
+
+
+class GreedySolution:
+    """A solution given by its active nodes and group flows instead of the model's columns,
+    as built by `heuristic` and `decompose` without creating the model. It has the graph
+    view of `Solution` and gives the model's variable values by name with `mip_start`."""
+
+    __slots__ = ("model_status", "objective_value", "node_keys", "flows")
+    sol_status = LpSolutionIntegerFeasible
+
+    def __init__(
+        self,
+        objective_value: float,
+        node_keys: set[str],
+        flows: dict[tuple[tuple[str, str], str], int],
+    ) -> None:
+        self.model_status = "Heuristic"
+        self.objective_value = objective_value
+        self.node_keys = node_keys
+        # (arc key, group id) -> flow
+        self.flows = flows
+
+    @property
+    def status(self) -> str:
+        return LpSolution[self.sol_status]
+
+    def __repr__(self) -> str:
+        return f"GreedySolution(value: {self.objective_value}, nodes: {len(self.node_keys)})"
+
+    def nodes(self, G: GraphData) -> list[Node]:
+        return [v for v in G["V"].values() if v.key in self.node_keys]
+
+    def arc_flows(self, G: GraphData) -> list[tuple[Arc, str, int]]:
+        return [
+            (G["E"][arc_key], group_id, flow) for (arc_key, group_id), flow in self.flows.items()
+        ]
+
+    def mip_start(self, G: GraphData) -> dict[str, float]:
+        """Return `{variable name: value}` of the model's node, flow and cost variables, see
+        `optimize.create_problem`, with the node flows summing their inflows."""
+        start = {f"x_{v.name()}": float(v.key in self.node_keys) for v in G["V"].values()}
+        inflows: dict[str, int] = {}
+        for arc, group_id, flow in self.arc_flows(G):
+            start[f"groupflow_{group_id}_on_{arc.name()}"] = flow
+            key = arc.destination.key
+            inflows[key] = inflows.get(key, 0) + flow
+        for key, flow in inflows.items():
+            start[f"flow_{G['V'][key].name()}"] = flow
+        start["cost"] = sum(G["V"][key].cost for key in self.node_keys)
+        return start
+
+
+def solution_of(prob) -> Solution | GreedySolution:
+    """Return the solution held by the variables of a solved pulp or highspy problem, a
+    `GreedySolution` is its own solution."""
+    if isinstance(prob, GreedySolution):
+        return prob
+    variables = prob.variables()
+    col_value = np.zeros(len(variables))
+    for var in variables:
+        if var.varValue is not None:
+            col_value[var.index] = var.varValue
+    if isinstance(prob, LpProblem):
+        return Solution(prob.sol_status, prob.objective.value(), col_value)
+    sol_status = solution_status(prob.status, prob.objective_value)
+    return Solution(sol_status, prob.objective_value, col_value, prob.status)
+
+
+class EmpireSolution:
+    """The selected plants with their group, the active waypoints, towns and lodging tiers
+    and the flow carrying arcs of a solution."""
+
+    __slots__ = ("plants", "waypoints", "towns", "lodgings", "arcs")
+
+    def __init__(self, solution: Solution, G: GraphData) -> None:
+        nodes = solution.nodes(G)
+        self.arcs = solution.arc_flows(G)
+        groups = {arc.destination.key: group_id for arc, group_id, _ in self.arcs}
+        self.plants = {v: groups[v.key] for v in G["P"].values() if v.key in groups}
+        self.waypoints = [v for v in nodes if v.isWaypoint]
+        self.towns = [v for v in nodes if v.isTown]
+        self.lodgings = [v for v in nodes if v.isLodging]
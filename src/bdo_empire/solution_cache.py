@@ -0,0 +1,222 @@
+# solution_cache.py
+
+"""Store of optimal solutions for re-use by later runs.
+
+Solutions are keyed by the data version, the graph inputs (node values, lodging data
+and graph settings), the purchased lodging and the solver gap, the inputs that decide
+the optimum. A run with a stored budget returns the stored workerman json without
+building or solving the model. A run with another budget starts the solver from the
+active nodes of the nearest stored budget, repaired to fit the budget when needed, so
+the solver begins with a good incumbent instead of none.
+
+Solutions within the solver gap of the decomposition bound, see `decompose`, are stored
+as well with the status "Certified" instead of "Optimal".
+"""
+
+from collections import deque
+import hashlib
+import json
+from math import inf
+import time
+
+import numpy as np
+from pulp import LpProblem, LpSolutionOptimal
+
+import bdo_empire.data_store as ds
+from bdo_empire.generate_graph_data import GraphData, Node, NodeType as NT
+from bdo_empire.graph_cache import graph_fingerprint
+from bdo_empire.solution import solution_of
+
+SOLUTION_CACHE_FILENAME = "solution_cache.json"
+
+# Bump when the stored solution format changes so existing entries are ignored.
+SOLUTION_CACHE_VERSION = 2
+
+max_solutions = 50
+
+
+def solution_key(data: dict, lodging: dict) -> str:
+    """Return a hash of the inputs deciding the optimal solution of every budget."""
+    inputs = {
+        "version": SOLUTION_CACHE_VERSION,
+        "sha": ds.read_text("git_commit.txt") if ds.is_file("git_commit.txt") else None,
+        "graph": graph_fingerprint(data),
+        "lodging": lodging,
+        "mip_rel_gap": data["config"]["solver"].get("mip_rel_gap"),
+    }
+    content = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def read_solutions() -> list[dict]:
+    if not ds.is_file(SOLUTION_CACHE_FILENAME):
+        return []
+    try:
+        return ds.read_json(SOLUTION_CACHE_FILENAME)["solutions"]
+    except (ValueError, KeyError) as e:
+        print(f"  ...ignoring unreadable solution cache: {e}")
+        return []
+
+
+def find_solution(key: str, budget: int) -> tuple[dict | None, dict | None]:
+    """Return the stored solution of `budget` and the one of the nearest other budget."""
+    solutions = [entry for entry in read_solutions() if entry["key"] == key]
+    exact = next((entry for entry in solutions if entry["budget"] == budget), None)
+    if exact is not None:
+        return exact, None
+    nearest = min(
+        solutions, key=lambda entry: (abs(entry["budget"] - budget), entry["budget"]), default=None
+    )
+    return None, nearest
+
+
+def solved_optimal(prob) -> bool:
+    if isinstance(prob, LpProblem):
+        return prob.sol_status == LpSolutionOptimal
+    return prob.status == "Optimal"
+
+
+def store_solution(
+    key: str,
+    budget: int,
+    prob,
+    graph_data: GraphData,
+    workerman_json: dict,
+    certified: bool = False,
+) -> None:
+    """Store an optimal or `certified` solution's status, active nodes, plant assignments
+    and workerman json."""
+    if solved_optimal(prob):
+        status = "Optimal"
+    elif certified:
+        status = "Certified"
+    else:
+        return
+    solution = solution_of(prob)
+    nodes = [v.key for v in solution.nodes(graph_data)]
+    assignments = {
+        arc.destination.key: group_id
+        for arc, group_id, _ in solution.arc_flows(graph_data)
+        if arc.destination.isPlant
+    }
+    entry = {
+        "key": key,
+        "budget": budget,
+        "status": status,
+        "cost": sum(graph_data["V"][k].cost for k in nodes),
+        "nodes": nodes,
+        "assignments": assignments,
+        "workerman": workerman_json,
+        "time": time.time(),
+    }
+
+    solutions = read_solutions()
+    solutions = [e for e in solutions if (e["key"], e["budget"]) != (key, budget)]
+    solutions.append(entry)
+    solutions = sorted(solutions, key=lambda e: e["time"])[-max_solutions:]
+    ds.write_json(SOLUTION_CACHE_FILENAME, {"solutions": solutions})
+
+
+def assignment_nodes(G: GraphData, active: set[str], plant: Node, group_id: str) -> set[str]:
+    """Return the node keys of the shortest active path from `plant` to the group's town."""
+    group = G["G"][f"group_{group_id}"]
+    parents: dict[str, Node | None] = {plant.key: None}
+    queue = deque([plant])
+    while queue:
+        node = queue.popleft()
+        if any(arc.destination is group for arc in node.outbound_arcs):
+            nodes = {group.key}
+            while node is not None:
+                nodes.add(node.key)
+                node = parents[node.key]
+            return nodes
+        for arc in node.outbound_arcs:
+            other = arc.destination
+            if other.key in active and other.key not in parents and group in other.groups:
+                parents[other.key] = node
+                queue.append(other)
+    return set()
+
+
+def lodging_node(G: GraphData, group_id: str, count: int) -> Node | None:
+    lodgings = [lodging for lodging in G["L"].values() if lodging.groups[0].id == group_id]
+    lodgings = [lodging for lodging in lodgings if lodging.ub >= count]
+    return min(lodgings, key=lambda lodging: lodging.cost, default=None)
+
+
+def repaired_nodes(G: GraphData, entry: dict, budget: int) -> set[str] | None:
+    """Return the active node keys of the stored solution `entry` within `budget`.
+
+    Plant assignments are dropped in order of least value per cost saved until the paths
+    of the remaining assignments and their lodgings fit the budget. Group 619's connection
+    to a near town can run over the paths of dropped assignments, like `heuristic` the
+    repaired solution does not assign it plants.
+    """
+    active = set(entry["nodes"]) & G["V"].keys()
+    assignments = {
+        plant_key: group_id
+        for plant_key, group_id in entry["assignments"].items()
+        if plant_key in G["P"] and group_id in G["P"][plant_key].group_prizes and group_id != "619"
+    }
+    paths = {
+        plant_key: assignment_nodes(G, active, G["P"][plant_key], group_id)
+        for plant_key, group_id in assignments.items()
+    }
+    assignments = {k: v for k, v in assignments.items() if paths[k]}
+    # Group nodes are on their assignments' paths, a group left without plants is dropped.
+    fixed = {k for k in active if G["V"][k].type in [NT.𝓢, NT.𝓣]}
+
+    def solution_nodes(assignments: dict) -> tuple[set[str], float]:
+        nodes = set(fixed)
+        counts: dict[str, int] = {}
+        for plant_key, group_id in assignments.items():
+            nodes |= paths[plant_key]
+            counts[group_id] = counts.get(group_id, 0) + 1
+        for group_id, count in counts.items():
+            lodging = lodging_node(G, group_id, count)
+            if lodging is None:
+                return nodes, inf
+            nodes.add(lodging.key)
+        return nodes, sum(G["V"][k].cost for k in nodes)
+
+    nodes, cost = solution_nodes(assignments)
+    while cost > budget and assignments:
+        losses = {}
+        for plant_key, group_id in assignments.items():
+            remaining = {k: v for k, v in assignments.items() if k != plant_key}
+            saved = cost - solution_nodes(remaining)[1]
+            value = G["P"][plant_key].group_prizes[group_id]["value"]
+            losses[plant_key] = value / saved if saved > 0 else inf
+        del assignments[min(losses, key=losses.__getitem__)]
+        nodes, cost = solution_nodes(assignments)
+
+    if cost > budget:
+        return None
+    return nodes
+
+
+def mip_start(G: GraphData, entry: dict, budget: int) -> dict[str, float] | None:
+    """Return the stored solution `entry` as `{variable name: value}` for the node `x`
+    variables of the model for `budget`, leaving the flows for the solver to complete.
+
+    The entry is always repaired against `G`, a graph reduced by `reduce_graph_data` can
+    lack the plant options and lodging tiers of a solution within the budget.
+    """
+    nodes = repaired_nodes(G, entry, budget)
+    if nodes is None:
+        return None
+    return {f"x_{v.key}": float(v.key in nodes) for v in G["V"].values()}
+
+
+def apply_mip_start(highs, variables: list, start: dict[str, float] | None) -> None:
+    """Pass the partial solution `start` to the `highs` solver model.
+
+    HiGHS completes a partial solution with a sub-mip of at most `mip_max_start_nodes`
+    nodes at the start of the solve, an infeasible start is dropped.
+    """
+    if not start:
+        return
+    entries = [(var.index, start[var.name]) for var in variables if var.name in start]
+    index = np.array([i for i, _ in entries], dtype=np.int32)
+    value = np.array([v for _, v in entries], dtype=np.float64)
+    highs.setSolution(len(index), index, value)
@@ -0,0 +1,78 @@
+# conftest.py
+
+"""Shared fixtures built on the small synthetic workerman data set in `tests/fixture`.
+
+The data files are copied to a temporary directory used as the data store so the binary,
+graph and solution caches written by the pipeline stay out of the source tree.
+"""
+
+import json
+import locale
+from pathlib import Path
+import shutil
+
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire.generate_reference_data import generate_reference_data
+from bdo_empire.pipeline import make_config
+
+fixture_path = Path(__file__).parent.joinpath("fixture")
+lodging = {
+    name: 0
+    for name in ["Velia", "Heidel", "Calpheon City", "Grána", "Ancado Inner Harbor", "Bukpo"]
+}
+solver = {
+    "num_processes": 1,
+    "mip_rel_gap": 1e-4,
+    "mip_feasibility_tolerance": 1e-4,
+    "primal_feasibility_tolerance": 1e-4,
+    "time_limit": 60,
+    "random_seed": 1,
+    "output_flag": False,
+}
+
+
+def currency_formatting() -> bool:
+    try:
+        locale.setlocale(locale.LC_ALL, "")
+        locale.currency(1, grouping=True)
+    except (locale.Error, ValueError):
+        return False
+    return True
+
+
+# The workerman json values are formatted as currency of the user's locale.
+requires_locale = pytest.mark.skipif(
+    not currency_formatting(), reason="currency formatting needs a non C locale"
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def data_store(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    shutil.copytree(fixture_path.joinpath("data"), data_dir, dirs_exist_ok=True)
+    ds.set_path(data_dir)
+    yield data_dir
+    ds.set_path(None)
+
+
+@pytest.fixture(scope="session")
+def prices() -> dict:
+    return json.loads(fixture_path.joinpath("prices.json").read_text())["effectivePrices"]
+
+
+@pytest.fixture(scope="session")
+def modifiers() -> dict:
+    return json.loads(fixture_path.joinpath("modifiers.json").read_text())["regionModifiers"]
+
+
+@pytest.fixture
+def reference_data(prices, modifiers):
+    """Return a function making the reference data for a budget and config options."""
+
+    def make(budget: int, **kwargs) -> dict:
+        config = make_config(budget, dict(solver), **kwargs)
+        return generate_reference_data(config, prices, modifiers, lodging)
+
+    return make
@@ -0,0 +1,44 @@
+# test_cli.py
+
+import json
+
+import pytest
+
+from bdo_empire.cli import main, read_run_config
+
+base_config = {"prices": "prices.json", "outpath": "out"}
+
+
+def write_config(tmp_path, **kwargs) -> str:
+    filepath = tmp_path.joinpath("run.json")
+    filepath.write_text(json.dumps({**base_config, **kwargs}))
+    return str(filepath)
+
+
+def test_overrides(tmp_path):
+    filepath = write_config(tmp_path, budget=30)
+    assert read_run_config(filepath, {"budget": 60})["budget"] == 60
+    run_config = read_run_config(filepath, {"budgets": [10, 20]})
+    assert run_config["budgets"] == [10, 20] and "budget" not in run_config
+    filepath = write_config(tmp_path, budgets=[10, 20])
+    assert read_run_config(filepath, {"budgets": [5]})["budgets"] == [5]
+
+
+@pytest.mark.parametrize(
+    "config, overrides, message",
+    [
+        ({"budget": 30, "budgets": [10]}, {}, "both 'budget' and 'budgets'"),
+        ({"budgets": [10, 20]}, {"budget": 30}, "--budget can not override"),
+        ({}, {}, "missing required key 'budget'"),
+    ],
+)
+def test_budget_conflicts_are_rejected(tmp_path, config, overrides, message):
+    filepath = write_config(tmp_path, **config)
+    with pytest.raises(ValueError, match=message):
+        read_run_config(filepath, overrides)
+
+
+def test_budget_and_sweep_are_rejected(tmp_path):
+    filepath = write_config(tmp_path, budget=30)
+    with pytest.raises(ValueError, match="can not be combined"):
+        main([filepath, "--budget", "30", "--sweep", "10", "30", "10"])
@@ -0,0 +1,166 @@
+# test_data_store.py
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+
+import pytest
+
+import bdo_empire.data_store as ds
+
+
+class WorkermanHandler(BaseHTTPRequestHandler):
+    """Serve the server's `files` as `{path: (etag, content)}` with conditional GETs."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.client_address[1]))
+        etag, content = server.files[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        # Close the connection without telling the client it will be closed.
+        self.close_connection = server.drop_connections
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def data_dir(tmp_path, data_store, monkeypatch):
+    ds.set_path(tmp_path)
+    monkeypatch.setattr(ds, "read_cache", {})
+    yield tmp_path
+    ds.set_path(data_store)
+
+
+@pytest.fixture
+def server(data_dir, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WorkermanHandler)
+    server.files = {}
+    server.requests = []
+    server.drop_connections = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(ds, "WORKERMAN_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(ds, "idle_connections", {})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def serve(server, filename: str, etag: str, data: dict) -> None:
+    server.files[f"/data/{filename}"] = (etag, json.dumps(data).encode("utf-8"))
+
+
+def test_download_writes_changed_files(server):
+    serve(server, "a.json", '"1"', {"a": 1})
+    serve(server, "b.json", '"1"', {"b": 1})
+    assert sorted(ds.download_json_files(["a.json", "b.json", "a.json"])) == ["a.json", "b.json"]
+    assert ds.read_json("a.json") == {"a": 1}
+    assert ds.read_json(ds.DOWNLOADS_FILENAME)["b.json"]["etag"] == '"1"'
+
+
+def test_not_modified_files_are_kept(server):
+    serve(server, "a.json", '"1"', {"a": 1})
+    ds.download_json_files(["a.json"])
+    stamp = ds.file_stamp(ds.path().joinpath("a.json"))
+    assert ds.download_json_files(["a.json"]) == []
+    assert ds.file_stamp(ds.path().joinpath("a.json")) == stamp
+
+
+def test_unchanged_content_is_not_rewritten(server):
+    serve(server, "a.json", '"1"', {"a": 1})
+    ds.download_json_files(["a.json"])
+    stamp = ds.file_stamp(ds.path().joinpath("a.json"))
+    serve(server, "a.json", '"2"', {"a": 1})
+    assert ds.download_json_files(["a.json"]) == []
+    assert ds.file_stamp(ds.path().joinpath("a.json")) == stamp
+    assert ds.read_json(ds.DOWNLOADS_FILENAME)["a.json"]["etag"] == '"2"'
+
+
+def test_connections_are_shared(server):
+    serve(server, "a.json", '"1"', {"a": 1})
+    for _ in range(3):
+        ds.download_json_files(["a.json"])
+    assert len(server.requests) == 3
+    assert len({port for _, port in server.requests}) == 1
+
+
+def test_dropped_connection_is_retried(server):
+    serve(server, "a.json", '"1"', {"a": 1})
+    server.drop_connections = True
+    ds.download_json_files(["a.json"])
+    serve(server, "a.json", '"2"', {"a": 2})
+    assert ds.download_json_files(["a.json"]) == ["a.json"]
+    assert ds.read_json("a.json") == {"a": 2}
+    assert len({port for _, port in server.requests}) == 2
+
+
+table = {"601": [[113, 15343], [150, 3534]], "1": [], "5": [[105, 5983]]}
+
+
+def read_new_process(filename: str):
+    """`ds.read_json` without the in-memory cache."""
+    ds.read_cache.clear()
+    return ds.read_json(filename)
+
+
+def test_numeric_table_is_stored_as_arrays(data_dir):
+    ds.write_json("table.json", table)
+    assert data_dir.joinpath(".binary", "table.json.npz").is_file()
+    assert read_new_process("table.json") == table
+    assert list(read_new_process("table.json")) == list(table)
+
+
+@pytest.mark.parametrize(
+    "data", [{"a": {"b": 1}}, {"a": [[1, 2.5]]}, {"a": [[1, 2], [3]]}, {"a": [["b", 1]]}]
+)
+def test_other_data_is_kept_as_json(data_dir, data):
+    ds.write_json("data.json", data)
+    assert not data_dir.joinpath(".binary", "data.json.npz").exists()
+    assert read_new_process("data.json") == data
+
+
+def test_changed_file_invalidates_binary(data_dir):
+    ds.write_json("table.json", table)
+    changed = {**table, "1": [[1, 2]]}
+    data_dir.joinpath("table.json").write_text(json.dumps(changed))
+    assert ds.read_json("table.json") == changed
+    assert read_new_process("table.json") == changed
+
+
+def test_touched_file_rewrites_binary(data_dir):
+    ds.write_json("table.json", table)
+    binary = data_dir.joinpath(".binary", "table.json.npz")
+    stale = binary.read_bytes()
+    filepath = data_dir.joinpath("table.json")
+    stat = filepath.stat()
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert ds.read_json("table.json") == table
+    assert binary.read_bytes() != stale
+    assert read_new_process("table.json") == table
+    binary.write_bytes(stale)
+    assert read_new_process("table.json") == table
+    binary.write_bytes(b"not an npz file")
+    assert read_new_process("table.json") == table
+
+
+def test_reads_return_new_objects(data_dir):
+    ds.write_json("table.json", table)
+    ds.write_json("data.json", {"a": {"b": 1}})
+    ds.read_json("table.json")["601"].append([1, 1])
+    ds.read_json("data.json")["a"]["b"] = 2
+    assert ds.read_json("table.json") == table
+    assert ds.read_json("data.json") == {"a": {"b": 1}}
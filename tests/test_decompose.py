@@ -0,0 +1,60 @@
+# test_decompose.py
+
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire import decompose as dc
+from bdo_empire.decompose import bound_stop, certify, decompose
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize_highs import optimize
+from bdo_empire.pipeline import make_config, optimize_empire
+from bdo_empire.solution_cache import SOLUTION_CACHE_FILENAME, read_solutions
+from tests.conftest import lodging, requires_locale, solver
+
+eps = 1e-6
+
+
+@pytest.fixture(autouse=True)
+def few_iterations(monkeypatch):
+    # The bound is valid after any number of iterations.
+    monkeypatch.setattr(dc, "max_iterations", 2)
+
+
+@pytest.mark.parametrize("budget, num_processes", [(5, 1), (30, 1), (30, 2)])
+def test_bound_holds(reference_data, budget, num_processes):
+    data = reference_data(budget, backend="highspy")
+    data["config"]["solver"]["num_processes"] = num_processes
+    G = get_graph_data(data)
+    empire, bound = decompose(data, G)
+    assert sum(G["V"][key].cost for key in empire.node_keys) <= budget
+
+    optimal = optimize(data, get_graph_data(data))
+    assert optimal.status == "Optimal"
+    assert empire.objective_value <= optimal.objective_value + eps
+    assert optimal.objective_value <= bound + eps
+
+
+def test_certify_within_gap(reference_data):
+    data = reference_data(30, backend="highspy")
+    empire, bound = decompose(data, get_graph_data(data))
+    gap = (bound - empire.objective_value) / bound
+    assert certify(empire, bound, gap * 1.01)
+    assert not certify(empire, bound, gap * 0.99)
+
+    events = []
+    stop = bound_stop(bound, gap * 1.01, events.append)
+    assert not stop({"incumbent": empire.objective_value * 0.9})
+    assert stop({"incumbent": empire.objective_value})
+    assert len(events) == 2
+
+
+@requires_locale
+def test_certified_empire_skips_solve(prices, modifiers):
+    config = make_config(30, {**solver, "mip_rel_gap": 1.0}, backend="highspy", decompose=True)
+    events = []
+    try:
+        optimize_empire(config, prices, modifiers, lodging, events.append)
+        assert [event["event"] for event in events] == ["decompose"]
+        assert [entry["status"] for entry in read_solutions()] == ["Certified"]
+    finally:
+        ds.path().joinpath(SOLUTION_CACHE_FILENAME).unlink(missing_ok=True)
@@ -0,0 +1,62 @@
+# test_generate_graph_data.py
+
+import networkx as nx
+import pytest
+
+from bdo_empire.generate_graph_data import Arc, NodeType, generate_graph_data, nearest_n_towns
+from bdo_empire.graph_cache import graph_from_arrays, graph_to_arrays
+
+
+def all_pairs_nearest_n_towns(ref_data: dict, G: dict, nearest_n: int) -> dict:
+    """`nearest_n_towns` using all pairs shortest paths."""
+    waypoint_graph = nx.DiGraph()
+    for arc in G["E"].values():
+        weight = 999999 if "1727" in arc.name() else arc.destination.cost
+        waypoint_graph.add_edge(arc.source.id, arc.destination.id, weight=weight)
+    all_pairs = dict(nx.all_pairs_bellman_ford_path_length(waypoint_graph, weight="weight"))
+
+    nearest_towns = {}
+    for node_id, node in G["V"].items():
+        if node.isWaypoint or node.isTown:
+            distances = []
+            for group in G["G"].values():
+                town_id = ref_data["group_to_town"][group.id]
+                distances.append((group, all_pairs[node.id][town_id]))
+            nearest = sorted(distances, key=lambda x: x[1])[:nearest_n]
+            nearest_towns[node_id] = [w for w, _ in nearest]
+    return nearest_towns
+
+
+@pytest.mark.parametrize("nearest_n", [1, 3, 5])
+def test_nearest_n_towns_matches_all_pairs(reference_data, nearest_n):
+    data = reference_data(30, nearest_n=nearest_n)
+    G = generate_graph_data(data)
+    expected = all_pairs_nearest_n_towns(data, G, nearest_n)
+    assert nearest_n_towns(data, G, nearest_n) == expected
+
+
+def test_slotted_graph_keys_match_names(reference_data):
+    data = reference_data(30)
+    G = generate_graph_data(data)
+    for key, node in G["V"].items():
+        name = node.id if node.type in [NodeType.𝓢, NodeType.𝓣] else f"{node.type.name}_{node.id}"
+        assert not hasattr(node, "__dict__")
+        assert key == node.key == node.name() == name
+        assert hash(node) == hash(name)
+    for key, arc in G["E"].items():
+        assert not hasattr(arc, "__dict__")
+        assert key == arc.key == (arc.source.name(), arc.destination.name())
+        assert arc.name() == f"{arc.source.name()}_to_{arc.destination.name()}"
+        assert arc == Arc(arc.source, arc.destination, ub=arc.ub)
+    arcs = sorted(G["E"].items(), key=lambda item: item[1].as_dict()["type"])
+    assert list(G["E"]) == [key for key, _ in arcs]
+
+
+def test_cached_graph_matches_generated(reference_data):
+    data = reference_data(30)
+    G = generate_graph_data(data)
+    cached = graph_from_arrays(graph_to_arrays(G), data)
+    for name in ["V", "E", "G", "P", "L"]:
+        assert [v.as_dict() for v in cached[name].values()] == [
+            v.as_dict() for v in G[name].values()
+        ]
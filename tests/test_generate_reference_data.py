@@ -0,0 +1,77 @@
+# test_generate_reference_data.py
+
+import shutil
+
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire import generate_reference_data as grd
+from bdo_empire.generate_value_data import get_value_dependencies
+from bdo_empire.pipeline import make_config
+from tests.conftest import lodging, solver
+
+values_filename = "node_values_per_town.json"
+inputs_filename = "values_inputs.json"
+
+
+@pytest.fixture
+def value_store(tmp_path, data_store, monkeypatch):
+    """A data store of the fixture data without node values and a record of the values
+    generator's `plantzones` argument, None for a full generation."""
+    shutil.copytree(data_store, tmp_path, dirs_exist_ok=True)
+    for filename in [values_filename, inputs_filename]:
+        tmp_path.joinpath(filename).unlink(missing_ok=True)
+    ds.set_path(tmp_path)
+    calls = []
+    generate = grd.generate_value_data_vectorized
+
+    def recorded(prices, modifiers, plantzones=None):
+        calls.append(plantzones)
+        generate(prices, modifiers, plantzones)
+
+    monkeypatch.setattr(grd, "generate_value_data_vectorized", recorded)
+    yield calls
+    ds.set_path(data_store)
+
+
+def reference_data(prices: dict, modifiers: dict) -> dict:
+    return grd.generate_reference_data(make_config(30, dict(solver)), prices, modifiers, lodging)
+
+
+def changed_prices(prices: dict) -> dict:
+    """Return `prices` with the first price a plantzone's value depends on doubled."""
+    item_index, _ = get_value_dependencies(
+        ds.read_json("plantzone_drops.json"), ds.read_json("plantzone.json")
+    )
+    key = next(key for key in prices if key in item_index)
+    return {**prices, key: prices[key] * 2}
+
+
+def test_changed_prices_regenerate_their_plantzones(value_store, prices, modifiers):
+    reference_data(prices, modifiers)
+    assert value_store == [None]
+
+    changed = changed_prices(prices)
+    data = reference_data(changed, modifiers)
+    plantzones = value_store[-1]
+    assert plantzones == grd.changed_plantzones(
+        {"prices": prices, "modifiers": modifiers}, changed, modifiers, data
+    )
+    assert 0 < len(plantzones) < len(data["plants"])
+    incremental = ds.read_text(values_filename)
+
+    ds.path().joinpath(inputs_filename).unlink()
+    reference_data(changed, modifiers)
+    assert value_store[-1] is None
+    assert ds.read_text(values_filename) == incremental
+
+
+def test_values_are_reused_until_the_data_changes(value_store, prices, modifiers):
+    reference_data(prices, modifiers)
+    reference_data(prices, modifiers)
+    assert value_store == [None]
+    assert ds.read_json(inputs_filename)["prices"] == prices
+
+    ds.path().joinpath("git_commit.txt").write_text("another data version")
+    reference_data(prices, modifiers)
+    assert value_store == [None, None]
@@ -0,0 +1,50 @@
+# test_generate_value_data.py
+
+import json
+
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire import generate_value_data, generate_value_data_vectorized
+
+values_filename = "node_values_per_town.json"
+
+
+def test_vectorized_matches_scalar(prices, modifiers):
+    generate_value_data.generate_value_data(prices, modifiers, num_processes=2)
+    scalar = ds.read_text(values_filename)
+    generate_value_data_vectorized.generate_value_data(prices, modifiers)
+    vectorized = ds.read_text(values_filename)
+    assert vectorized == scalar
+
+
+def test_vectorized_partial_matches_scalar(prices, modifiers):
+    generate_value_data_vectorized.generate_value_data(prices, modifiers)
+    previous = ds.read_text(values_filename)
+    plantzones = set(list(json.loads(previous))[:10])
+    prices = {k: v * 2 if i < 3 else v for i, (k, v) in enumerate(prices.items())}
+
+    generate_value_data.generate_value_data(prices, modifiers, plantzones, num_processes=2)
+    scalar = ds.read_text(values_filename)
+    ds.write_json(values_filename, previous)
+    generate_value_data_vectorized.generate_value_data(prices, modifiers, plantzones)
+    vectorized = ds.read_text(values_filename)
+    assert vectorized == scalar
+    assert vectorized != previous
+
+
+@pytest.mark.parametrize("partial", [False, True])
+def test_pool_matches_serial(prices, modifiers, partial):
+    generate_value_data_vectorized.generate_value_data(prices, modifiers)
+    previous = ds.read_text(values_filename)
+    plantzones = set(list(json.loads(previous))[:10]) if partial else None
+    prices = {k: v * 2 if i < 3 else v for i, (k, v) in enumerate(prices.items())}
+
+    values = {}
+    for num_processes in [1, 3]:
+        ds.write_json(values_filename, json.loads(previous))
+        generate_value_data.generate_value_data(prices, modifiers, plantzones, num_processes)
+        values[num_processes] = ds.read_text(values_filename)
+    ds.write_json(values_filename, json.loads(previous))
+    assert values[3] == values[1]
+    assert values[1] != previous
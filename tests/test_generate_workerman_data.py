@@ -0,0 +1,65 @@
+# test_generate_workerman_data.py
+
+import copy
+import random
+
+import networkx as nx
+import pytest
+
+from bdo_empire.generate_workerman_data import order_workerman_workers
+
+
+def all_pairs_order_workerman_workers(graph, user_workers: list[dict], solution_distances):
+    """`order_workerman_workers` using all pairs shortest paths on every iteration."""
+    distance_indices = sorted(enumerate(solution_distances), key=lambda x: x[1])
+    workerman_user_workers = [user_workers[i] for i, _ in distance_indices]
+
+    ordered_workers = []
+    while workerman_user_workers:
+        all_pairs = dict(nx.all_pairs_bellman_ford_path_length(graph, weight="weight"))
+        distances = [
+            all_pairs[str(worker["tnk"])][str(worker["job"]["pzk"])]
+            for worker in workerman_user_workers
+        ]
+        worker = workerman_user_workers.pop(distances.index(min(distances)))
+        ordered_workers.append(worker)
+
+        short_path = nx.shortest_path(
+            graph, str(worker["tnk"]), str(worker["job"]["pzk"]), "weight"
+        )
+        for s, d in zip(short_path, short_path[1:]):
+            if graph.edges[(s, d)]["weight"] >= 1:
+                for edge in graph.in_edges(d):
+                    graph.edges[edge]["weight"] = 0
+                break
+    return ordered_workers
+
+
+def random_solution(seed: int) -> tuple[nx.DiGraph, list[dict], list[int]]:
+    """Return a connected graph weighted by node costs with workers jobs from a few towns."""
+    rng = random.Random(seed)
+    n = rng.randint(20, 80)
+    cost = {i: rng.choice([0, 1, 1, 2, 3]) for i in range(n)}
+    graph = nx.DiGraph()
+    for v in range(1, n):
+        u = rng.randrange(v)
+        graph.add_edge(str(u), str(v), weight=cost[u])
+        graph.add_edge(str(v), str(u), weight=cost[v])
+    for _ in range(rng.randint(0, 10)):
+        u, v = rng.sample(range(n), 2)
+        graph.add_edge(str(u), str(v), weight=cost[u])
+    towns = rng.sample(range(n), rng.randint(1, 5))
+    workers = [
+        {"tnk": rng.choice(towns), "job": {"pzk": rng.randrange(n)}, "index": i}
+        for i in range(rng.randint(5, 40))
+    ]
+    distances = [rng.randint(0, 5) for _ in workers]
+    return graph, workers, distances
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_order_matches_all_pairs(seed):
+    graph, workers, distances = random_solution(seed)
+    expected = all_pairs_order_workerman_workers(graph.copy(), copy.deepcopy(workers), distances)
+    ordered = order_workerman_workers(graph.copy(), copy.deepcopy(workers), distances)
+    assert [w["index"] for w in ordered] == [w["index"] for w in expected]
@@ -0,0 +1,19 @@
+# test_graph_cache.py
+
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire.graph_cache import GRAPH_CACHE_FILENAME, get_graph_data
+
+
+@pytest.mark.parametrize("size", [0, 100, 2000])
+def test_truncated_cache_is_rebuilt(reference_data, size):
+    data = reference_data(30)
+    G = get_graph_data(data)
+    filepath = ds.path().joinpath(GRAPH_CACHE_FILENAME)
+    filepath.write_bytes(filepath.read_bytes()[:size])
+
+    rebuilt = get_graph_data(data)
+    assert rebuilt["V"].keys() == G["V"].keys()
+    assert rebuilt["E"].keys() == G["E"].keys()
+    assert get_graph_data(data)["E"].keys() == G["E"].keys()
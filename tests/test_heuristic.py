@@ -0,0 +1,37 @@
+# test_heuristic.py
+
+import numpy as np
+import pytest
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.heuristic import heuristic
+from bdo_empire.optimize_highs import create_problem, optimize
+
+eps = 1e-6
+
+
+@pytest.mark.parametrize("budget", [5, 30, 120])
+def test_greedy_empire_is_feasible(reference_data, budget):
+    data = reference_data(budget, backend="highspy")
+    G = get_graph_data(data)
+    start = heuristic(data, G).mip_start(G)
+    prob = create_problem(data["config"], G)
+    assert start.keys() <= prob.variablesDict().keys()
+
+    col_value = np.array([start.get(var.name, 0.0) for var in prob.vars])
+    assert all(var.lowBound - eps <= col_value[var.index] <= var.upBound + eps for var in prob.vars)
+    for row, (lb, ub) in enumerate(zip(prob.row_lower, prob.row_upper)):
+        first, last = prob.a_start[row], prob.a_start[row + 1]
+        activity = col_value[prob.a_index[first:last]] @ np.array(prob.a_value[first:last])
+        assert lb - eps <= activity <= ub + eps, prob.row_names[row]
+
+
+@pytest.mark.parametrize("budget, ratio", [(5, 0.99), (30, 0.97)])
+def test_greedy_empire_is_near_optimal(reference_data, budget, ratio):
+    data = reference_data(budget, backend="highspy")
+    G = get_graph_data(data)
+    greedy = heuristic(data, G)
+    optimal = optimize(data, G)
+    assert optimal.status == "Optimal"
+    assert ratio * optimal.objective_value <= greedy.objective_value
+    assert greedy.objective_value <= optimal.objective_value + eps
@@ -0,0 +1,37 @@
+# test_initialize.py
+
+import shutil
+
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire.initialize import (
+    bundle_path,
+    data_matches_bundle,
+    initialize_offline_data,
+    read_bundle_manifest,
+    write_data_bundle,
+)
+from tests.conftest import fixture_path
+
+
+@pytest.fixture
+def data_dir(tmp_path, data_store):
+    shutil.copytree(fixture_path.joinpath("data"), tmp_path, dirs_exist_ok=True)
+    ds.set_path(tmp_path)
+    yield tmp_path
+    ds.set_path(data_store)
+
+
+def test_truncated_bundle_is_rewritten(data_dir):
+    filepath = write_data_bundle()
+    filepath.write_bytes(filepath.read_bytes()[:1000])
+    initialize_offline_data()
+    assert data_matches_bundle(read_bundle_manifest(bundle_path()))
+
+
+def test_unreadable_given_bundle_raises(data_dir):
+    filepath = data_dir.joinpath("copied_bundle.zip")
+    filepath.write_bytes(b"not a zip file")
+    with pytest.raises(ValueError, match="unreadable"):
+        initialize_offline_data(filepath)
@@ -0,0 +1,52 @@
+# test_optimize.py
+
+import pytest
+from pulp import LpSolutionOptimal
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.reduce_graph_data import reduce_graph_data
+from bdo_empire.solution import solution_of
+
+optimizer = {"pulp": optimize, "highspy": optimize_highs}
+
+
+@pytest.mark.parametrize("budget", [1, 2, 3])
+def test_lazy_reduced_small_budgets(reference_data, budget):
+    values = {}
+    for lazy in [False, True]:
+        data = reference_data(budget, lazy=lazy)
+        G = reduce_graph_data(get_graph_data(data), budget)
+        prob = optimize(data, G)
+        assert prob.sol_status == LpSolutionOptimal
+        values[lazy] = prob.objective.value()
+    assert values[True] == pytest.approx(values[False])
+
+
+@pytest.mark.parametrize("backend", ["pulp", "highspy"])
+@pytest.mark.parametrize("budget, num_processes", [(5, 1), (30, 1), (30, 2)])
+def test_lazy_matches_eager(reference_data, budget, num_processes, backend):
+    values = {}
+    for lazy in [False, True]:
+        data = reference_data(budget, backend=backend, lazy=lazy)
+        data["config"]["solver"]["num_processes"] = num_processes
+        solution = solution_of(optimizer[backend](data, get_graph_data(data)))
+        assert solution.status == "Optimal Solution Found"
+        values[lazy] = solution.objective_value
+    assert values[True] == pytest.approx(values[False])
+
+
+@pytest.mark.parametrize("budget", [5, 30, 120])
+def test_reduced_matches_unreduced(reference_data, budget):
+    values = {}
+    for reduce in [False, True]:
+        data = reference_data(budget, backend="highspy")
+        G = get_graph_data(data)
+        if reduce:
+            G = reduce_graph_data(G, budget)
+            assert all(set(v.group_prizes) == {g.id for g in v.groups} for v in G["P"].values())
+        solution = solution_of(optimize_highs(data, G))
+        assert solution.status == "Optimal Solution Found"
+        values[reduce] = solution.objective_value
+    assert values[True] == pytest.approx(values[False])
@@ -0,0 +1,27 @@
+# test_optimize_highs.py
+
+import pytest
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.solution import NoSolutionError, solution_of
+
+
+@pytest.mark.parametrize("budget", [5, 30])
+def test_highspy_matches_pulp(reference_data, budget):
+    data = reference_data(budget)
+    pulp_solution = solution_of(optimize(data, get_graph_data(data)))
+    data = reference_data(budget, backend="highspy")
+    highs_solution = solution_of(optimize_highs(data, get_graph_data(data)))
+    assert highs_solution.status == pulp_solution.status == "Optimal Solution Found"
+    assert highs_solution.objective_value == pytest.approx(pulp_solution.objective_value)
+
+
+@pytest.mark.parametrize("num_processes", [1, 2])
+def test_no_solution_raises(reference_data, num_processes):
+    data = reference_data(30, backend="highspy")
+    data["config"]["solver"].update({"num_processes": num_processes, "time_limit": 0})
+    with pytest.raises(NoSolutionError, match="Time limit reached") as e:
+        optimize_highs(data, get_graph_data(data))
+    assert not e.value.cancelled
@@ -0,0 +1,40 @@
+# test_optimize_par.py
+
+import queue
+
+import pytest
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize_highs import build_highs_model, create_problem, optimize
+from bdo_empire.optimize_par import Incumbent, solve_worker
+from bdo_empire.solution import solution_of
+
+
+def worker_solutions(prob, options: dict, incumbent: Incumbent) -> list[float]:
+    """Run portfolio worker 0 in this process and return its improving solution values."""
+    events = queue.Queue()
+    solve_worker(prob, options, build_highs_model, incumbent, events, 0, True, None)
+    solutions = []
+    while not events.empty():
+        kind, event = events.get()
+        if kind == "progress" and event["event"] == "solution":
+            solutions.append(event["incumbent"])
+    return solutions
+
+
+def test_worker_receives_shared_incumbent(reference_data):
+    data = reference_data(30, backend="highspy")
+    G = get_graph_data(data)
+    best = solution_of(optimize(data, G))
+    options = {k: v for k, v in data["config"]["solver"].items() if k != "num_processes"}
+
+    prob = create_problem(data["config"], G)
+    alone = worker_solutions(prob, options, Incumbent(len(prob.vars), 2))
+    assert min(alone) < best.objective_value - 1
+
+    # Another worker's incumbent, the worker only improves on it.
+    incumbent = Incumbent(len(prob.vars), 2)
+    incumbent.publish(best.objective_value, best.col_value(len(prob.vars)))
+    shared = worker_solutions(prob, options, incumbent)
+    assert all(value >= best.objective_value - 1 for value in shared)
+    assert incumbent.solution()[0] == pytest.approx(best.objective_value)
@@ -0,0 +1,28 @@
+# test_optimize_sweep.py
+
+import pytest
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.optimize_sweep import solve_sweep
+from bdo_empire.progress import ProgressLog
+from bdo_empire.solution import solution_of
+
+budgets = [5, 10, 30]
+optimizer = {"pulp": optimize, "highspy": optimize_highs}
+
+
+@pytest.mark.parametrize("backend", ["pulp", "highspy"])
+def test_sweep_matches_single_budget_solves(reference_data, backend):
+    data = reference_data(budgets[0], backend=backend)
+    progress = ProgressLog()
+    sweep = {
+        budget: stats["value"]
+        for budget, _, stats in solve_sweep(data, get_graph_data(data), budgets, progress)
+    }
+    for budget in budgets:
+        data = reference_data(budget, backend=backend)
+        solution = solution_of(optimizer[backend](data, get_graph_data(data)))
+        assert sweep[budget] == pytest.approx(solution.objective_value)
+    assert {event["budget"] for event in progress.events} == set(budgets)
@@ -0,0 +1,80 @@
+# test_pipeline.py
+
+import threading
+import time
+
+import pytest
+
+from bdo_empire.pipeline import make_config, optimize_empire
+from bdo_empire.solution import NoSolutionError
+from tests.conftest import lodging, requires_locale, solver
+
+
+def run(prices, modifiers, on_progress=None, cancel=None, **kwargs) -> dict:
+    config = make_config(30, dict(solver), **kwargs)
+    return optimize_empire(config, prices, modifiers, lodging, on_progress, cancel)
+
+
+def cancel_on(cancel: threading.Event, kind: str):
+    """Return an `on_progress` setting `cancel` on the first event of `kind`."""
+    events = []
+
+    def on_progress(event: dict) -> None:
+        events.append(event)
+        if event["event"] == kind:
+            cancel.set()
+
+    on_progress.events = events
+    return on_progress
+
+
+def test_cancel_before_start(prices, modifiers):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(NoSolutionError, match="Cancelled") as e:
+        run(prices, modifiers, cancel=cancel)
+    assert e.value.cancelled
+
+
+@requires_locale
+def test_cancel_after_heuristic_returns_greedy_empire(prices, modifiers):
+    cancel = threading.Event()
+    on_progress = cancel_on(cancel, "heuristic")
+    workerman_json = run(prices, modifiers, on_progress, cancel, heuristic="start")
+    assert [event["event"] for event in on_progress.events] == ["heuristic"]
+    assert workerman_json == run(prices, modifiers, heuristic="answer")
+
+
+@requires_locale
+def test_cancel_during_decompose_skips_solve(prices, modifiers):
+    cancel = threading.Event()
+    on_progress = cancel_on(cancel, "decompose")
+    timer = threading.Timer(1.0, cancel.set)
+    timer.start()
+    start_time = time.perf_counter()
+    run(prices, modifiers, on_progress, cancel, decompose=True)
+    timer.cancel()
+    assert time.perf_counter() - start_time < solver["time_limit"] / 2
+    assert [event["event"] for event in on_progress.events] == ["decompose"]
+
+
+@requires_locale
+@pytest.mark.parametrize("num_processes", [1, 2])
+@pytest.mark.parametrize("backend", ["pulp", "highspy"])
+def test_cancel_during_solve(prices, modifiers, backend, num_processes):
+    cancel = threading.Event()
+    on_progress = cancel_on(cancel, "progress")
+    config = make_config(30, {**solver, "num_processes": num_processes}, backend=backend)
+    try:
+        workerman_json = optimize_empire(config, prices, modifiers, lodging, on_progress, cancel)
+    except NoSolutionError as e:
+        assert e.cancelled
+        return
+    assert isinstance(workerman_json["userWorkers"], list)
+
+
+@requires_locale
+def test_empty_empire(prices, modifiers):
+    config = make_config(0, dict(solver))
+    workerman_json = optimize_empire(config, prices, modifiers, lodging)
+    assert workerman_json["userWorkers"] == []
@@ -0,0 +1,39 @@
+# test_profiling.py
+
+import multiprocessing
+import time
+
+import numpy as np
+
+from bdo_empire.profiling import profile_report, stage, start_profile
+
+size = 200 * 2**20
+
+
+def allocate() -> None:
+    data = np.ones(size, dtype=np.uint8)
+    # Held for several memory samples.
+    time.sleep(0.2)
+    del data
+
+
+def test_stage_memory_is_per_stage():
+    start_profile(True)
+    try:
+        with stage("allocate"):
+            allocate()
+        with stage("idle"):
+            pass
+        with stage("pool"):
+            process = multiprocessing.Process(target=allocate)
+            process.start()
+            process.join()
+        records = {record["stage"]: record for record in profile_report()}
+    finally:
+        start_profile(False)
+    allocated, idle, pool = records["allocate"], records["idle"], records["pool"]
+    assert allocated["peak_rss_bytes"] - allocated["rss_bytes"] > size // 2
+    assert abs(allocated["rss_delta_bytes"]) < size // 2
+    assert idle["peak_rss_bytes"] - idle["rss_bytes"] < size // 2
+    assert pool["children_peak_rss_bytes"] > size
+    assert idle["children_peak_rss_bytes"] < size
@@ -0,0 +1,46 @@
+# test_progress.py
+
+import pytest
+from pulp import LpSolutionIntegerFeasible, LpSolutionOptimal
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.solution import NoSolutionError, solution_of
+
+backends = {"pulp": optimize, "highspy": optimize_highs}
+
+
+@pytest.mark.parametrize("num_processes", [1, 2])
+@pytest.mark.parametrize("backend", list(backends))
+@pytest.mark.parametrize("lazy", [False, True])
+def test_stop_on_first_event(reference_data, backend, num_processes, lazy):
+    data = reference_data(30, backend=backend, lazy=lazy)
+    data["config"]["solver"]["num_processes"] = num_processes
+    try:
+        prob = backends[backend](data, get_graph_data(data), lambda event: True)
+    except NoSolutionError as e:
+        assert e.cancelled
+        return
+    solution = solution_of(prob)
+    assert solution.sol_status in [LpSolutionIntegerFeasible, LpSolutionOptimal]
+    assert len(solution) > 0
+
+
+@pytest.mark.parametrize("num_processes", [1, 2])
+@pytest.mark.parametrize("backend", list(backends))
+def test_stop_on_first_solution(reference_data, backend, num_processes):
+    data = reference_data(30, backend=backend)
+    data["config"]["solver"]["num_processes"] = num_processes
+    events = []
+
+    def on_progress(event: dict) -> bool:
+        events.append(event)
+        return event["event"] == "solution"
+
+    prob = backends[backend](data, get_graph_data(data), on_progress)
+    solution = solution_of(prob)
+    assert solution.sol_status in [LpSolutionIntegerFeasible, LpSolutionOptimal]
+    assert solution.objective_value == pytest.approx(
+        max(event["incumbent"] for event in events), rel=1e-6
+    )
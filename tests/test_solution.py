@@ -0,0 +1,42 @@
+# test_solution.py
+
+import pytest
+
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.optimize import optimize
+from bdo_empire.optimize_highs import optimize as optimize_highs
+from bdo_empire.solution import Solution, solution_of
+
+optimizer = {"pulp": optimize, "highspy": optimize_highs}
+
+
+@pytest.mark.parametrize("backend", ["pulp", "highspy"])
+@pytest.mark.parametrize("num_processes", [1, 2])
+def test_solution_round_trip(reference_data, backend, num_processes):
+    data = reference_data(30, backend=backend)
+    data["config"]["solver"]["num_processes"] = num_processes
+    G = get_graph_data(data)
+    prob = optimizer[backend](data, G)
+    solution = solution_of(prob)
+    assert solution.status == "Optimal Solution Found"
+
+    variables = prob.variables()
+    col_value = solution.col_value(len(variables))
+    assert len(solution) < len(variables)
+    assert all(col_value[var.index] == round(var.varValue or 0) for var in variables)
+    assert all(solution.value_of(var) == col_value[var.index] for var in variables)
+
+    copy = Solution(solution.sol_status, solution.objective_value, col_value)
+    assert copy.index.tolist() == solution.index.tolist()
+    assert copy.value.tolist() == solution.value.tolist()
+
+    # The graph view holds the active nodes and the prizes of the objective.
+    assert {v.key for v in solution.nodes(G)} == {
+        v.key for v in G["V"].values() if "x" in v.vars and round(v.vars["x"].varValue) == 1
+    }
+    prizes = sum(
+        round(arc.destination.group_prizes[group_id]["value"], 2) * flow
+        for arc, group_id, flow in solution.arc_flows(G)
+        if arc.destination.isPlant
+    )
+    assert prizes == pytest.approx(solution.objective_value)
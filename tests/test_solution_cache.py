@@ -0,0 +1,109 @@
+# test_solution_cache.py
+
+import numpy as np
+import pytest
+
+import bdo_empire.data_store as ds
+from bdo_empire import solution_cache
+from bdo_empire.graph_cache import get_graph_data
+from bdo_empire.heuristic import heuristic
+from bdo_empire.optimize_highs import create_problem, optimize
+from bdo_empire.reduce_graph_data import reduce_graph_data
+from bdo_empire.solution_cache import (
+    SOLUTION_CACHE_FILENAME,
+    find_solution,
+    mip_start,
+    read_solutions,
+    repaired_nodes,
+    solution_key,
+    store_solution,
+)
+from tests.conftest import lodging
+
+
+@pytest.fixture
+def solution_store():
+    if ds.is_file(SOLUTION_CACHE_FILENAME):
+        ds.path().joinpath(SOLUTION_CACHE_FILENAME).unlink()
+    yield
+    ds.path().joinpath(SOLUTION_CACHE_FILENAME).unlink(missing_ok=True)
+
+
+def solved(reference_data, budget: int):
+    data = reference_data(budget, backend="highspy")
+    G = get_graph_data(data)
+    return data, G, optimize(data, G)
+
+
+def test_solution_key(reference_data, prices, modifiers):
+    data = reference_data(30)
+    key = solution_key(data, lodging)
+    assert solution_key(reference_data(60), lodging) == key
+    assert solution_key(data, {**lodging, "Velia": 1}) != key
+    data["config"]["solver"]["mip_rel_gap"] = 1e-3
+    assert solution_key(data, lodging) != key
+    assert solution_key(reference_data(30, nearest_n=3), lodging) != key
+
+
+def test_store_keeps_latest_solutions(reference_data, solution_store, monkeypatch):
+    monkeypatch.setattr(solution_cache, "max_solutions", 3)
+    data, G, prob = solved(reference_data, 30)
+    for budget in [10, 20, 30, 40, 20]:
+        store_solution("key", budget, prob, G, {"budget": budget})
+    assert [entry["budget"] for entry in read_solutions()] == [30, 40, 20]
+    exact, nearest = find_solution("key", 20)
+    assert exact["workerman"] == {"budget": 20} and nearest is None
+    exact, nearest = find_solution("key", 36)
+    assert exact is None and nearest["budget"] == 40
+    assert find_solution("other key", 20) == (None, None)
+
+
+def test_store_status(reference_data, solution_store):
+    data, G, prob = solved(reference_data, 30)
+    store_solution("key", 30, prob, G, {})
+    greedy = heuristic(data, G)
+    store_solution("key", 20, greedy, G, {})
+    store_solution("key", 10, greedy, G, {}, certified=True)
+    assert {entry["budget"]: entry["status"] for entry in read_solutions()} == {
+        30: "Optimal",
+        10: "Certified",
+    }
+
+
+@pytest.mark.parametrize("budget", [5, 10, 20])
+def test_repaired_nodes_are_feasible(reference_data, solution_store, budget):
+    data, G, prob = solved(reference_data, 30)
+    store_solution("key", 30, prob, G, {})
+    _, entry = find_solution("key", budget)
+    assert entry["cost"] > budget
+
+    data = reference_data(budget, backend="highspy")
+    G = get_graph_data(data)
+    nodes = repaired_nodes(G, entry, budget)
+    assert sum(G["V"][key].cost for key in nodes) <= budget
+
+    assert_feasible_start(data, G, mip_start(G, entry, budget), budget)
+
+
+def assert_feasible_start(data: dict, G, start: dict[str, float], budget: int) -> None:
+    """Assert the model of `G` with every x fixed to `start` is feasible within `budget`."""
+    prob = create_problem(data["config"], G)
+    assert start.keys() <= prob.variablesDict().keys()
+    for var in prob.vars:
+        if var.name in start:
+            var.lowBound = var.upBound = start[var.name]
+    options = {k: v for k, v in data["config"]["solver"].items() if k != "num_processes"}
+    col_value = np.array(prob.run(options))
+    assert prob.status == "Optimal"
+    assert col_value[prob.variablesDict()["cost"].index] <= budget
+
+
+@pytest.mark.parametrize("stored, budget", [(5, 30), (30, 20)])
+def test_start_on_reduced_graph_is_feasible(reference_data, solution_store, stored, budget):
+    data, G, prob = solved(reference_data, stored)
+    store_solution("key", stored, prob, G, {})
+    _, entry = find_solution("key", budget)
+
+    data = reference_data(budget, backend="highspy")
+    G = reduce_graph_data(get_graph_data(data), budget)
+    assert_feasible_start(data, G, mip_start(G, entry, budget), budget)